@@ -4,7 +4,7 @@
 # Uso: ./gera_locale.sh
 mkdir -p locales
 rm locales/pescadores.pot
-pygettext -d pescadores -o locales/pescadores.pot pescadores.py
+pygettext -k N_ -d pescadores -o locales/pescadores.pot pescadores.py pescadores_simulacao.py
 mkdir -p locales/en/LC_MESSAGES
 mkdir -p locales/pt/LC_MESSAGES
 # Da primeira vez, copiar
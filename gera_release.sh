@@ -7,6 +7,8 @@ cp leiame.txt $1
 cp COPIANDO $1
 cp pescadores.py $1
 cp pescadores_tests.py $1
+cp pescadores_simulacao.py $1
+cp pescadores_reproducao.py $1
 cp pescadores_manual.html $1
 cp pescadores_jogo.pdf $1
 cp pescadores.png $1
@@ -30,5 +32,6 @@ pydoc -w ./
 python -m unittest -v pescadores_tests
 # Limpando arquivos temporários
 rm *.pyc
+rm -f *.compilado
 
 
@@ -19,11 +19,19 @@ u""" Pescadores - Jogo de simulação situado em uma colônia de pescadores.
 """
 from __future__ import division
 
-import string, os, sys
-import json
+import string, os, sys, operator, functools, inspect
+import json, heapq, hashlib, zlib
 
 from os import path
-from random import randint
+from array import array
+from bisect import bisect_left
+from random import Random, randint
+
+try:
+  import numpy
+except ImportError:
+  # NumPy é opcional: sem ele, as jornadas em lote são executadas uma a uma.
+  numpy = None
 
 import gettext
 # Para desenvolvimento, sem internacionalização
@@ -34,6 +42,67 @@ _ = gettext.gettext
 # en.install()
 # _ = en.gettext
 
+def N_(msg):
+  u""" Marca um texto para tradução, sem traduzi-lo agora.
+
+      A tradução é feita depois, quando o texto é apresentado.
+  """
+  return msg
+
+
+DIRETORIO_LOCALES = path.join(path.dirname(path.abspath(__file__)), u'locales')
+
+_SEM_TRADUCAO = object()
+
+class _SemTraducao(gettext.NullTranslations):
+  u""" Último recurso dos catálogos de um Tradutor: indica que o texto não foi achado.
+  """
+  def gettext(self, texto):
+    return _SEM_TRADUCAO
+
+class Tradutor:
+  u""" Traduz os textos do jogo para um idioma.
+
+      O catálogo é lido uma só vez, e cada texto é procurado nele uma só vez: a tradução
+      fica guardada em um dicionário. Cada Jogo tem o seu tradutor, de modo que um mesmo
+      processo pode ter jogos em idiomas diferentes.
+      Sem idioma, ou sem catálogo para o idioma, os textos ficam como estão (português).
+  """
+  __slots__ = (u'_idioma', u'_traducoes', u'_textos')
+
+  def __init__(self, idioma = None, diretorio = DIRETORIO_LOCALES):
+    self._idioma = idioma
+    self._textos = {}
+    self._traducoes = None
+    if idioma is not None:
+      self._traducoes = gettext.translation(u'pescadores', diretorio, languages = [idioma],
+                                            fallback = True)
+      self._traducoes.add_fallback(_SemTraducao())
+
+  def idioma(self):
+    return self._idioma
+
+  def __call__(self, texto):
+    traduzido = self._textos.get(texto)
+    if traduzido is None:
+      traduzido = texto
+      if self._traducoes is not None:
+        encontrado = self._traducoes.gettext(texto)
+        if encontrado is not _SEM_TRADUCAO:
+          traduzido = encontrado
+      self._textos[texto] = traduzido
+    return traduzido
+
+
+_tradutores = {}
+
+def tradutor(idioma = None):
+  u""" Retorna o tradutor de um idioma, criado uma só vez por processo.
+  """
+  if idioma not in _tradutores:
+    _tradutores[idioma] = Tradutor(idioma)
+  return _tradutores[idioma]
+
 
 # TODO: Fatorar e separar Jogo e subclasses em biblioteca
 # TODO: Diálogos dentro da tela principal
@@ -54,8 +123,677 @@ def strtofloat(txt):
   """
   return float(txt.replace(u',', u'.'))
 
+# Distribuições exatas dos testes de dados
+#
+# Os testes de Perigo e Pesca são fórmulas simples sobre um ou dois dados de seis faces,
+# e podem ser enumerados. As tabelas são guardadas, para que ferramentas de equilíbrio
+# e jogadores automáticos consultem probabilidades sem sortear milhões de dados.
+
+_distribuicoes_perigo = {}
+_distribuicoes_pesca = {}
+
+def distribuicao_perigo(probabilidade, dificuldade, destreza, resistencia, danos):
+  u""" Distribuição exata dos resultados de Perigo.teste().
+
+      Parameters:
+        probabilidade, dificuldade: int - Atributos do perigo
+        destreza, resistencia, danos: int - Os mesmos argumentos de Perigo.teste()
+      Returns:
+        {resultado:int: probabilidade:float, ...} - Tabela guardada em cache. Não alterar.
+  """
+  chave = (probabilidade, dificuldade, destreza, resistencia, danos)
+  tabela = _distribuicoes_perigo.get(chave)
+  if tabela is None:
+    contagem = {}
+    for dado in range(1, 7):
+      if dado <= probabilidade:
+        for dado_destreza in range(1, 7):
+          if dado_destreza == 1:
+            resultado = -1
+          else:
+            resultado = dado_destreza + destreza + resistencia - dificuldade - danos
+          contagem[resultado] = contagem.get(resultado, 0) + 1
+      else:
+        contagem[1] = contagem.get(1, 0) + 6
+    tabela = dict((resultado, vezes / 36) for (resultado, vezes) in contagem.items())
+    _distribuicoes_perigo[chave] = tabela
+  return tabela
+
+def distribuicao_pesca(destreza, dificuldade, rendimento):
+  u""" Distribuição exata dos resultados de Pesca.pesque().
+
+      Parameters:
+        destreza: int - O mesmo argumento de Pesca.pesque()
+        dificuldade, rendimento: int - Atributos do pesqueiro
+      Returns:
+        {resultado:int: probabilidade:float, ...} - Tabela guardada em cache. Não alterar.
+  """
+  chave = (destreza, dificuldade, rendimento)
+  tabela = _distribuicoes_pesca.get(chave)
+  if tabela is None:
+    contagem = {}
+    for dado in range(1, 7):
+      if dado == 1:
+        resultado = 0
+      else:
+        resultado = int(dado + destreza - dificuldade)
+        if resultado > 0:
+          if resultado > 5: resultado = 5
+          resultado = int(rendimento * resultado * 0.2)
+      contagem[resultado] = contagem.get(resultado, 0) + 1
+    tabela = dict((resultado, vezes / 6) for (resultado, vezes) in contagem.items())
+    _distribuicoes_pesca[chave] = tabela
+  return tabela
+
+
+# Eventos do jogo
+#
+# As operações do Jogo registram o que aconteceu em objetos, com os dados já separados
+# (nome do barco, coordenadas, valores). O texto traduzido só é montado quando alguém
+# apresenta o evento, com texto() ou str(). Simulações sem interface não pagam pelo texto,
+# e a interface gráfica lê as coordenadas dos barcos diretamente dos eventos.
+
+class Evento:
+  u""" Um acontecimento do jogo.
+
+      As subclasses definem o modelo da mensagem e os nomes dos campos, na mesma
+      ordem em que aparecem no modelo e nos argumentos do construtor.
+
+      Attributes:
+        modelo: str - Texto da mensagem, ainda não traduzido, com marcas de formatação.
+        campos: (str, ...) - Nomes dos atributos do evento.
+  """
+  modelo = u''
+  campos = ()
+
+  def __init__(self, *valores):
+    for (campo, valor) in zip(self.campos, valores):
+      setattr(self, campo, valor)
+
+  def argumentos(self):
+    u""" Valores a formatar no modelo, na ordem dos campos.
+    """
+    return tuple(getattr(self, campo) for campo in self.campos)
+
+  def texto(self, tr = None):
+    u""" Monta a mensagem traduzida que descreve o evento.
+
+        Parameters:
+          tr: Tradutor - Se omitido, usa a tradução global do módulo.
+    """
+    if tr is None:
+      tr = _
+    if len(self.campos) > 0:
+      return tr(self.modelo) % self.argumentos()
+    return tr(self.modelo) if self.modelo else u''
+
+  def __str__(self):
+    return self.texto()
+
+  def __repr__(self):
+    return u'%s%r' % (self.__class__.__name__, self.argumentos())
+
+  def __eq__(self, outro):
+    return (self.__class__ is outro.__class__ and
+            self.argumentos() == outro.argumentos())
+
+  def __ne__(self, outro):
+    return not self.__eq__(outro)
+
+
+class Separador(Evento):
+  u""" Linha em branco entre grupos de mensagens.
+  """
+
+class NovoDia(Evento):
+  modelo = N_(u'Começa um novo dia na vila.')
+
+class PrecosDoDia(Evento):
+  u""" Tabela de preços de um mercado. precos: [(produto:str, preco:int), ...],
+      com os nomes dos produtos ainda não traduzidos.
+  """
+  campos = (u'nome_porto', u'precos')
+
+  def texto(self, tr = None):
+    if tr is None:
+      tr = _
+    msg = tr(u'Preços no mercado de %s:\n') % self.nome_porto
+    for (produto, preco) in self.precos:
+      msg += tr(u'%s: R$%d,00\n') % (tr(produto), preco)
+    return msg
+
+class ResgateRacao(Evento):
+  modelo = N_(u'%s ficou sem ração, e foi resgatado até o porto.')
+  campos = (u'nome_pescador',)
+
+class BarcoRebocado(Evento):
+  modelo = N_(u'Barco %s ficou sem tripulação, e foi rebocado até o porto.')
+  campos = (u'nome_barco',)
+
+class RacaoCompulsoria(Evento):
+  modelo = N_(u'%s ficou sem ração, e teve que comprar uma ao preço do dia.')
+  campos = (u'nome_pescador',)
+
+class VagasEsgotadas(Evento):
+  modelo = N_(u'Vagas esgotadas no barco %s.')
+  campos = (u'nome_barco',)
+
+class Embarque(Evento):
+  modelo = N_(u'Embarcando %s no barco %s.')
+  campos = (u'nome_pescador', u'nome_barco')
+
+class JornadaCreditada(Evento):
+  modelo = N_(u'%s recebeu R$%d,00 para trabalhar em %s.')
+  campos = (u'nome_pescador', u'valor', u'nome_porto')
+
+class BarcoNavegando(Evento):
+  modelo = N_(u'Barco %s navegando de %s a %s.')
+  campos = (u'nome_barco', u'origem', u'destino')
+
+class PerigoOcorrido(Evento):
+  u""" Um perigo se materializou. A descrição vem do mapa, e só é traduzida se
+      estiver no catálogo.
+  """
+  campos = (u'nome_perigo', u'descricao')
+
+  def texto(self, tr = None):
+    if tr is None:
+      tr = _
+    return tr(self.descricao)
+
+class BarcoAtrasado(Evento):
+  campos = (u'nome_barco', u'destino', u'dias')
+
+  def texto(self, tr = None):
+    if tr is None:
+      tr = _
+    if self.dias == 1:
+      return tr(u'Barco %s se atrasou 1 dia para chegar a %s.') % (self.nome_barco, self.destino)
+    return tr(u'Barco %s se atrasou 2 dias para chegar a %s.') % (self.nome_barco, self.destino)
+
+class Naufragio(Evento):
+  modelo = N_(u'Barco %s naufragou perto de %s.')
+  campos = (u'nome_barco', u'posicao')
+
+class PescadorResgatado(Evento):
+  modelo = N_(u'%s foi resgatado e está de volta a %s.')
+  campos = (u'nome_pescador', u'nome_porto')
+
+class CargaPerdida(Evento):
+  modelo = N_(u'Barco %s perdeu parte da carga.')
+  campos = (u'nome_barco',)
+
+class BarcoPescando(Evento):
+  modelo = N_(u'Barco %s pescando em %s.')
+  campos = (u'nome_barco', u'posicao')
+
+class RedePerdida(Evento):
+  modelo = N_(u'Barco %s perdeu uma rede em %s.')
+  campos = (u'nome_barco', u'posicao')
+
+class RedeVazia(Evento):
+  modelo = N_(u'Rede do barco %s voltou vazia em %s.')
+  campos = (u'nome_barco', u'posicao')
+
+class Pescaria(Evento):
+  modelo = N_(u'Barco %s pescou %d quilos de peixe em %s.')
+  campos = (u'nome_barco', u'quilos', u'posicao')
+
+class BarcoEmEspera(Evento):
+  modelo = N_(u'Barco %s atrasado para chegar a %s.')
+  campos = (u'nome_barco', u'posicao')
+
+class BarcoMovido(Evento):
+  u""" Nova posição de um barco na imagem do mapa, em pixels.
+
+      O texto é a antiga diretiva '#coord:', para quem ainda a interpreta.
+  """
+  modelo = N_(u'#coord:barco=%s;x=%d;y=%d')
+  campos = (u'nome_barco', u'x', u'y')
+
+class BarcoChegou(Evento):
+  modelo = N_(u'Barco %s chegou em %s.')
+  campos = (u'nome_barco', u'posicao')
+
+class PescadoVendido(Evento):
+  modelo = N_(u'Barco %s vendeu pescado no valor de $R%d,00.')
+  campos = (u'nome_barco', u'valor')
+
+class RacoesRestantes(Evento):
+  u""" Rações de cada pescador ao fim do dia. racoes: [(nome:str, quant:int), ...]
+  """
+  campos = (u'racoes',)
+
+  def texto(self, tr = None):
+    if tr is None:
+      tr = _
+    msg = tr(u'\nRações restantes: ')
+    for (nome, quant) in self.racoes:
+      msg += tr(u'%s tem %d, ') % (nome, quant)
+    return msg
+
+class Transacao(Evento):
+  modelo = N_(u'Transação entre %s (comprador) e %s (vendedor) relativa a \n %s')
+  campos = (u'nome_comprador', u'nome_vendedor', u'contrato')
+
+class RedesInsuficientes(Evento):
+  modelo = N_(u'O vendedor não tem o número de redes prometido.')
+
+class SaldoInsuficiente(Evento):
+  modelo = N_(u'O comprador não tem saldo para pagar a transação.')
+
+class BarcoTransferido(Evento):
+  modelo = N_(u'Barco %s de nome %s')
+  campos = (u'tipo', u'nome_barco')
+
+  def texto(self, tr = None):
+    # O tipo é um código (BARCO_SIMPLES, BARCO_REFORCADO), traduzido aqui.
+    tr = tr or _
+    return tr(self.modelo) % (nome_tipo_barco(self.tipo, tr), self.nome_barco)
+
+class RedesTransferidas(Evento):
+  modelo = N_(u'%d redes')
+  campos = (u'quantas',)
+
+class DinheiroTransferido(Evento):
+  modelo = N_(u'Valor: R$%d,00')
+  campos = (u'valor',)
+
+
+# Leitura de mapas
+#
+# O arquivo .CSV do mapa é lido para tabelas simples (listas de tuplas), que depois
+# são montadas em posições por Mapa.monte_mapa(). As tabelas são guardadas em uma
+# versão compilada, ao lado do arquivo, para que os próximos jogos (e cada processo
+# de uma simulação) carreguem o mapa de uma vez, sem interpretar o texto de novo.
+#
+# O arquivo compilado começa com ASSINATURA_COMPILADO e uma linha de cabeçalho em json,
+# [versão, st_mtime_ns, st_size], seguidas das tabelas em json comprimido com zlib.
+# Como em FormatoBinario, o conteúdo é só de dados, nunca pickle.
+
+VERSAO_COMPILADO = 2
+ASSINATURA_COMPILADO = b'PESCMAPA'
+
+
+def leia_tabelas_mapa(nome_arq):
+  u""" Lê o arquivo .CSV de um mapa para tabelas.
+
+      Returns:
+        ({str: ...}, [msg:str, ...]) - As tabelas do mapa e mensagens de erro, se houver.
+  """
+  mensagens = []
+  tabelas = {u'dimensoes': (0, 0), u'nw': None, u'se': None, u'imagem': u'',
+             u'posicoes': [], u'rotas': [], u'pesqueiros': [], u'perigos': []}
+  arq_mapa = open(nome_arq, u'rb')
+  
+  # Estados possíveis: (I)nício, (D)imensões, (P)osições, (R)otas, Pes(Q)eiro,
+  #                    Peri(G)o , (F)im
+  # Sub-estado 0 - Esperando cabeçalho, Sub-estado 1 - Lendo dados.
+  estado = u'I'
+  
+  for linha in arq_mapa.readlines():
+    linha = linha.decode(u'utf-8').strip()
+    campos = linha.strip(u'\t').split(u'\t')
+    
+    if (len(campos) > 0 and len(campos[0]) > 0):
+      # Linha tem conteúdo
+      if estado == u'I':
+        if campos[0] == u'Pescadores – Mapa':
+          estado = u'D0'
+        else:
+          mensagens.append(_(u'Formato de arquivo inválido. Falta cabeçalho.'))
+          break
+      elif estado == u'D0':
+        if (linha.strip() == u'Largura\tAltura\tNorte\tSul\tLeste\tOeste\tImagem'):
+          estado = u'D1'
+        else:
+          mensagens.append(_(u'Formato de arquivo inválido. Esperava dimensões.'))
+          break
+      elif estado == u'D1':
+        if len(campos) == 7:
+          tabelas[u'dimensoes'] = (int(campos[0]), int(campos[1]))
+          tabelas[u'nw'] = (strtofloat(campos[5]), strtofloat(campos[2]))
+          tabelas[u'se'] = (strtofloat(campos[4]), strtofloat(campos[3]))
+          tabelas[u'imagem'] = campos[6]
+          estado = u'P0'
+        else:
+          mensagens.append(_(u'Formato de arquivo inválido. Dimensões inválidas.'))
+          break
+      elif estado == u'P0':
+        if (linha.strip() == u'Posição\tPrincipal\tPorto\tMercado\tLatitude\tLongitude\tDescrição'):
+          estado = u'P1'
+        else:
+          mensagens.append(_(u'Formato de arquivo inválido. Esperava posições.'))
+          break
+      elif estado == u'P1':
+        if len(campos) == 7:
+          tabelas[u'posicoes'].append((campos[0], campos[6],
+                                       strtofloat(campos[5]), strtofloat(campos[4]),
+                                       campos[2] == u'S', campos[3] == u'S',
+                                       campos[1] == u'S'))
+        else:
+          estado = u'R0'
+      elif estado == u'R1':
+        if len(campos) == 2:
+          tabelas[u'rotas'].append((campos[0], campos[1]))
+        else:
+          estado = u'Q0'
+      elif estado == u'Q1':
+        if len(campos) == 3:
+          tabelas[u'pesqueiros'].append((campos[0], int(campos[1]), int(campos[2].strip())))
+        else:
+          estado = u'G0'
+      elif estado == u'G1':
+        if len(campos) == 5:
+          tabelas[u'perigos'].append((campos[0], campos[1],
+                                      int(campos[2]), int(campos[3]), campos[4]))
+        else:
+          estado = u'F'
+
+      # Nota: Aqui, o estado escorre sem ler nova linha. Não usar elif.
+      if estado == u'R0':
+        if (linha.strip() == u'Origem\tDestino'):
+          estado = u'R1'
+        else:
+          mensagens.append(_(u'Formato de arquivo inválido. Esperava rotas.'))
+          break
+      elif estado == u'Q0':
+        if (linha.strip() == u'Pesqueiro\tDificuldade\tRendimento'):
+          estado = u'Q1'
+        else:
+          mensagens.append(_(u'Formato de arquivo inválido. Esperava pesqueiros.'))
+          break
+      elif estado == u'G0':
+        if (linha.strip() == u'Perigo\tPosição\tProbabilidade\tDificuldade\tDescrição'):
+          estado = u'G1'
+        else:
+          mensagens.append(_(u'Formato de arquivo inválido. Esperava perigos.'))
+          break
+      elif estado == u'F':
+        mensagens.append(_(u'Formato de arquivo inválido. Linhas desconhecidas.'))
+        
+  arq_mapa.close()
+  return (tabelas, mensagens)
+
+def nome_compilado(nome_arq):
+  u""" Nome do arquivo com a versão compilada de um mapa.
+  """
+  return nome_arq + u'.compilado'
+
+def _chave_mapa(nome_arq):
+  u""" Identifica o conteúdo atual do arquivo do mapa, pela data de modificação e tamanho.
+  """
+  estado = os.stat(nome_arq)
+  return (estado.st_mtime_ns, estado.st_size)
+
+def _tabelas_de_json(tabelas):
+  u""" Refaz as tuplas das tabelas de um mapa, que o json transforma em listas.
+  """
+  for chave in (u'dimensoes', u'nw', u'se'):
+    if tabelas[chave] is not None:
+      tabelas[chave] = tuple(tabelas[chave])
+  for chave in (u'posicoes', u'rotas', u'pesqueiros', u'perigos'):
+    tabelas[chave] = [tuple(linha) for linha in tabelas[chave]]
+  return tabelas
+
+def salve_compilado(nome_arq, tabelas):
+  u""" Guarda as tabelas do mapa em json comprimido, ao lado do arquivo .CSV.
+
+      Se não for possível gravar (diretório sem permissão, por exemplo),
+      o mapa continua sendo lido do .CSV.
+  """
+  nome_temp = u'%s.%d' % (nome_compilado(nome_arq), os.getpid())
+  try:
+    cabecalho = json.dumps([VERSAO_COMPILADO] + list(_chave_mapa(nome_arq)))
+    dados = json.dumps(tabelas, separators = (u',', u':')).encode(u'utf-8')
+    arq = open(nome_temp, u'wb')
+    try:
+      arq.write(ASSINATURA_COMPILADO + cabecalho.encode(u'utf-8') + b'\n')
+      arq.write(zlib.compress(dados))
+    finally:
+      arq.close()
+    # Troca atômica, para que processos simultâneos nunca leiam um arquivo pela metade.
+    os.replace(nome_temp, nome_compilado(nome_arq))
+  except (IOError, OSError):
+    if path.exists(nome_temp):
+      os.remove(nome_temp)
+
+def carregue_compilado(nome_arq):
+  u""" Carrega as tabelas de um mapa a partir da versão compilada.
+
+      Returns:
+        {str: ...} - As tabelas, como em leia_tabelas_mapa(), ou None, se não há
+          versão compilada, ou se ela não corresponde ao arquivo .CSV atual.
+  """
+  try:
+    arq = open(nome_compilado(nome_arq), u'rb')
+  except (IOError, OSError):
+    return None
+  try:
+    if arq.read(len(ASSINATURA_COMPILADO)) != ASSINATURA_COMPILADO:
+      return None
+    if json.loads(arq.readline().decode(u'utf-8')) != ([VERSAO_COMPILADO] +
+                                                     list(_chave_mapa(nome_arq))):
+      return None
+    return _tabelas_de_json(json.loads(zlib.decompress(arq.read()).decode(u'utf-8')))
+  except (ValueError, KeyError, TypeError, zlib.error):
+    # Arquivo corrompido ou de outra versão. Será refeito.
+    return None
+  finally:
+    arq.close()
+
+def hash_mapa(nome_arq):
+  u""" Identifica o conteúdo de um arquivo de mapa, independente de nome e data.
+
+      Returns:
+        str - Resumo SHA-256 do arquivo, em hexadecimal
+  """
+  arq = open(nome_arq, u'rb')
+  try:
+    return hashlib.sha256(arq.read()).hexdigest()
+  finally:
+    arq.close()
+
+
+# Formatos de arquivo do estado do jogo
+#
+# Jogo.salve_estado() monta um dicionário (ver Jogo.estado_como_dict()) e o entrega a um
+# formato, escolhido pela extensão do arquivo. O formato json serve para intercâmbio;
+# o binário é menor e mais rápido de gravar e ler.
+
+class FormatoJson:
+  u""" Estado do jogo em texto json.
+  """
+  extensao = u'.json'
+
+  def grave(self, estado_jogo, nome_arq):
+    arq = open(nome_arq, u'w')
+    try:
+      json.dump(estado_jogo, arq)
+    finally:
+      arq.close()
+
+  def leia(self, nome_arq):
+    arq = open(nome_arq, u'r')
+    try:
+      return json.load(arq)
+    finally:
+      arq.close()
+
+
+class FormatoBinario:
+  u""" Estado do jogo em formato binário: json compacto, opcionalmente comprimido com zlib.
+
+      O arquivo começa com ASSINATURA, seguida de um byte indicando a compressão.
+      O conteúdo é só de dados (nunca pickle), para que abrir um arquivo recebido de
+      outra pessoa não execute código.
+  """
+  extensao = u'.pesc'
+  ASSINATURA = b'PESC2'
+
+  def __init__(self, nivel_compressao = 6):
+    u"""
+        Parameters:
+          nivel_compressao:int - 0 (sem compressão) a 9, como em zlib.
+    """
+    self._nivel_compressao = nivel_compressao
+
+  def grave(self, estado_jogo, nome_arq):
+    dados = json.dumps(estado_jogo, separators = (u',', u':')).encode(u'utf-8')
+    if self._nivel_compressao > 0:
+      dados = b'z' + zlib.compress(dados, self._nivel_compressao)
+    else:
+      dados = b'-' + dados
+    arq = open(nome_arq, u'wb')
+    try:
+      arq.write(self.ASSINATURA + dados)
+    finally:
+      arq.close()
+
+  def leia(self, nome_arq):
+    arq = open(nome_arq, u'rb')
+    try:
+      dados = arq.read()
+    finally:
+      arq.close()
+    if not dados.startswith(self.ASSINATURA):
+      if dados.startswith(self.ASSINATURA[:-1]):
+        raise ValueError(u'%s: versão de arquivo não suportada' % nome_arq)
+      raise ValueError(u'%s: não é um arquivo de jogo salvo' % nome_arq)
+    inicio = len(self.ASSINATURA)
+    compressao = dados[inicio:inicio + 1]
+    dados = dados[inicio + 1:]
+    if compressao == b'z':
+      dados = zlib.decompress(dados)
+    elif compressao != b'-':
+      raise ValueError(u'%s: compressão desconhecida' % nome_arq)
+    return json.loads(dados.decode(u'utf-8'))
+
+
+FORMATOS_ESTADO = {FormatoJson.extensao: FormatoJson(),
+                   FormatoBinario.extensao: FormatoBinario()}
+
+def formato_estado(nome_arq):
+  u""" Escolhe o formato do estado do jogo pela extensão do arquivo. O padrão é json.
+  """
+  extensao = path.splitext(nome_arq)[1].lower()
+  return FORMATOS_ESTADO.get(extensao, FORMATOS_ESTADO[FormatoJson.extensao])
+
+
 # Estrutura interna do jogo
 
+class ColecaoOrdenada:
+  u""" Coleção sem repetições, que mantém a ordem de inclusão.
+
+      Usada para os pescadores em um porto ou barco e os barcos de um pescador.
+      A ordem é a mesma de uma lista com append() e remove(), para a interface e para
+      os arquivos salvos, mas consultar, incluir e remover um elemento não dependem
+      do tamanho da coleção.
+
+      Notes:
+        Não alterar a coleção enquanto ela é percorrida. Percorra uma cópia: list(colecao).
+        Enquanto a coleção não recebe elementos, o que é o mais comum (pescadores sem
+        barco, barcos sem tripulação), o dicionário não é alocado.
+  """
+  __slots__ = (u'_elementos',)
+
+  def __init__(self, elementos = ()):
+    self._elementos = dict.fromkeys(elementos) if elementos else ()
+
+  def adicione(self, elemento):
+    u""" Inclui um elemento no fim da coleção.
+
+        Returns:
+          True - Se o elemento foi incluído
+          False - Se ele já estava na coleção
+    """
+    if elemento in self._elementos:
+      return False
+    if not self._elementos:
+      self._elementos = {}
+    self._elementos[elemento] = None
+    return True
+
+  def remova(self, elemento):
+    u""" Remove um elemento da coleção.
+
+        Returns:
+          True - Se o elemento estava na coleção
+          False - Caso contrário
+    """
+    if elemento in self._elementos:
+      del self._elementos[elemento]
+      return True
+    return False
+
+  def __contains__(self, elemento):
+    return elemento in self._elementos
+
+  def __iter__(self):
+    return iter(self._elementos)
+
+  def __len__(self):
+    return len(self._elementos)
+
+  def __repr__(self):
+    return u'ColecaoOrdenada(%r)' % list(self._elementos)
+
+  def copie(self):
+    u""" Retorna uma cópia da coleção, com os mesmos elementos, na mesma ordem.
+    """
+    copia = ColecaoOrdenada()
+    if self._elementos:
+      copia._elementos = self._elementos.copy()
+    return copia
+
+
+# Esquemas de campos
+#
+# Pescador e Barco declaram os campos que vão para os arquivos salvos (CAMPOS) e os que
+# apontam para outras entidades, tratados pelo Jogo (REFERENCIAS). Cada campo 'x'
+# corresponde ao atributo '_x'. Os leitores e atribuidores dos atributos são preparados
+# uma vez por classe, e usados por as_dict() e from_dict().
+
+def leitor_de_campos(classe):
+  u""" Retorna uma função que lê, de uma vez, os atributos dos CAMPOS de um objeto.
+
+      Returns:
+        function(objeto) -> (valor, ...) - Valores na ordem de classe.CAMPOS
+  """
+  return operator.attrgetter(*[u'_' + campo for campo in classe.CAMPOS])
+
+def atribuidores_de_campos(classe):
+  u""" Retorna as funções que atribuem cada um dos CAMPOS de um objeto da classe.
+
+      Returns:
+        {campo:str: function(objeto, valor)}
+  """
+  return dict((campo, getattr(classe, u'_' + campo).__set__) for campo in classe.CAMPOS)
+
+def atribua_valores(objeto, valores, atribuidores, campos):
+  u""" Atribui a um objeto os valores lidos por leitor_de_campos(), na ordem de campos.
+  """
+  for (campo, valor) in zip(campos, valores):
+    atribuidores[campo](objeto, valor)
+
+def atribua_campos(objeto, atributos, atribuidores, referencias):
+  u""" Atribui a um objeto os campos lidos de um arquivo salvo.
+
+      Parameters:
+        atributos: {campo:str: valor} - Como retornado por as_dict()
+        atribuidores: {campo:str: function(objeto, valor)} - Ver atribuidores_de_campos()
+        referencias: (campo:str, ...) - Campos aceitos, mas ignorados aqui
+      Raises:
+        ValueError - Se há algum campo desconhecido
+  """
+  for (campo, valor) in atributos.items():
+    atribua = atribuidores.get(campo)
+    if atribua is not None:
+      atribua(objeto, valor)
+    elif campo not in referencias:
+      raise ValueError(u'%s: campo desconhecido: %s' % (objeto.__class__.__name__, campo))
+
+
 class Pescador:
   u""" Um personagem do jogo.
 
@@ -65,6 +803,10 @@ class Pescador:
         destreza_em_navegacao: int - De 0 a 5, aumenta a chance de sucesso em tempestades, etc.
         posses: - bens que o pescador possui (dinheiro, redes, barcos, rações)
   """
+  # Sem __dict__ por instância: jogos com milhares de entidades ocupam bem menos memória.
+  __slots__ = (u'_nome', u'_destreza_na_pesca', u'_destreza_em_navegacao', u'_dinheiro',
+               u'_redes', u'_racoes', u'_barcos')
+
   def __init__(self, nome):
     self._nome = nome
     self._destreza_na_pesca = 0
@@ -72,34 +814,42 @@ class Pescador:
     self._dinheiro = 0
     self._redes = 0
     self._racoes = 0
-    self._barcos = []
+    self._barcos = ColecaoOrdenada()
     
+  CAMPOS = (u'nome', u'destreza_na_pesca', u'destreza_em_navegacao', u'dinheiro',
+            u'redes', u'racoes')
+  REFERENCIAS = (u'barcos',)
+
   def as_dict(self):
-    u""" Retorna atributos do pescador como um string json.
-    """
-    atributos = {}
-    atributos[u'nome'] = self._nome
-    atributos[u'destreza_na_pesca'] = self._destreza_na_pesca
-    atributos[u'destreza_em_navegacao'] = self._destreza_em_navegacao
-    atributos[u'dinheiro'] = self._dinheiro
-    atributos[u'redes'] = self._redes
-    atributos[u'racoes'] = self._racoes
-    nomes_barcos = []
-    for barco in self._barcos:
-      nomes_barcos.append(barco.nome())
-    atributos[u'barcos'] = nomes_barcos
+    u""" Retorna atributos do pescador como um dicionário, para gravar em json.
+    """
+    atributos = dict(zip(self.CAMPOS, self._leia_campos(self)))
+    atributos[u'barcos'] = [barco.nome() for barco in self._barcos]
     return atributos
     
   def from_dict(self, atributos):
-    u""" Reinicia atributos do pescador a partir de um string json.
+    u""" Reinicia atributos do pescador a partir de um dicionário lido de json.
     
         Note:
           Lista de barcos não é copiada, pois os barcos podem
           não ter sido instanciados.
+        Raises:
+          ValueError - Se o dicionário tem algum campo desconhecido.
+    """
+    atribua_campos(self, atributos, self._atribuidores, self.REFERENCIAS)
+
+  def copie_estado(self):
+    u""" Retorna uma cópia, em memória, do que muda no pescador durante o jogo.
+        Ver Jogo.copie_estado().
+    """
+    return (self._leia_campos(self), self._barcos.copie())
+
+  def restaure_estado(self, copia):
+    u""" Volta o pescador ao estado copiado por copie_estado().
     """
-    for (atr, valor) in atributos.items():
-      if atr != u'barcos':
-        exec(u'self._%s = valor' % atr)
+    (valores, barcos) = copia
+    atribua_valores(self, valores, self._atribuidores, self.CAMPOS)
+    self._barcos = barcos.copie()
 
   def nome(self):
     return self._nome
@@ -133,15 +883,22 @@ class Pescador:
   def adicione_barco(self, barco):
     u""" Transfere posse de um barco ao pescador.
     """
-    self._barcos.append(barco)
+    self._barcos.adicione(barco)
 
   def remova_barco(self, barco):
     u""" Remove barco do pescador.
+
+        Raises:
+          ValueError - Se o barco não pertence ao pescador.
     """
-    self._barcos.remove(barco)
+    if not self._barcos.remova(barco):
+      raise ValueError(u'Pescador.remova_barco(): barco não pertence ao pescador')
     
   def barcos(self):
-    u""" Retorna lista dos barcos que pertencem ao pescador.
+    u""" Retorna os barcos que pertencem ao pescador.
+
+        Returns:
+          ColecaoOrdenada - Os barcos, na ordem em que foram adquiridos.
     """
     return self._barcos
 
@@ -230,23 +987,29 @@ class Pescador:
     u""" Incrementa a destreza na pesca de 1 nível.
     """
     self._destreza_na_pesca += 1
+
+Pescador._leia_campos = staticmethod(leitor_de_campos(Pescador))
+Pescador._atribuidores = atribuidores_de_campos(Pescador)
   
     
 class Barco:
   u""" Um barco que pode sair para a pesca.
   
       Attributes:
-        tipo: string - Tipo de barco, conforme fabricante
+        tipo: int - Tipo de barco, conforme fabricante (BARCO_SIMPLES ou BARCO_REFORCADO)
         nome: string - Nome do barco
         lotacao: int - Quantos pescadores podem estar no barco
         capacidade: int - Quantos quilos de peixe cabem no barco
         resistencia: int - Resistência do casco às intempéries
         
-        pescadores: [Pescador, ...] - Pescadores que estão no barco, limitado à lotação
+        pescadores: ColecaoOrdenada - Pescadores que estão no barco, limitado à lotação
         pescado: int - Quantidade de peixe no barco, em quilos
         atraso: int - Dias de atraso após passar por alguma intempérie
         posicao: Posicao - Posição em que se encontra o barco no mapa
   """
+  __slots__ = (u'_tipo', u'_nome', u'_lotacao', u'_capacidade', u'_resistencia',
+               u'_pescado', u'_atraso', u'_danos', u'_posicao', u'_pescadores')
+
   def __init__(self, tipo, nome, lot, cap, resist):
     self._tipo = tipo
     self._nome = nome
@@ -257,26 +1020,18 @@ class Barco:
     self._atraso = 0
     self._danos = 0
     self._posicao = None
-    self._pescadores = []
+    self._pescadores = ColecaoOrdenada()
     
+  CAMPOS = (u'tipo', u'nome', u'lotacao', u'capacidade', u'resistencia',
+            u'pescado', u'atraso', u'danos')
+  REFERENCIAS = (u'posicao', u'pescadores')
+
   def as_dict(self):
     u""" Retorna atributos do barco como um dicionário.
     """
-    atributos = {}
-    atributos[u'tipo'] = self._tipo
-    atributos[u'nome'] = self._nome
-    atributos[u'lotacao'] = self._lotacao
-    atributos[u'capacidade'] = self._capacidade
-    atributos[u'resistencia'] = self._resistencia
-    atributos[u'pescado'] = self._pescado
-    atributos[u'atraso'] = self._atraso
-    atributos[u'danos'] = self._danos
+    atributos = dict(zip(self.CAMPOS, self._leia_campos(self)))
     atributos[u'posicao'] = self._posicao.nome()
-
-    nomes_pescadores = []
-    for pescador in self._pescadores:
-      nomes_pescadores.append(pescador.nome())
-    atributos[u'pescadores'] = nomes_pescadores
+    atributos[u'pescadores'] = [pescador.nome() for pescador in self._pescadores]
     return atributos
     
   def from_dict(self, atributos):
@@ -285,10 +1040,24 @@ class Barco:
         Note:
           Lista de pescadores não é copiada, pois os mesmos podem
           não ter sido instanciados.
+        Raises:
+          ValueError - Se o dicionário tem algum campo desconhecido.
+    """
+    atribua_campos(self, atributos, self._atribuidores, self.REFERENCIAS)
+
+  def copie_estado(self):
+    u""" Retorna uma cópia, em memória, do que muda no barco durante o jogo.
+        Ver Jogo.copie_estado().
+    """
+    return (self._leia_campos(self), self._posicao, self._pescadores.copie())
+
+  def restaure_estado(self, copia):
+    u""" Volta o barco ao estado copiado por copie_estado().
     """
-    for (atr, valor) in atributos.items():
-      if ((atr != u'pescadores') and (atr != u'posicao')):
-        exec(u'self._%s = valor' % atr)
+    (valores, posicao, pescadores) = copia
+    atribua_valores(self, valores, self._atribuidores, self.CAMPOS)
+    self._posicao = posicao
+    self._pescadores = pescadores.copie()
 
   def nome(self):
     return self._nome
@@ -303,10 +1072,14 @@ class Barco:
 
         Arguments:
           carga: int - Quantidade de peixes em Kg
+        Returns:
+          int - Quantos Kg couberam no barco
     """
+    antes = self._pescado
     self._pescado += carga
     if (self._pescado > self._capacidade):
       self._pescado = self._capacidade
+    return self._pescado - antes
       
   def descarregue(self):
     u""" Descarrega o pescado do barco.
@@ -340,11 +1113,7 @@ class Barco:
           True - Se o pescador estava no barco
           False - Caso contrário
     """
-    if (pescador in self._pescadores):
-      self._pescadores.remove(pescador)
-      return True
-    else:
-      return False
+    return self._pescadores.remova(pescador)
     
   def embarque(self, pescador):
     u""" Embarca um pescador, se a lotação permite
@@ -355,12 +1124,10 @@ class Barco:
           True - Se houve o embarque
           False - Se não havia espaço, ou pescador já estava embarcado
     """
-    if ((self._lotacao <= len(self._pescadores)) or
-         pescador in self._pescadores):
+    if self._lotacao <= len(self._pescadores):
       return False
     else:
-      self._pescadores.append(pescador)
-      return True
+      return self._pescadores.adicione(pescador)
     
   def vagas(self):
     u""" Indica quantas vagas para pescadores há no barco
@@ -416,10 +1183,10 @@ class Barco:
     return self._atraso > 0
   
   def pescadores(self):
-    u""" Devolve lista com os pescadores embarcados
+    u""" Devolve os pescadores embarcados
     
         Returns:
-        [Pescador, ...] - Lista com os pescadores embarcados.
+        ColecaoOrdenada - Os pescadores embarcados, na ordem de embarque.
     """
     return self._pescadores
   
@@ -430,6 +1197,9 @@ class Barco:
           (int, int) - Resistência do casco e danos já sofridos
     """
     return (self._resistencia, self._danos)
+
+Barco._leia_campos = staticmethod(leitor_de_campos(Barco))
+Barco._atribuidores = atribuidores_de_campos(Barco)
   
 
 class Perigo:
@@ -443,6 +1213,8 @@ class Perigo:
         dificuldade: int - Valor que será usado no teste de navegação.
           Quanto maior, mais chances de que os danos sejam grandes.
   """
+  __slots__ = (u'_nome', u'_descricao', u'_probabilidade', u'_dificuldade')
+
   def __init__(self, nome, descr, prob, dif):
     self._nome = nome
     self._descricao = descr
@@ -454,18 +1226,27 @@ class Perigo:
   
   def descricao(self):
     return self._descricao
+
+  def probabilidade(self):
+    return self._probabilidade
+
+  def dificuldade(self):
+    return self._dificuldade
     
-  def teste(self, destreza, resistencia, danos):
+  def teste(self, destreza, resistencia, danos, sorteio = randint):
     u""" Realiza um teste de destreza, para decidir se o perigo foi superado ou não.
+      Parameters:
+        sorteio: function(a, b) - Sorteia um inteiro entre a e b, como random.randint.
+          Permite que cada jogo use seu próprio gerador de números aleatórios.
       Returns:
         int - Valor maior ou igual a zero, para indicar que o perigo foi superado, ou
               negativo, indicando a quantidade de danos ocorridos.
     """
-    dado = randint(1, 6)
+    dado = sorteio(1, 6)
     
     if dado <= self._probabilidade:
       # O perigo se materializou. Temos que testar a destreza dos navegadores.
-      dado = randint(1, 6)
+      dado = sorteio(1, 6)
 
       # Independente da destreza, sempre há uma chance de tudo dar errado.
       if (dado == 1):
@@ -476,46 +1257,299 @@ class Perigo:
         return dado + destreza + resistencia - self._dificuldade - danos
     else:
       return 1
-    
 
-class Pesca:
-  u""" Atributos de pesca de uma posição
- 
-      Attributes:
-        dificuldade: int - Valor que será usado no teste de pesca.
-          Quanto maior, menos chances de sucesso na pescaria.
-        rendimento: int - Rendimento máximo de pescado por rede lançada
-  """
-  def __init__(self, dif, rend):
-    self._dificuldade = dif
-    self._rendimento = rend
+  def teste_lote(self, destrezas, resistencias, danos, gerador):
+    u""" Realiza de uma vez o teste() de vários barcos que enfrentam este perigo.
 
-  def pesque(self, destreza):
-    u""" Realiza um teste de destreza de pesca, para decidir como foi o lançamento de uma rede.
-      Returns:
-        int - Valor maior ou igual a zero indica a quantidade de pescado resultante, em Kg.
-              negativo indica de danos ocorridos nas redes e outro material de pesca.
+        Requer NumPy. Os resultados têm a mesma distribuição de teste().
+
+        Parameters:
+          destrezas, resistencias, danos: numpy.ndarray - Um elemento para cada barco
+          gerador: numpy.random.Generator - Gerador dos dados
+        Returns:
+          numpy.ndarray - O resultado do teste para cada barco
+    """
+    quantos = len(destrezas)
+    dado = gerador.integers(1, 7, quantos)
+    dado_destreza = gerador.integers(1, 7, quantos)
+
+    resultado = dado_destreza + destrezas + resistencias - self._dificuldade - danos
+    resultado = numpy.where(dado_destreza == 1, -1, resultado)
+    return numpy.where(dado <= self._probabilidade, resultado, 1)
+
+  def distribuicao(self, destreza, resistencia, danos):
+    u""" Distribuição exata dos resultados de teste(), com os mesmos argumentos.
+
+        Returns:
+          {resultado:int: probabilidade:float, ...}
     """
-    dado = randint(1, 6)
+    return distribuicao_perigo(self._probabilidade, self._dificuldade,
+                               destreza, resistencia, danos)
+
+  def probabilidade_dano_grave(self, destreza, resistencia, danos):
+    u""" Probabilidade de um dano grave: naufrágio, ou atraso de 2 dias na ventania.
+    """
+    probabilidade = 0
+    for (resultado, p) in self.distribuicao(destreza, resistencia, danos).items():
+      if resultado < -1:
+        probabilidade += p
+    return probabilidade
     
-    # Independente da destreza, sempre há uma chance de tudo dar errado.
-    if dado == 1:
-      return 0
-    else:
-      resultado = int(dado + destreza - self._dificuldade)
-      
-      if resultado <= 0:
-        return resultado
-      else:
-        if resultado > 5: resultado = 5
-        return int(self._rendimento * resultado * 0.2)
 
+# Estoques de pescado
+#
+# Cada pesqueiro tem uma biomassa de peixes, em Kg, que a pesca reduz e que se recompõe a
+# cada alvorada pelo modelo logístico B = B + r·B·(1 - B/K), onde K é a capacidade do
+# pesqueiro. O rendimento das redes é proporcional à fração B/K: com sobre-pesca, as redes
+# voltam vazias até os peixes se reproduzirem. As biomassas de todos os pesqueiros de um
+# mapa ficam em um só vetor, recomposto de uma vez (com NumPy, se disponível).
 
-class Mercado:    
-  u""" Regula operações de compra e venda
-  
+TAXA_REPRODUCAO = 0.2
+CAPACIDADE_POR_RENDIMENTO = 40    # Capacidade do pesqueiro, em redes de rendimento máximo
+RESERVA_PESCADO = 0.05            # Fração da capacidade fora do alcance das redes
+
+class Estoques:
+  u""" Biomassas dos pesqueiros de um mapa.
+
+      Attributes:
+        biomassa, capacidade: array('d') - Biomassa atual e máxima de cada pesqueiro, em Kg.
+          Um pesqueiro sem capacidade (rendimento zero no mapa) fica sempre vazio.
+        taxa: float - Taxa de reprodução diária, quando a biomassa é pequena
+  """
+  __slots__ = (u'_biomassa', u'_capacidade', u'_taxa')
+
+  def __init__(self, taxa = TAXA_REPRODUCAO):
+    self._biomassa = array(u'd')
+    self._capacidade = array(u'd')
+    self._taxa = taxa
+
+  def __len__(self):
+    return len(self._biomassa)
+
+  def inclua(self, capacidade):
+    u""" Inclui um pesqueiro, com a biomassa igual à capacidade.
+
+        Returns:
+          int - Índice do pesqueiro
+    """
+    capacidade = max(0, capacidade)
+    self._biomassa.append(capacidade)
+    self._capacidade.append(capacidade)
+    return len(self._biomassa) - 1
+
+  def biomassa(self, indice):
+    return self._biomassa[indice]
+
+  def capacidade(self, indice):
+    return self._capacidade[indice]
+
+  def fracao(self, indice):
+    u""" Fração da capacidade ocupada pelos peixes, entre 0 e 1.
+    """
+    if self._capacidade[indice] <= 0:
+      return 0.0
+    return self._biomassa[indice] / self._capacidade[indice]
+
+  def disponivel(self, indice):
+    u""" Quantos Kg ainda podem ser pescados, antes da reserva.
+    """
+    return max(0, int(self._biomassa[indice] - RESERVA_PESCADO * self._capacidade[indice]))
+
+  def retire(self, indice, quant):
+    u""" Retira pescado de um pesqueiro, limitado ao disponível.
+
+        Returns:
+          int - Quantos Kg foram retirados
+    """
+    quant = min(quant, self.disponivel(indice))
+    self._biomassa[indice] -= quant
+    return quant
+
+  def regenere(self):
+    u""" Recompõe, de uma vez, a biomassa de todos os pesqueiros, por um dia.
+    """
+    if len(self._biomassa) == 0:
+      return
+    r = self._taxa
+    if numpy is not None:
+      # Vistas sobre os mesmos vetores, sem cópia.
+      b = numpy.frombuffer(self._biomassa)
+      k = numpy.frombuffer(self._capacidade)
+      if k.min() > 0:
+        b += r * b * (1 - b / k)
+      else:
+        # Pesqueiros sem capacidade ficam de fora.
+        com_peixes = k > 0
+        (b1, k1) = (b[com_peixes], k[com_peixes])
+        b[com_peixes] = b1 + r * b1 * (1 - b1 / k1)
+    else:
+      biomassa = self._biomassa
+      for (i, k) in enumerate(self._capacidade):
+        if k > 0:
+          b = biomassa[i]
+          biomassa[i] = b + r * b * (1 - b / k)
+
+  def biomassas(self):
+    u""" Biomassa de cada pesqueiro, na ordem dos índices.
+
+        Returns:
+          array('d')
+    """
+    return self._biomassa
+
+  def copie_estado(self):
+    return array(u'd', self._biomassa)
+
+  def restaure_estado(self, copia):
+    u""" Restaura as biomassas de copie_estado(), ou de uma lista salva com biomassas().
+    """
+    self._biomassa[:] = array(u'd', copia)
+
+
+class Pesca:
+  u""" Atributos de pesca de uma posição
+ 
+      Attributes:
+        dificuldade: int - Valor que será usado no teste de pesca.
+          Quanto maior, menos chances de sucesso na pescaria.
+        rendimento: int - Rendimento máximo de pescado por rede lançada
+        estoques: Estoques - Onde está a biomassa deste pesqueiro, se houver.
+          Sem estoques, o pescado nunca se esgota.
+        indice: int - Índice do pesqueiro nos estoques
+  """
+  __slots__ = (u'_dificuldade', u'_rendimento', u'_estoques', u'_indice')
+
+  def __init__(self, dif, rend):
+    self._dificuldade = dif
+    self._rendimento = rend
+    self._estoques = None
+    self._indice = None
+
+  def dificuldade(self):
+    return self._dificuldade
+
+  def rendimento(self):
+    return self._rendimento
+
+  def inclua_em(self, estoques):
+    u""" Passa a pescar da biomassa de um pesqueiro novo nos estoques, com capacidade
+        proporcional ao rendimento.
+    """
+    self._estoques = estoques
+    self._indice = estoques.inclua(CAPACIDADE_POR_RENDIMENTO * self._rendimento)
+
+  def estoque(self):
+    u""" Biomassa atual e capacidade do pesqueiro, em Kg, ou None se não há estoques.
+    """
+    if self._estoques is None:
+      return None
+    return (self._estoques.biomassa(self._indice), self._estoques.capacidade(self._indice))
+
+  def fracao_estoque(self):
+    u""" Fração da capacidade do pesqueiro ocupada pelos peixes (1 se não há estoques).
+    """
+    if self._estoques is None:
+      return 1.0
+    return self._estoques.fracao(self._indice)
+
+  def lance(self, destreza, sorteio = randint):
+    u""" Realiza um teste de destreza de pesca, para decidir como foi o lançamento de uma rede.
+      Parameters:
+        sorteio: function(a, b) - Sorteia um inteiro entre a e b, como random.randint.
+      Returns:
+        int - Valor entre 1 e 5 indica o sucesso do lançamento (ver pescado()).
+              Zero ou negativo indica rede vazia; abaixo de -1, danos nas redes
+              e outro material de pesca.
+    """
+    dado = sorteio(1, 6)
+    
+    # Independente da destreza, sempre há uma chance de tudo dar errado.
+    if dado == 1:
+      return 0
+    else:
+      resultado = int(dado + destreza - self._dificuldade)
+      if resultado > 5: resultado = 5
+      return resultado
+
+  def pescado(self, nivel):
+    u""" Quantidade de pescado de um lançamento bem sucedido, em Kg, sem retirá-la.
+
+        Parameters:
+          nivel: int - Resultado positivo de lance()
+        Notes:
+          O pescado é proporcional à biomassa atual do pesqueiro, e limitado
+          ao disponível.
+    """
+    if self._estoques is None:
+      return int(self._rendimento * nivel * 0.2)
+    pescado = int(self._rendimento * nivel * 0.2 * self.fracao_estoque())
+    return min(pescado, self._estoques.disponivel(self._indice))
+
+  def retire(self, quant):
+    u""" Retira da biomassa do pesqueiro o pescado efetivamente levado.
+
+        Returns:
+          int - Quantos Kg foram retirados
+    """
+    if self._estoques is None:
+      return quant
+    return self._estoques.retire(self._indice, quant)
+
+  def pesque(self, destreza, sorteio = randint):
+    u""" Lança uma rede e retira o pescado do pesqueiro.
+      Parameters:
+        sorteio: function(a, b) - Sorteia um inteiro entre a e b, como random.randint.
+      Returns:
+        int - Valor maior ou igual a zero indica a quantidade de pescado resultante, em Kg.
+              negativo indica de danos ocorridos nas redes e outro material de pesca.
+    """
+    resultado = self.lance(destreza, sorteio)
+    if resultado <= 0:
+      return resultado
+    return self.retire(self.pescado(resultado))
+
+  def lance_lote(self, destrezas, gerador):
+    u""" Realiza de uma vez vários lançamentos de rede neste pesqueiro.
+
+        Requer NumPy. Os resultados têm a mesma distribuição de lance(). O pescado
+        depende da biomassa no momento de cada lançamento, e é calculado depois,
+        rede a rede, com pescado().
+
+        Parameters:
+          destrezas: numpy.ndarray - Destreza da tripulação, um elemento por rede lançada
+          gerador: numpy.random.Generator - Gerador dos dados
+        Returns:
+          numpy.ndarray - O resultado de cada lançamento
+    """
+    dado = gerador.integers(1, 7, len(destrezas))
+    resultado = numpy.minimum(dado + destrezas - self._dificuldade, 5)
+    return numpy.where(dado == 1, 0, resultado)
+
+  def distribuicao(self, destreza):
+    u""" Distribuição exata dos resultados de pesque(), com a mesma destreza,
+        com o pesqueiro na capacidade máxima.
+
+        Returns:
+          {resultado:int: probabilidade:float, ...}
+    """
+    return distribuicao_pesca(destreza, self._dificuldade, self._rendimento)
+
+  def pescado_esperado(self, destreza):
+    u""" Quantidade esperada de pescado por rede lançada, em Kg, com a biomassa atual.
+    """
+    esperado = 0
+    for (resultado, p) in self.distribuicao(destreza).items():
+      if resultado > 0:
+        esperado += resultado * p
+    return esperado * self.fracao_estoque()
+
+
+class Mercado:    
+  u""" Regula operações de compra e venda
+  
       Attributes:
         preco_*: int - Preços dos diversos produtos
+        livro: Livro - Onde são lançadas as vendas, se houver (ver use_livro())
         
       Notes:
         Nos preços de cursos, o valor de cada posição é o custo de fazer um curso 
@@ -530,39 +1564,97 @@ class Mercado:
     self._preco_pescado = 0
     self._preco_racao = 100000
 
-  def defina_precos_do_dia(self):
+    self._livro = None
+    self._conta = None
+
+  def use_livro(self, livro, conta):
+    u""" Passa a lançar as vendas e compras deste mercado em um livro.
+
+        Parameters:
+          livro: Livro - O livro do jogo
+          conta:str - Conta do mercado no livro (ver conta_mercado())
+    """
+    self._livro = livro
+    self._conta = conta
+
+  def lance_venda(self, pescador, bem, quant, valor, motivo = None):
+    u""" Lança no livro uma venda já feita: o dinheiro do pescador para o mercado,
+        e o bem do mercado para o pescador.
+    """
+    if self._livro is not None:
+      self._livro.lance(VENDA if motivo is None else motivo,
+                        [(pescador.nome(), DINHEIRO, -valor), (self._conta, DINHEIRO, valor),
+                         (self._conta, bem, -quant), (pescador.nome(), bem, quant)])
+
+  def defina_precos_do_dia(self, sorteio = randint):
     u""" Calcula os preços que variam diariamente, conforme o mercado.
+
+        Parameters:
+          sorteio: function(a, b) - Sorteia um inteiro entre a e b, como random.randint.
     """
-    self._preco_racao = 8 + 2 * randint(1, 6)
-    self._preco_pescado = 3 + 2 * randint(1, 6)
+    self._preco_racao = 8 + 2 * sorteio(1, 6)
+    self._preco_pescado = 3 + 2 * sorteio(1, 6)
     
+  def preco_racao(self):
+    return self._preco_racao
+
+  def preco_rede(self):
+    return self._preco_rede
+
+  def preco_curso(self, nivel):
+    u""" Preço do curso que leva a destreza a este nível, ou None se não há curso.
+    """
+    if 0 < nivel < len(self._precos_cursos):
+      return self._precos_cursos[nivel]
+    return None
+
+  def preco_barco(self, tipo):
+    u""" Preço de um barco do tipo dado (BARCO_SIMPLES ou BARCO_REFORCADO).
+    """
+    if tipo == BARCO_REFORCADO:
+      return 1950
+    return 1000
+
+  def copie_estado(self):
+    u""" Retorna os preços que variam durante o jogo.
+    """
+    return (self._preco_racao, self._preco_pescado)
+
+  def restaure_estado(self, copia):
+    (self._preco_racao, self._preco_pescado) = copia
+
   def consulte_precos(self):
     u""" Informa tabela de preços
     
         Returns:
-          [(item:str, valor: int), ...] - Pares com nome do ítem e valor no mercado
+          [(item:str, valor: int), ...] - Pares com nome do ítem e valor no mercado.
+            Os nomes são traduzidos na apresentação (ver PrecosDoDia).
     """
-    precos = [(_(u'rede'), self._preco_rede),
-              (_(u'ração'), self._preco_racao),
-              (_(u'pescado'), self._preco_pescado),
-              (_(u'curso de nível 1'), self._precos_cursos[1]),
-              (_(u'curso de nível 2'), self._precos_cursos[2]),
-              (_(u'curso de nível 3'), self._precos_cursos[3]),
-              (_(u'barco simples'), 1000),
-              (_(u'barco reforçado'), 1950)]
+    precos = [(N_(u'rede'), self._preco_rede),
+              (N_(u'ração'), self._preco_racao),
+              (N_(u'pescado'), self._preco_pescado),
+              (N_(u'curso de nível 1'), self._precos_cursos[1]),
+              (N_(u'curso de nível 2'), self._precos_cursos[2]),
+              (N_(u'curso de nível 3'), self._precos_cursos[3]),
+              (N_(u'barco simples'), self.preco_barco(BARCO_SIMPLES)),
+              (N_(u'barco reforçado'), self.preco_barco(BARCO_REFORCADO))]
     return precos
     
     
-  def fabrique_barco(self, tipo, nome):
+  def fabrique_barco(self, tipo, nome, fabrica = Barco):
     u""" Fabrica um novo barco com o tipo e nome dados.
 
+        Parameters:
+          tipo:int - Tipo do barco, BARCO_SIMPLES ou BARCO_REFORCADO
+          fabrica: function(tipo, nome, lot, cap, resist) - Cria o barco, como Barco().
+
         Returns:
           (barco: Barco, preco: int)
     """
-    if (tipo == _(u'reforçado')):
-      return (Barco(tipo, nome, 2, 400, 3), 1950)
+    if (tipo == BARCO_REFORCADO):
+      return (fabrica(BARCO_REFORCADO, nome, 2, 400, 3), self.preco_barco(tipo))
     else:
-      return (Barco(_(u'simples'), nome, 1, 150, 1), 1000)
+      return (fabrica(BARCO_SIMPLES, nome, 1, 150, 1), self.preco_barco(tipo))
     
   def venda_barco(self, pescador, barco, preco):
     u""" Vende um barco a um pescador.
@@ -578,15 +1670,17 @@ class Mercado:
     """
     if pescador.debite(preco):
       pescador.adicione_barco(barco)
+      self.lance_venda(pescador, BARCO, 1, preco)
       return True
     return False
       
-  def venda_racoes(self, pescador, quant):
+  def venda_racoes(self, pescador, quant, motivo = None):
     u""" Vende rações a um pescador.
     
         Attributes:
           pescador: Pescador - O pescador que está comprando as rações
           quant:int - Quantas diárias de ração
+          motivo:int - Motivo lançado no livro. Se None, VENDA.
           
         Returns:
           True - Venda realidada
@@ -594,6 +1688,7 @@ class Mercado:
     """
     if pescador.debite(quant * self._preco_racao):
       pescador.adicione_racoes(quant)
+      self.lance_venda(pescador, RACOES, quant, quant * self._preco_racao, motivo)
       return True
     else:
       return False
@@ -611,6 +1706,7 @@ class Mercado:
     """
     if pescador.debite(quant * self._preco_rede):
       pescador.adicione_redes(quant)
+      self.lance_venda(pescador, REDES, quant, quant * self._preco_rede)
       return True
     else:
       return False
@@ -634,6 +1730,7 @@ class Mercado:
     if ((destreza_nova < len(self._precos_cursos)) and
         pescador.debite(self._precos_cursos[destreza_nova])):
       pescador.aumentar_destreza_em_navegacao()
+      self.lance_venda(pescador, CURSO, 1, self._precos_cursos[destreza_nova])
       return True
     else:
       return False
@@ -658,6 +1755,7 @@ class Mercado:
     if ((destreza_nova < len(self._precos_cursos)) and
         pescador.debite(self._precos_cursos[destreza_nova])):
       pescador.aumentar_destreza_na_pesca()
+      self.lance_venda(pescador, CURSO, 1, self._precos_cursos[destreza_nova])
       return True
     else:
       return False
@@ -675,11 +1773,13 @@ class Porto:
   u""" Operações ligadas à estadia de barcos e pescadores em um porto.
   
       Attributes:
-        pescadores_em_terra: [Pescador, ...] - Os pescadores que estão fora dos barcos
+        pescadores_em_terra: ColecaoOrdenada - Os pescadores que estão fora dos barcos
         mercado: Mercado - Se este porto negocia bens
   """
+  __slots__ = (u'_pescadores_em_terra', u'_mercado')
+
   def __init__(self):
-    self._pescadores_em_terra = []
+    self._pescadores_em_terra = ColecaoOrdenada()
     self._mercado = None
     
   def crie_mercado(self):
@@ -689,6 +1789,19 @@ class Porto:
     
   def mercado(self):
     return self._mercado
+
+  def copie_estado(self):
+    u""" Retorna uma cópia dos pescadores em terra e dos preços do mercado.
+    """
+    if self._mercado is None:
+      return (self._pescadores_em_terra.copie(), None)
+    return (self._pescadores_em_terra.copie(), self._mercado.copie_estado())
+
+  def restaure_estado(self, copia):
+    (pescadores, precos) = copia
+    self._pescadores_em_terra = pescadores.copie()
+    if precos is not None:
+      self._mercado.restaure_estado(precos)
   
   def tem_pescador(self, pescador):
     u""" Indica se certo pescador está no porto.
@@ -700,10 +1813,10 @@ class Porto:
     return pescador in self._pescadores_em_terra
   
   def pescadores_em_terra(self):
-    u""" Retorna lista dos pescadores que estão neste porto.
+    u""" Retorna os pescadores que estão neste porto.
     
         Returns:
-          [Pescador, ...]
+          ColecaoOrdenada - Os pescadores, na ordem de chegada.
     """
     return self._pescadores_em_terra
 
@@ -714,11 +1827,7 @@ class Porto:
           True - Se o pescador foi retornado ao porto nesta operação.
           False - Se o pescador já estava neste porto.
     """
-    if (not self.tem_pescador(pescador)):
-      self._pescadores_em_terra.append(pescador)
-      return True
-    else:
-      return False
+    return self._pescadores_em_terra.adicione(pescador)
 
   def remova_pescador(self, pescador):
     u""" Remove um pescador do porto, para que ele 'embarque'.
@@ -727,11 +1836,7 @@ class Porto:
           True - Se o pescador estava no porto, e foi removido.
           False - Caso contrário
     """
-    if (self.tem_pescador(pescador)):
-      self._pescadores_em_terra.remove(pescador)
-      return True
-    else:
-      return False
+    return self._pescadores_em_terra.remova(pescador)
 
 
 class Posicao:
@@ -745,7 +1850,13 @@ class Posicao:
         perigo: Perigo - Perigo de navegação ao deixar esta posição, se houver
         pesca: Pesca - Características do pesqueiro, se houver
         porto: Porto - Se não nulo, indica que nesta posição existe um porto.
+        indice: int - Número desta posição no mapa, usado pelo GrafoMapa.
+        grafo: GrafoMapa - Se não nulo, a posição faz parte de um mapa, e as coordenadas
+          e adjacências ficam guardadas no grafo (ver use_grafo()).
   """
+  __slots__ = (u'_nome', u'_descricao', u'_coord_x', u'_coord_y', u'_adjacencias',
+               u'_perigo', u'_pesqueiro', u'_porto', u'_indice', u'_grafo')
+
   def __init__(self, nome, descr, coord_x, coord_y):
     self._nome = nome
     self._descricao = descr
@@ -755,9 +1866,30 @@ class Posicao:
     self._perigo = None
     self._pesqueiro = None
     self._porto = None
+    self._indice = None
+    self._grafo = None
     
   def nome(self):
     return self._nome
+
+  def use_grafo(self, grafo):
+    u""" Passa a consultar as coordenadas e adjacências no grafo do mapa, que as
+        guarda a partir daqui. A posição deve estar numerada no grafo.
+    """
+    self._grafo = grafo
+    self._coord_x = None
+    self._coord_y = None
+    self._adjacencias = None
+
+  def defina_indice(self, indice):
+    u""" Numera esta posição no mapa. Ver GrafoMapa.
+    """
+    self._indice = indice
+
+  def indice(self):
+    u""" Retorna o número desta posição no mapa, ou None se não pertence a um mapa.
+    """
+    return self._indice
   
   def coordenadas(self):
     u""" Indicas coordenadas da posição em um par ordenado: (longitude, latitude)
@@ -766,16 +1898,23 @@ class Posicao:
           As coordenadas são dadas em graus e frações, relativas ao
           Equador e ao Meridiano de Greenwich
     """
+    if self._grafo is not None:
+      return self._grafo.coordenadas_posicao(self._indice)
     return (self._coord_x, self._coord_y)
     
   def adicione_adjacencia(self, pos):
     u""" Adiciona posição adjacente a esta em um mapa.
     """
-    self._adjacencias.append(pos)
+    if self._grafo is not None:
+      self._grafo.adicione_rota(self._indice, pos.indice())
+    else:
+      self._adjacencias.append(pos)
     
   def adjacencias(self):
     u""" Retorna lista de posições adjacentes a esta em um mapa.
     """
+    if self._grafo is not None:
+      return [self._grafo.posicao(indice) for indice in self._grafo.vizinhos(self._indice)]
     return self._adjacencias
     
   def defina_perigo(self, perigo):
@@ -785,6 +1924,8 @@ class Posicao:
           O perigo se manifesta quando um barco deixa a posição.
     """
     self._perigo = perigo
+    if self._grafo is not None:
+      self._grafo.defina_perigo(self._indice, perigo)
     
   def perigo(self):
     # TODO: Múltiplos perigos?
@@ -794,6 +1935,8 @@ class Posicao:
     u""" Associa características de pesqueiro a esta posição.
     """
     self._pesqueiro = pesca
+    if self._grafo is not None:
+      self._grafo.defina_pesqueiro(self._indice, pesca)
     
   def pesqueiro(self):
     return self._pesqueiro
@@ -807,6 +1950,329 @@ class Posicao:
     return self._porto
   
 
+class GrafoMapa:
+  u""" Representação compacta de um mapa, com as posições numeradas de 0 a n-1.
+
+      As adjacências ficam no formato CSR: os vizinhos da posição i são
+      destinos[inicio[i]:inicio[i + 1]]. Os atributos de cada posição ficam em
+      vetores (array.array), indexados pelo número da posição, que podem ser
+      usados diretamente com numpy.asarray(), sem cópia.
+
+      O grafo guarda a estrutura do mapa: depois de montado, as posições (Posicao)
+      consultam nele as suas coordenadas e adjacências, e as alterações feitas pelas
+      posições (rotas, perigos e pesqueiros) são gravadas nos vetores. As posições
+      continuam sendo a forma usual de consultar o mapa, e Posicao.indice() dá o
+      número de cada uma no grafo.
+
+      Attributes:
+        nomes: [str, ...] - Nome de cada posição
+        inicio, destinos: array('l') - Adjacências, no formato CSR
+        coord_x, coord_y: array('d') - Coordenadas de cada posição
+        pesca_dificuldade, pesca_rendimento: array('l') - Atributos do pesqueiro.
+          Rendimento -1 indica que não há pesqueiro na posição.
+        perigo_probabilidade, perigo_dificuldade: array('l') - Atributos do perigo.
+          Probabilidade 0 indica que não há perigo na posição.
+        planejadores: {chave: PlanejadorRotas} - Rotas já calculadas (ver planejador_de_rotas()).
+          Descartados quando o grafo é alterado.
+        posicoes: [Posicao, ...] - As posições, na ordem dos índices
+  """
+  def __init__(self, posicoes):
+    u""" Monta o grafo a partir das posições, já numeradas com Posicao.defina_indice(),
+        e as transforma em vistas sobre o grafo (ver Posicao.use_grafo()).
+
+        Parameters:
+          posicoes: [Posicao, ...] - As posições do mapa, na ordem dos índices
+    """
+    self._posicoes = list(posicoes)
+    self._nomes = []
+    self._indices = {}
+    self._inicio = array(u'l', [0])
+    self._destinos = array(u'l')
+    self._coord_x = array(u'd')
+    self._coord_y = array(u'd')
+    self._pesca_dificuldade = array(u'l')
+    self._pesca_rendimento = array(u'l')
+    self._perigo_probabilidade = array(u'l')
+    self._perigo_dificuldade = array(u'l')
+    self._planejadores = {}
+
+    for posicao in posicoes:
+      self._indices[posicao.nome()] = len(self._nomes)
+      self._nomes.append(posicao.nome())
+
+      for destino in posicao.adjacencias():
+        self._destinos.append(destino.indice())
+      self._inicio.append(len(self._destinos))
+
+      (x, y) = posicao.coordenadas()
+      self._coord_x.append(x)
+      self._coord_y.append(y)
+
+      pesca = posicao.pesqueiro()
+      if pesca is None:
+        self._pesca_dificuldade.append(0)
+        self._pesca_rendimento.append(-1)
+      else:
+        self._pesca_dificuldade.append(pesca.dificuldade())
+        self._pesca_rendimento.append(pesca.rendimento())
+
+      perigo = posicao.perigo()
+      if perigo is None:
+        self._perigo_probabilidade.append(0)
+        self._perigo_dificuldade.append(0)
+      else:
+        self._perigo_probabilidade.append(perigo.probabilidade())
+        self._perigo_dificuldade.append(perigo.dificuldade())
+
+    for posicao in self._posicoes:
+      posicao.use_grafo(self)
+
+  def posicao(self, indice):
+    return self._posicoes[indice]
+
+  def coordenadas_posicao(self, indice):
+    return (self._coord_x[indice], self._coord_y[indice])
+
+  def adicione_rota(self, origem, destino):
+    u""" Acrescenta uma rota de origem a destino (índices), ao fim dos vizinhos da origem.
+    """
+    self._destinos.insert(self._inicio[origem + 1], destino)
+    for i in range(origem + 1, len(self._inicio)):
+      self._inicio[i] += 1
+    self._planejadores.clear()
+
+  def defina_perigo(self, indice, perigo):
+    if perigo is None:
+      (self._perigo_probabilidade[indice], self._perigo_dificuldade[indice]) = (0, 0)
+    else:
+      self._perigo_probabilidade[indice] = perigo.probabilidade()
+      self._perigo_dificuldade[indice] = perigo.dificuldade()
+    self._planejadores.clear()
+
+  def defina_pesqueiro(self, indice, pesca):
+    if pesca is None:
+      (self._pesca_dificuldade[indice], self._pesca_rendimento[indice]) = (0, -1)
+    else:
+      self._pesca_dificuldade[indice] = pesca.dificuldade()
+      self._pesca_rendimento[indice] = pesca.rendimento()
+    self._planejadores.clear()
+
+  def quantas(self):
+    u""" Quantidade de posições no grafo.
+    """
+    return len(self._nomes)
+
+  def nomes(self):
+    u""" Nomes das posições, na ordem dos índices.
+    """
+    return self._nomes
+
+  def indice(self, nome):
+    u""" Retorna o índice da posição com o nome dado, ou None.
+    """
+    return self._indices.get(nome)
+
+  def vizinhos(self, indice):
+    u""" Retorna os índices das posições adjacentes a uma posição.
+
+        Returns:
+          array('l') - Índices dos destinos, na ordem das rotas do mapa
+    """
+    return self._destinos[self._inicio[indice]:self._inicio[indice + 1]]
+
+  def adjacencias(self):
+    u""" Retorna as adjacências no formato CSR.
+
+        Returns:
+          (inicio: array('l'), destinos: array('l'))
+    """
+    return (self._inicio, self._destinos)
+
+  def coordenadas(self):
+    u""" Retorna as coordenadas de todas as posições.
+
+        Returns:
+          (coord_x: array('d'), coord_y: array('d'))
+    """
+    return (self._coord_x, self._coord_y)
+
+  def pesqueiros(self):
+    u""" Retorna atributos de pesca de todas as posições.
+
+        Returns:
+          (dificuldade: array('l'), rendimento: array('l'))
+    """
+    return (self._pesca_dificuldade, self._pesca_rendimento)
+
+  def perigos(self):
+    u""" Retorna atributos de perigo de todas as posições.
+
+        Returns:
+          (probabilidade: array('l'), dificuldade: array('l'))
+    """
+    return (self._perigo_probabilidade, self._perigo_dificuldade)
+
+  def planejadores(self):
+    u""" Planejadores de rotas já calculados sobre este grafo, por características
+        do barco. Ver planejador_de_rotas().
+
+        Returns:
+          {(destreza, resistencia, danos, penalidade): PlanejadorRotas}
+    """
+    return self._planejadores
+
+  def tem_pesqueiro(self, indice):
+    return self._pesca_rendimento[indice] >= 0
+
+  def tem_perigo(self, indice):
+    return self._perigo_probabilidade[indice] > 0
+
+
+# Rotas
+#
+# O planejador de rotas calcula os caminhos de menor custo entre todas as posições
+# de um mapa, considerando os perigos. O custo de deixar uma posição é o número
+# esperado de dias até chegar à próxima (atrasos de ventania incluídos), mais uma
+# penalidade proporcional à probabilidade de naufrágio.
+
+PENALIDADE_NAUFRAGIO = 20
+
+def planejador_de_rotas(mapa, destreza = 0, resistencia = 1, danos = 0,
+                        penalidade = PENALIDADE_NAUFRAGIO):
+  u""" Retorna o planejador de rotas de um mapa, para um barco com as características dadas.
+
+      Os planejadores ficam guardados no grafo do mapa, e são reaproveitados
+      enquanto o grafo existir. Vão embora junto com ele.
+
+      Returns:
+        PlanejadorRotas
+  """
+  grafo = mapa.grafo()
+  planejadores = grafo.planejadores()
+  chave = (destreza, resistencia, danos, penalidade)
+  planejador = planejadores.get(chave)
+  if planejador is None:
+    planejador = PlanejadorRotas(mapa, destreza, resistencia, danos, penalidade)
+    planejadores[chave] = planejador
+  return planejador
+
+
+class PlanejadorRotas:
+  u""" Caminhos de menor custo entre as posições de um mapa.
+
+      Os caminhos que partem de cada origem são calculados (Dijkstra) na primeira
+      consulta, e guardados. calcule_todas() calcula de uma vez os de todas as origens.
+
+      Attributes:
+        grafo: GrafoMapa - O mapa, em forma compacta
+        dias: [float, ...] - Dias esperados para deixar cada posição
+        naufragio: [float, ...] - Probabilidade de naufrágio ao deixar cada posição
+        custo_saida: [float, ...] - Custo de deixar cada posição
+  """
+  def __init__(self, mapa, destreza = 0, resistencia = 1, danos = 0,
+               penalidade = PENALIDADE_NAUFRAGIO):
+    self._grafo = mapa.grafo()
+    self._dias = []
+    self._naufragio = []
+    self._custo_saida = []
+    self._caminhos = {}
+
+    for indice in range(self._grafo.quantas()):
+      dias = 1.0
+      naufragio = 0.0
+      perigo = mapa.posicao_de_indice(indice).perigo()
+      if perigo is not None:
+        grave = perigo.probabilidade_dano_grave(destreza, resistencia, danos)
+        leve = perigo.distribuicao(destreza, resistencia, danos).get(-1, 0)
+        if perigo.nome() == u'ventania':
+          # Na ventania, o dano grave atrasa 2 dias, e o leve, 1 dia.
+          dias += 2 * grave + leve
+        else:
+          naufragio = grave
+      self._dias.append(dias)
+      self._naufragio.append(naufragio)
+      self._custo_saida.append(dias + penalidade * naufragio)
+
+  def _caminhos_de(self, origem):
+    u""" Calcula os caminhos de menor custo a partir de uma origem.
+
+        Returns:
+          ([custo:float, ...], [anterior:int, ...]) - Custo até cada posição, e a posição
+            anterior no caminho (-1 para a origem e para as posições inalcançáveis).
+    """
+    caminhos = self._caminhos.get(origem)
+    if caminhos is None:
+      quantas = self._grafo.quantas()
+      custos = [float(u'inf')] * quantas
+      anteriores = [-1] * quantas
+      custos[origem] = 0.0
+      fila = [(0.0, origem)]
+      while len(fila) > 0:
+        (custo, indice) = heapq.heappop(fila)
+        if custo > custos[indice]:
+          continue
+        custo += self._custo_saida[indice]
+        for destino in self._grafo.vizinhos(indice):
+          if custo < custos[destino]:
+            custos[destino] = custo
+            anteriores[destino] = indice
+            heapq.heappush(fila, (custo, destino))
+      caminhos = (custos, anteriores)
+      self._caminhos[origem] = caminhos
+    return caminhos
+
+  def calcule_todas(self):
+    u""" Calcula os caminhos entre todos os pares de posições.
+    """
+    for origem in range(self._grafo.quantas()):
+      self._caminhos_de(origem)
+
+  def custo(self, origem, destino):
+    u""" Custo do melhor caminho entre duas posições, dadas pelo nome.
+
+        Returns:
+          float - O custo, ou infinito se não há caminho.
+    """
+    (custos, anteriores) = self._caminhos_de(self._grafo.indice(origem))
+    return custos[self._grafo.indice(destino)]
+
+  def rota(self, origem, destino):
+    u""" Melhor caminho entre duas posições, dadas pelo nome.
+
+        Returns:
+          [nome:str, ...] - As posições a visitar, sem a origem e com o destino,
+            no formato aceito por Jogo.adicione_rota(). None, se não há caminho.
+    """
+    indice_origem = self._grafo.indice(origem)
+    indice = self._grafo.indice(destino)
+    (custos, anteriores) = self._caminhos_de(indice_origem)
+    if custos[indice] == float(u'inf'):
+      return None
+    nomes = self._grafo.nomes()
+    rota = []
+    while indice != indice_origem:
+      rota.append(nomes[indice])
+      indice = anteriores[indice]
+    rota.reverse()
+    return rota
+
+  def avalie_rota(self, origem, rota):
+    u""" Avalia uma rota, trecho por trecho.
+
+        Returns:
+          (float, float) - Dias esperados de viagem e probabilidade de naufragar
+            em algum dos trechos.
+    """
+    dias = 0.0
+    chegada = 1.0
+    indice = self._grafo.indice(origem)
+    for nome in rota:
+      dias += self._dias[indice]
+      chegada *= 1 - self._naufragio[indice]
+      indice = self._grafo.indice(nome)
+    return (dias, 1 - chegada)
+
+
 class Mapa:
   u""" Um mapa, com diversas posições e suas adjacências
   
@@ -818,6 +2284,11 @@ class Mapa:
           no início do jogo, e para onde retornam os barcos e pescadores resgatados.
         posicoes - lista de posições formando uma rede interligada
                     por rotas de navegação.
+        portos, portos_com_mercado - Índices das posições com porto e com mercado,
+                    mantidos por crie_porto() e crie_mercado().
+        grafo - Representação compacta do mapa (GrafoMapa), que guarda as coordenadas
+                    e adjacências das posições.
+        estoques - Biomassa dos pesqueiros (Estoques).
   """
   def __init__(self):
     self._arquivo_imagem = u''
@@ -826,7 +2297,11 @@ class Mapa:
     self._largura = 0
     self._altura = 0
     self._posicoes = {}
+    self._portos = []
+    self._portos_com_mercado = []
     self._porto_principal = None
+    self._grafo = None
+    self._estoques = Estoques()
     
   def arquivo_imagem(self):
     return self._arquivo_imagem
@@ -847,135 +2322,33 @@ class Mapa:
     y = int(((nw[1] - coord[1]) / (nw[1] - se[1])) * self._altura)
     return (x, y)
 
-  def preencha_mapa(self, nome_arq):
+  def preencha_mapa(self, nome_arq, use_compilado = True):
     u""" Preenche o mapa com diversas posições interconectadas.
     
         Parameters:
           nome_arq:str - Arquivo que descreve o mapa.
+          use_compilado:bool - Se verdadeiro, usa a versão compilada do mapa,
+            guardada ao lado do arquivo (ver carregue_compilado()), e a cria se necessário.
     
         Notes:
           Pelo menos uma posição deve ter um porto com mercado,
           e uma outra deve ter um pesqueiro.
           O arquivo com a descrição do mapa tem formato .CSV,
-          formando diversas tabelas, conforme descrito no corpo deste método.
+          formando diversas tabelas, conforme descrito em leia_tabelas_mapa().
               
     """
-    mensagens = []
-    arq_mapa = open(nome_arq, u'rb')
-    
-    # Estados possíveis: (I)nício, (D)imensões, (P)osições, (R)otas, Pes(Q)eiro,
-    #                    Peri(G)o , (F)im
-    # Sub-estado 0 - Esperando cabeçalho, Sub-estado 1 - Lendo dados.
-    estado = u'I'
-    
-    for linha in arq_mapa.readlines():
-      linha = linha.decode(u'utf-8').strip()
-      campos = linha.strip(u'\t').split(u'\t')
-      
-      if (len(campos) > 0 and len(campos[0]) > 0):
-        # Linha tem conteúdo
-        if estado == u'I':
-          if campos[0] == u'Pescadores – Mapa':
-            estado = u'D0'
-          else:
-            mensagens.append(_(u'Formato de arquivo inválido. Falta cabeçalho.'))
-            break
-        elif estado == u'D0':
-          if (linha.strip() == u'Largura\tAltura\tNorte\tSul\tLeste\tOeste\tImagem'):
-            estado = u'D1'
-          else:
-            mensagens.append(_(u'Formato de arquivo inválido. Esperava dimensões.'))
-            break
-        elif estado == u'D1':
-          if len(campos) == 7:
-            self._largura = int(campos[0])
-            self._altura = int(campos[1])
-            self._nw = Posicao(u'NW', _(u'Noroeste'),
-                               strtofloat(campos[5]), strtofloat(campos[2]))
-            self._se = Posicao(u'SE', _(u'Sudeste'),
-                               strtofloat(campos[4]), strtofloat(campos[3]))
-            self._arquivo_imagem = campos[6]
-            estado = u'P0'
-          else:
-            mensagens.append(_(u'Formato de arquivo inválido. Dimensões inválidas.'))
-            break
-        elif estado == u'P0':
-          if (linha.strip() == u'Posição\tPrincipal\tPorto\tMercado\tLatitude\tLongitude\tDescrição'):
-            estado = u'P1'
-          else:
-            mensagens.append(_(u'Formato de arquivo inválido. Esperava posições.'))
-            break
-        elif estado == u'P1':
-          if len(campos) == 7:
-            posicao = Posicao(campos[0], campos[6],
-                              strtofloat(campos[5]), strtofloat(campos[4]))
-            if campos[2] == u'S':
-              posicao.crie_porto()
-              if campos[3] == u'S':
-                posicao.porto().crie_mercado()
-
-            if campos[1] == u'S':
-              self._porto_principal = posicao
-              
-            self._posicoes[campos[0]] = posicao
-          else:
-            estado = u'R0'
-        elif estado == u'R1':
-          if len(campos) == 2:
-            origem = self._posicoes[campos[0]]
-            destino = self._posicoes[campos[1]]
-            origem.adicione_adjacencia(destino)
-          else:
-            estado = u'Q0'
-        elif estado == u'Q1':
-          if len(campos) == 3:
-            posicao = self._posicoes[campos[0]]
-            dificuldade = int(campos[1])
-            rendimento = int(campos[2].strip())
-            posicao.defina_pesqueiro(Pesca(dificuldade, rendimento))
-          else:
-            estado = u'G0'
-        elif estado == u'Q1':
-          if len(campos) == 3:
-            posicao = self._posicoes[campos[0]]
-            dificuldade = int(campos[1])
-            rendimento = int(campos[2])
-            posicao.defina_pesqueiro(Pesca(dificuldade, rendimento))
-          else:
-            estado = u'G0'
-        elif estado == u'G1':
-          if len(campos) == 5:
-            posicao = self._posicoes[campos[1]]
-            probabilidade = int(campos[2])
-            dificuldade = int(campos[3])
-            descricao = campos[4]
-            posicao.defina_perigo(Perigo(campos[0], descricao, probabilidade, dificuldade))
-          else:
-            estado = u'F'
+    tabelas = None
+    if use_compilado:
+      tabelas = carregue_compilado(nome_arq)
+
+    if tabelas is None:
+      (tabelas, mensagens) = leia_tabelas_mapa(nome_arq)
+      if use_compilado and len(mensagens) == 0:
+        salve_compilado(nome_arq, tabelas)
+    else:
+      mensagens = []
 
-        # Nota: Aqui, o estado escorre sem ler nova linha. Não usar elif.
-        if estado == u'R0':
-          if (linha.strip() == u'Origem\tDestino'):
-            estado = u'R1'
-          else:
-            mensagens.append(_(u'Formato de arquivo inválido. Esperava rotas.'))
-            break
-        elif estado == u'Q0':
-          if (linha.strip() == u'Pesqueiro\tDificuldade\tRendimento'):
-            estado = u'Q1'
-          else:
-            mensagens.append(_(u'Formato de arquivo inválido. Esperava pesqueiros.'))
-            break
-        elif estado == u'G0':
-          if (linha.strip() == u'Perigo\tPosição\tProbabilidade\tDificuldade\tDescrição'):
-            estado = u'G1'
-          else:
-            mensagens.append(_(u'Formato de arquivo inválido. Esperava perigos.'))
-            break
-        elif estado == u'F':
-          mensagens.append(_(u'Formato de arquivo inválido. Linhas desconhecidas.'))
-          
-    arq_mapa.close()
+    self.monte_mapa(tabelas)
     
     if self._porto_principal is None:
       mensagens.append(_(u'Mapa não contém um porto principal.'))
@@ -985,35 +2358,1081 @@ class Mapa:
       mensagens.append(_(u'Porto principal indicado não é um mercado.'))
       
     return mensagens
-      
-  def porto_principal(self):
-    u""" Indica posição onde está o porto principal, com mercado.
-    
-        Returns:
-          Posicao
-    """
+
+  def monte_mapa(self, tabelas):
+    u""" Monta posições, rotas, pesqueiros e perigos a partir das tabelas do mapa.
+
+        Parameters:
+          tabelas: {str: ...} - Tabelas lidas por leia_tabelas_mapa()
+        Notes:
+          Substitui o que já houver no mapa.
+    """
+    self._posicoes = {}
+    self._portos = []
+    self._portos_com_mercado = []
+    self._porto_principal = None
+    (self._largura, self._altura) = tabelas[u'dimensoes']
+    (x, y) = tabelas[u'nw']
+    self._nw = Posicao(u'NW', _(u'Noroeste'), x, y)
+    (x, y) = tabelas[u'se']
+    self._se = Posicao(u'SE', _(u'Sudeste'), x, y)
+    self._arquivo_imagem = tabelas[u'imagem']
+
+    for (nome, descricao, x, y, porto, mercado, principal) in tabelas[u'posicoes']:
+      posicao = Posicao(nome, descricao, x, y)
+      posicao.defina_indice(len(self._posicoes))
+      if porto:
+        self.crie_porto(posicao)
+        if mercado:
+          self.crie_mercado(posicao)
+      if principal:
+        self._porto_principal = posicao
+      self._posicoes[nome] = posicao
+
+    for (origem, destino) in tabelas[u'rotas']:
+      self._posicoes[origem].adicione_adjacencia(self._posicoes[destino])
+
+    self._estoques = Estoques()
+    for (nome, dificuldade, rendimento) in tabelas[u'pesqueiros']:
+      pesca = Pesca(dificuldade, rendimento)
+      pesca.inclua_em(self._estoques)
+      self._posicoes[nome].defina_pesqueiro(pesca)
+
+    for (nome_perigo, nome, probabilidade, dificuldade, descricao) in tabelas[u'perigos']:
+      self._posicoes[nome].defina_perigo(
+        Perigo(nome_perigo, descricao, probabilidade, dificuldade))
+
+    # A partir daqui, a estrutura do mapa fica no grafo.
+    self._grafo = None
+    self.grafo()
+
+  def grafo(self):
+    u""" Retorna a representação compacta do mapa, com posições numeradas.
+
+        Returns:
+          GrafoMapa - Montado com o mapa, ou na primeira chamada, e mantido
+            atualizado pelas posições.
+    """
+    if self._grafo is None:
+      self._grafo = GrafoMapa(sorted(self._posicoes.values(),
+                                     key = lambda posicao: posicao.indice()))
+    return self._grafo
+
+  def estoques(self):
+    return self._estoques
+
+  def posicao_de_indice(self, indice):
+    u""" Retorna a posição com o número dado no grafo do mapa.
+    """
+    return self.grafo().posicao(indice)
+      
+  def porto_principal(self):
+    u""" Indica posição onde está o porto principal, com mercado.
+    
+        Returns:
+          Posicao
+    """
     return self._porto_principal
   
   def portos(self):
     u""" Retorna lista com portos neste mapa.
     
         Returns:
-          [Porto, ...] - Os portos encontrados no mapa
+          [Posicao, ...] - As posições com porto, na ordem do mapa. Não alterar.
     """
-    l_portos = []
-    for (nome, posicao) in self._posicoes.items():
-      if posicao.porto() != None:
-        l_portos.append(posicao)
-        
-    return l_portos
+    return self._portos
+
+  def portos_com_mercado(self):
+    u""" Retorna lista com os portos deste mapa que têm mercado.
+
+        Returns:
+          [Posicao, ...] - As posições com porto e mercado, na ordem do mapa. Não alterar.
+    """
+    return self._portos_com_mercado
+
+  def crie_porto(self, posicao):
+    u""" Cria um porto em uma posição do mapa, mantendo a lista de portos.
+
+        Notes:
+          Use este método, e não Posicao.crie_porto(), para posições já incluídas no mapa.
+    """
+    if posicao.porto() is None:
+      posicao.crie_porto()
+      self._portos.append(posicao)
+
+  def crie_mercado(self, posicao):
+    u""" Cria um mercado no porto de uma posição do mapa, criando o porto se necessário.
+
+        Notes:
+          Use este método, e não Porto.crie_mercado(), para posições já incluídas no mapa.
+    """
+    self.crie_porto(posicao)
+    if posicao.porto().mercado() is None:
+      posicao.porto().crie_mercado()
+      self._portos_com_mercado.append(posicao)
   
   def ache_posicao(self, nome):
     u""" Retorna posição associada ao nome dado.
     
         Returns:
-          Posicao
+          Posicao
+    """
+    return self._posicoes.get(nome)
+
+
+# Estado vetorial
+#
+# Para simulações com centenas de milhares de pescadores, os atributos numéricos de
+# pescadores e barcos podem ficar em vetores NumPy (uma coluna por atributo), em vez de
+# um objeto por entidade. PescadorVetorial e BarcoVetorial têm os mesmos métodos de
+# Pescador e Barco, e apenas apontam para uma linha dos vetores, de modo que o Jogo
+# funciona igual com os dois modelos. As operações diárias que atingem todos os
+# pescadores (rações, jornadas, vendas compulsórias) são feitas de uma vez sobre as colunas.
+
+class TabelaVetorial:
+  u""" Colunas de inteiros em vetores NumPy, que crescem conforme as linhas são incluídas.
+
+      Attributes:
+        colunas: {nome:str: numpy.ndarray} - Os vetores, com folga no final
+        quantas: int - Quantas linhas estão em uso
+  """
+  def __init__(self, nomes_colunas):
+    self._colunas = dict((nome, numpy.zeros(16, dtype = numpy.int64))
+                         for nome in nomes_colunas)
+    self._quantas = 0
+
+  def inclua_linha(self, valores):
+    u""" Inclui uma linha no fim da tabela.
+
+        Parameters:
+          valores: {nome_coluna:str: int} - Valores iniciais. As demais colunas começam em 0.
+        Returns:
+          int - O índice da nova linha
+    """
+    indice = self._quantas
+    for (nome, vetor) in self._colunas.items():
+      if indice >= len(vetor):
+        vetor = numpy.concatenate((vetor, numpy.zeros(len(vetor), dtype = numpy.int64)))
+        self._colunas[nome] = vetor
+      vetor[indice] = valores.get(nome, 0)
+    self._quantas += 1
+    return indice
+
+  def quantas(self):
+    return self._quantas
+
+  def coluna(self, nome):
+    u""" Retorna a coluna, apenas com as linhas em uso.
+
+        Returns:
+          numpy.ndarray - Uma vista do vetor: alterações valem para a tabela.
+    """
+    return self._colunas[nome][:self._quantas]
+
+  def valor(self, nome, indice):
+    return int(self._colunas[nome][indice])
+
+  def defina(self, nome, indice, valor):
+    self._colunas[nome][indice] = valor
+
+  def some(self, nome, indice, valor):
+    self._colunas[nome][indice] += valor
+
+  def copie_estado(self):
+    u""" Retorna uma cópia das linhas em uso, para restaure_estado().
+    """
+    return (self._quantas, dict((nome, vetor[:self._quantas].copy())
+                                for (nome, vetor) in self._colunas.items()))
+
+  def restaure_estado(self, copia):
+    u""" Volta a tabela às linhas copiadas. Linhas incluídas depois da cópia são descartadas.
+    """
+    (quantas, colunas) = copia
+    for (nome, vetor) in colunas.items():
+      self._colunas[nome][:quantas] = vetor
+    self._quantas = quantas
+
+
+class PescadorVetorial:
+  u""" Um pescador cujos atributos numéricos ficam em uma TabelaVetorial.
+
+      Tem os mesmos métodos de Pescador. Ver EstadoVetorial.
+  """
+  __slots__ = (u'_tabela', u'_indice', u'_nome', u'_barcos')
+
+  ATRIBUTOS = (u'destreza_na_pesca', u'destreza_em_navegacao', u'dinheiro', u'redes', u'racoes')
+
+  def __init__(self, tabela, indice, nome):
+    self._tabela = tabela
+    self._indice = indice
+    self._nome = nome
+    self._barcos = ColecaoOrdenada()
+
+  def indice(self):
+    u""" Linha deste pescador nas colunas do estado vetorial.
+    """
+    return self._indice
+
+  def as_dict(self):
+    atributos = {u'nome': self._nome}
+    for atr in self.ATRIBUTOS:
+      atributos[atr] = self._tabela.valor(atr, self._indice)
+    atributos[u'barcos'] = [barco.nome() for barco in self._barcos]
+    return atributos
+
+  def from_dict(self, atributos):
+    atribua_campos(self, atributos, self._atribuidores, Pescador.REFERENCIAS)
+
+  def copie_estado(self):
+    # Os atributos numéricos são copiados por EstadoVetorial.copie_estado().
+    return self._barcos.copie()
+
+  def restaure_estado(self, copia):
+    self._barcos = copia.copie()
+
+  def nome(self):
+    return self._nome
+
+  def credite(self, valor):
+    self._tabela.some(u'dinheiro', self._indice, valor)
+
+  def debite(self, valor):
+    if self._tabela.valor(u'dinheiro', self._indice) >= valor:
+      self._tabela.some(u'dinheiro', self._indice, -valor)
+      return True
+    else:
+      return False
+
+  def consulte_saldo(self):
+    return self._tabela.valor(u'dinheiro', self._indice)
+
+  def adicione_barco(self, barco):
+    self._barcos.adicione(barco)
+
+  def remova_barco(self, barco):
+    if not self._barcos.remova(barco):
+      raise ValueError(u'Pescador.remova_barco(): barco não pertence ao pescador')
+
+  def barcos(self):
+    return self._barcos
+
+  def adicione_redes(self, quant):
+    self._tabela.some(u'redes', self._indice, quant)
+
+  def remova_redes(self, quantas = 1):
+    if self._tabela.valor(u'redes', self._indice) >= quantas:
+      self._tabela.some(u'redes', self._indice, -quantas)
+      return True
+    else:
+      return False
+
+  def redes(self):
+    return self._tabela.valor(u'redes', self._indice)
+
+  def adicione_racoes(self, quant):
+    racoes = min(self._tabela.valor(u'racoes', self._indice) + quant, 12)
+    self._tabela.defina(u'racoes', self._indice, racoes)
+
+  def desconte_racao(self):
+    if self._tabela.valor(u'racoes', self._indice) > 0:
+      self._tabela.some(u'racoes', self._indice, -1)
+      return True
+    else:
+      return False
+
+  def consulte_racoes(self):
+    return self._tabela.valor(u'racoes', self._indice)
+
+  def destreza_em_navegacao(self):
+    return self._tabela.valor(u'destreza_em_navegacao', self._indice)
+
+  def aumentar_destreza_em_navegacao(self):
+    self._tabela.some(u'destreza_em_navegacao', self._indice, 1)
+
+  def destreza_na_pesca(self):
+    return self._tabela.valor(u'destreza_na_pesca', self._indice)
+
+  def aumentar_destreza_na_pesca(self):
+    self._tabela.some(u'destreza_na_pesca', self._indice, 1)
+
+
+class BarcoVetorial:
+  u""" Um barco cujos atributos numéricos ficam em uma TabelaVetorial.
+
+      Tem os mesmos métodos de Barco. Ver EstadoVetorial.
+  """
+  __slots__ = (u'_tabela', u'_indice', u'_tipo', u'_nome', u'_posicao', u'_pescadores')
+
+  ATRIBUTOS = (u'lotacao', u'capacidade', u'resistencia', u'pescado', u'atraso', u'danos')
+
+  def __init__(self, tabela, indice, tipo, nome):
+    self._tabela = tabela
+    self._indice = indice
+    self._tipo = tipo
+    self._nome = nome
+    self._posicao = None
+    self._pescadores = ColecaoOrdenada()
+
+  def indice(self):
+    u""" Linha deste barco nas colunas do estado vetorial.
+    """
+    return self._indice
+
+  def as_dict(self):
+    atributos = {u'tipo': self._tipo, u'nome': self._nome}
+    for atr in self.ATRIBUTOS:
+      atributos[atr] = self._tabela.valor(atr, self._indice)
+    atributos[u'posicao'] = self._posicao.nome()
+    atributos[u'pescadores'] = [pescador.nome() for pescador in self._pescadores]
+    return atributos
+
+  def from_dict(self, atributos):
+    atribua_campos(self, atributos, self._atribuidores, Barco.REFERENCIAS)
+
+  def copie_estado(self):
+    # Os atributos numéricos são copiados por EstadoVetorial.copie_estado().
+    return (self._posicao, self._pescadores.copie())
+
+  def restaure_estado(self, copia):
+    (posicao, pescadores) = copia
+    self._posicao = posicao
+    self._pescadores = pescadores.copie()
+
+  def nome(self):
+    return self._nome
+
+  def tipo(self):
+    return self._tipo
+
+  def carregue(self, carga):
+    antes = self._tabela.valor(u'pescado', self._indice)
+    pescado = min(antes + carga, self._tabela.valor(u'capacidade', self._indice))
+    self._tabela.defina(u'pescado', self._indice, pescado)
+    return pescado - antes
+
+  def descarregue(self):
+    quant = self._tabela.valor(u'pescado', self._indice)
+    self._tabela.defina(u'pescado', self._indice, 0)
+    return quant
+
+  def reduza_carga(self):
+    self._tabela.defina(u'pescado', self._indice,
+                        int(self._tabela.valor(u'pescado', self._indice) / 2))
+
+  def carga_livre(self):
+    return (self._tabela.valor(u'capacidade', self._indice) -
+            self._tabela.valor(u'pescado', self._indice))
+
+  def desembarque(self, pescador):
+    return self._pescadores.remova(pescador)
+
+  def embarque(self, pescador):
+    if self._tabela.valor(u'lotacao', self._indice) <= len(self._pescadores):
+      return False
+    else:
+      return self._pescadores.adicione(pescador)
+
+  def vagas(self):
+    return self._tabela.valor(u'lotacao', self._indice) - len(self._pescadores)
+
+  def defina_posicao(self, posicao):
+    self._posicao = posicao
+
+  def posicao(self):
+    return self._posicao
+
+  def atrase(self, dias):
+    self._tabela.some(u'atraso', self._indice, dias)
+
+  def desconte_atraso(self):
+    if self._tabela.valor(u'atraso', self._indice) > 0:
+      self._tabela.some(u'atraso', self._indice, -1)
+      return True
+    return False
+
+  def em_atraso(self):
+    return self._tabela.valor(u'atraso', self._indice) > 0
+
+  def pescadores(self):
+    return self._pescadores
+
+  def caracteristicas(self):
+    return (self._tabela.valor(u'resistencia', self._indice),
+            self._tabela.valor(u'danos', self._indice))
+
+
+class EstadoVetorial:
+  u""" Pescadores e barcos de um jogo, com os atributos numéricos em vetores NumPy.
+
+      Requer NumPy.
+
+      Attributes:
+        pescadores: TabelaVetorial - Dinheiro, rações, redes e destrezas de cada pescador
+        barcos: TabelaVetorial - Lotação, capacidade, resistência, pescado, atraso e danos
+        lista_pescadores: [PescadorVetorial, ...] - Os pescadores, na ordem das linhas
+  """
+  def __init__(self):
+    if numpy is None:
+      raise ImportError(u'EstadoVetorial requer NumPy.')
+    self._pescadores = TabelaVetorial(PescadorVetorial.ATRIBUTOS)
+    self._barcos = TabelaVetorial(BarcoVetorial.ATRIBUTOS)
+    self._lista_pescadores = []
+
+  def novo_pescador(self, nome):
+    u""" Cria um pescador em uma nova linha da tabela.
+
+        Returns:
+          PescadorVetorial
+    """
+    pescador = PescadorVetorial(self._pescadores, self._pescadores.inclua_linha({}), nome)
+    self._lista_pescadores.append(pescador)
+    return pescador
+
+  def novo_barco(self, tipo, nome, lot, cap, resist):
+    u""" Cria um barco em uma nova linha da tabela, com os argumentos de Barco().
+
+        Returns:
+          BarcoVetorial
+    """
+    indice = self._barcos.inclua_linha({u'lotacao': lot, u'capacidade': cap,
+                                        u'resistencia': resist})
+    return BarcoVetorial(self._barcos, indice, tipo, nome)
+
+  def pescador(self, indice):
+    return self._lista_pescadores[indice]
+
+  def copie_estado(self):
+    u""" Retorna uma cópia dos atributos numéricos de pescadores e barcos.
+    """
+    return (self._pescadores.copie_estado(), self._barcos.copie_estado(),
+            len(self._lista_pescadores))
+
+  def restaure_estado(self, copia):
+    (pescadores, barcos, quantos) = copia
+    self._pescadores.restaure_estado(pescadores)
+    self._barcos.restaure_estado(barcos)
+    del self._lista_pescadores[quantos:]
+
+  def tabela_pescadores(self):
+    return self._pescadores
+
+  def tabela_barcos(self):
+    return self._barcos
+
+  def desconte_racoes(self):
+    u""" Desconta uma ração de cada pescador que ainda tem rações.
+
+        Returns:
+          numpy.ndarray - Índices dos pescadores que já estavam sem rações, em ordem.
+    """
+    racoes = self._pescadores.coluna(u'racoes')
+    com_racao = racoes > 0
+    racoes[com_racao] -= 1
+    return numpy.flatnonzero(~com_racao)
+
+  def credite(self, indices, valor):
+    u""" Credita o mesmo valor a vários pescadores.
+    """
+    self._pescadores.coluna(u'dinheiro')[indices] += valor
+
+  def venda_racoes(self, indices, quant, preco):
+    u""" Vende a mesma quantidade de rações, ao mesmo preço, a vários pescadores.
+
+        Como em Mercado.venda_racoes(), só compra quem tem saldo, e o total de rações
+        fica limitado a 12.
+
+        Returns:
+          numpy.ndarray - Para cada pescador, True se a venda foi realizada.
+    """
+    indices = numpy.asarray(indices, dtype = numpy.int64)
+    dinheiro = self._pescadores.coluna(u'dinheiro')
+    racoes = self._pescadores.coluna(u'racoes')
+    vendido = dinheiro[indices] >= quant * preco
+    compradores = indices[vendido]
+    dinheiro[compradores] -= quant * preco
+    racoes[compradores] = numpy.minimum(racoes[compradores] + quant, 12)
+    return vendido
+
+  def racoes(self):
+    u""" Rações de cada pescador, na ordem das linhas.
+    """
+    return self._pescadores.coluna(u'racoes')
+
+
+def _atribuidores_vetoriais(classe, campos):
+  u""" Atribuidores para os campos de Pescador ou Barco em uma entidade vetorial:
+      os campos numéricos vão para a tabela, e os demais para o atributo '_campo'.
+  """
+  atribuidores = {}
+  for campo in campos:
+    if campo in classe.ATRIBUTOS:
+      atribuidores[campo] = (lambda campo: lambda objeto, valor:
+                             objeto._tabela.defina(campo, objeto._indice, valor))(campo)
+    else:
+      atribuidores[campo] = getattr(classe, u'_' + campo).__set__
+  return atribuidores
+
+PescadorVetorial._atribuidores = _atribuidores_vetoriais(PescadorVetorial, Pescador.CAMPOS)
+BarcoVetorial._atribuidores = _atribuidores_vetoriais(BarcoVetorial, Barco.CAMPOS)
+
+
+# Códigos do protocolo do Jogo
+#
+# Os pedidos, bens e jornadas trocados com o Jogo são tuplas cujo primeiro elemento é um
+# destes códigos, que não dependem do idioma:
+#   pedidos e bens: (BARCO, BARCO_*, nome), (CURSO, CURSO_*[, nível]), (RACOES, quantas),
+#                   (REDES, quantas), (DINHEIRO, valor)
+#   jornadas: (PESCAR,), (NAVEGAR, nome_destino), (DESCONTAR_ATRASO,)
+# Apenas a interface traduz os códigos (ver nome_bem(), nome_tipo_barco(), nome_curso()
+# e texto_jornada()).
+
+BARCO, CURSO, RACOES, REDES, DINHEIRO = range(5)
+BARCO_SIMPLES, BARCO_REFORCADO = range(2)
+CURSO_NAVEGACAO, CURSO_PESCA = range(2)
+PESCAR, NAVEGAR, DESCONTAR_ATRASO = range(3)
+
+NOMES_BENS = {BARCO: N_(u'barco'),
+              CURSO: N_(u'curso'),
+              RACOES: N_(u'rações'),
+              REDES: N_(u'redes'),
+              DINHEIRO: N_(u'dinheiro')}
+
+NOMES_BARCOS = {BARCO_SIMPLES: N_(u'simples'),
+                BARCO_REFORCADO: N_(u'reforçado')}
+
+NOMES_CURSOS = {CURSO_NAVEGACAO: N_(u'navegação'),
+                CURSO_PESCA: N_(u'pesca')}
+
+# Nestas funções, tr é um Tradutor (ver Jogo.tradutor()). Se omitido, usa-se a
+# tradução global do módulo.
+
+def nome_bem(codigo, tr = None):
+  u""" Nome traduzido de um bem (BARCO, CURSO, etc).
+  """
+  return (tr or _)(NOMES_BENS[codigo])
+
+def nome_tipo_barco(codigo, tr = None):
+  u""" Nome traduzido de um tipo de barco (BARCO_SIMPLES ou BARCO_REFORCADO).
+  """
+  return (tr or _)(NOMES_BARCOS[codigo])
+
+def tipo_barco_de_nome(nome, tr = None):
+  u""" Código do tipo de barco com este nome traduzido, ou None se não há.
+  """
+  for (codigo, texto) in NOMES_BARCOS.items():
+    if (tr or _)(texto) == nome:
+      return codigo
+  return None
+
+def nome_curso(codigo, tr = None):
+  u""" Nome traduzido de um curso (CURSO_NAVEGACAO ou CURSO_PESCA).
+  """
+  return (tr or _)(NOMES_CURSOS[codigo])
+
+def curso_de_nome(nome, tr = None):
+  u""" Código do curso com este nome traduzido, ou None se não há.
+  """
+  for (codigo, texto) in NOMES_CURSOS.items():
+    if (tr or _)(texto) == nome:
+      return codigo
+  return None
+
+def texto_jornada(jornada, tr = None):
+  u""" Descrição traduzida de uma jornada, para a interface.
+  """
+  tr = tr or _
+  if jornada[0] == NAVEGAR:
+    return tr(u'navegar para %s') % jornada[1]
+  elif jornada[0] == PESCAR:
+    return tr(u'pescar')
+  else:
+    return tr(u'descontar atraso')
+
+
+# Livro contábil
+#
+# O dinheiro e os bens que passam de uma conta a outra (pescadores, o Mestre, os mercados e
+# a colônia) são lançados no livro do Jogo, em partidas dobradas: cada transação tem dois ou
+# mais lançamentos, e em cada transação a soma dos valores de cada bem é zero. O livro só
+# cresce (a não ser quando o Jogo volta a um estado copiado). Os lançamentos ficam em
+# colunas (array), com índices por conta e por dia, para que os extratos de centenas de
+# pescadores saiam de uma vez, sem reler o jornal.
+#
+# O dinheiro de cada conta no livro é igual ao seu saldo. Dos bens, só são lançadas as
+# compras e transferências: rações consumidas, redes perdidas e barcos naufragados não.
+
+VENDA, CONTRATO, JORNADA, PESCADO, RESGATE, ABERTURA = range(6)
+
+NOMES_MOTIVOS = {VENDA: N_(u'compra no mercado'),
+                 CONTRATO: N_(u'contrato'),
+                 JORNADA: N_(u'jornada'),
+                 PESCADO: N_(u'venda de pescado'),
+                 RESGATE: N_(u'ração compulsória'),
+                 ABERTURA: N_(u'saldo inicial')}
+
+CONTA_COLONIA = u'*colônia'
+
+def conta_mercado(nome_porto):
+  u""" Nome da conta do mercado de um porto no livro.
+  """
+  return u'*mercado:' + nome_porto
+
+def nome_motivo(codigo, tr = None):
+  u""" Nome traduzido do motivo de um lançamento (VENDA, CONTRATO, etc).
+  """
+  return (tr or _)(NOMES_MOTIVOS[codigo])
+
+
+class _RamoLivro:
+  u""" Um trecho da história de um Livro, para copie_estado() e restaure_estado().
+
+      O ramo vivo é o dos vetores atuais do livro. Quando restaure_estado() corta os
+      vetores, o ramo vivo é congelado: passa a ser os lançamentos do ramo pai até a
+      marca base, seguidos da cauda cortada. As cópias continuam apontando para ele.
+
+      Attributes:
+        pai: _RamoLivro - Ramo com os lançamentos anteriores à base, ou None
+        base: tuple - Marca (ver Livro._marca()) em que a cauda começa
+        cauda: tuple - Partes dos vetores a partir da base. None no ramo vivo.
+  """
+  __slots__ = (u'pai', u'base', u'cauda')
+
+  def __init__(self):
+    self.pai = None
+    self.base = None
+    self.cauda = None
+
+
+class Livro:
+  u""" Livro de lançamentos em partidas dobradas.
+
+      Attributes:
+        colunas: {str: array} - Uma coluna por campo de lançamento (ver CAMPOS)
+        contas: [str, ...] - Nomes das contas, na ordem em que apareceram
+        lancamentos_conta: [array, ...] - Para cada conta, as linhas dos seus lançamentos
+        inicio_dia: array - Para cada dia, a primeira linha lançada nele
+        transacoes: int - Número de transações lançadas
+        ramo: _RamoLivro - Ramo vivo da história, para as cópias de copie_estado()
+
+      Notes:
+        Cada lançamento é (transacao, dia, conta, bem, valor, motivo). O bem é um
+        código do protocolo (DINHEIRO, RACOES, etc), e o motivo um dos códigos VENDA,
+        CONTRATO, JORNADA, PESCADO, RESGATE ou ABERTURA. Valores positivos entram
+        na conta, negativos saem.
+  """
+  CAMPOS = (u'transacao', u'dia', u'conta', u'bem', u'valor', u'motivo')
+  TIPOS = (u'l', u'l', u'l', u'b', u'q', u'b')
+
+  def __init__(self):
+    self._colunas = dict((campo, array(tipo)) for (campo, tipo) in zip(self.CAMPOS, self.TIPOS))
+    self._contas = []
+    self._indice_conta = {}
+    self._lancamentos_conta = []
+    self._inicio_dia = array(u'l', [0])
+    self._transacoes = 0
+    self._ramo = _RamoLivro()
+
+  def __len__(self):
+    return len(self._colunas[u'transacao'])
+
+  def dia(self):
+    u""" Dia corrente, começando em 0 (antes da primeira alvorada).
+    """
+    return len(self._inicio_dia) - 1
+
+  def inicie_dia(self):
+    u""" Passa ao dia seguinte. Os próximos lançamentos são feitos neste dia.
+    """
+    self._inicio_dia.append(len(self))
+
+  def contas(self):
+    return self._contas
+
+  def _conta(self, nome):
+    indice = self._indice_conta.get(nome)
+    if indice is None:
+      indice = len(self._contas)
+      self._contas.append(nome)
+      self._indice_conta[nome] = indice
+      self._lancamentos_conta.append(array(u'l'))
+    return indice
+
+  def lance(self, motivo, lancamentos):
+    u""" Lança uma transação, com todos os seus lançamentos, ou nenhum.
+
+        Parameters:
+          motivo:int - Código do motivo da transação
+          lancamentos: [(conta:str, bem:int, valor:int), ...] - Dois ou mais lançamentos
+        Returns:
+          int - Número da transação
+        Raises:
+          ValueError - Se, para algum bem, a soma dos valores não é zero.
+    """
+    somas = {}
+    for (conta, bem, valor) in lancamentos:
+      somas[bem] = somas.get(bem, 0) + valor
+    for (bem, soma) in somas.items():
+      if soma != 0:
+        raise ValueError(u'Livro::lance() - Transação desbalanceada: %s soma %d' % (bem, soma))
+
+    transacao = self._transacoes
+    dia = self.dia()
+    colunas = self._colunas
+    for (conta, bem, valor) in lancamentos:
+      indice = self._conta(conta)
+      self._lancamentos_conta[indice].append(len(self))
+      colunas[u'transacao'].append(transacao)
+      colunas[u'dia'].append(dia)
+      colunas[u'conta'].append(indice)
+      colunas[u'bem'].append(bem)
+      colunas[u'valor'].append(valor)
+      colunas[u'motivo'].append(motivo)
+    self._transacoes += 1
+    return transacao
+
+  def transfira(self, motivo, origem, destino, bem, valor):
+    u""" Lança uma transação simples, de uma conta para outra.
+    """
+    return self.lance(motivo, [(origem, bem, -valor), (destino, bem, valor)])
+
+  def distribua(self, motivo, origem, destinos, bem, valor):
+    u""" Lança, em uma só transação, o mesmo valor de uma conta para várias.
+    """
+    if len(destinos) == 0:
+      return None
+    lancamentos = [(origem, bem, -valor * len(destinos))]
+    lancamentos.extend((destino, bem, valor) for destino in destinos)
+    return self.lance(motivo, lancamentos)
+
+  def _linhas_dias(self, dia_inicial, dia_final):
+    u""" Primeira e última (exclusive) linhas lançadas entre dois dias, inclusive.
+    """
+    inicio = self._inicio_dia[dia_inicial] if dia_inicial < len(self._inicio_dia) else len(self)
+    if dia_final + 1 < len(self._inicio_dia):
+      return (inicio, self._inicio_dia[dia_final + 1])
+    return (inicio, len(self))
+
+  def linhas(self, conta = None, dia_inicial = 0, dia_final = None):
+    u""" Linhas dos lançamentos de uma conta (ou de todas), entre dois dias.
+
+        Parameters:
+          conta:str - Nome da conta. Se None, todas as contas.
+          dia_*:int - Primeiro e último dias, inclusive. Se dia_final é None, até hoje.
+        Returns:
+          Sequência de índices de linha, em ordem
+    """
+    if dia_final is None:
+      dia_final = self.dia()
+    (inicio, fim) = self._linhas_dias(dia_inicial, dia_final)
+    if conta is None:
+      return range(inicio, fim)
+    indice = self._indice_conta.get(conta)
+    if indice is None:
+      return []
+    linhas = self._lancamentos_conta[indice]
+    return linhas[bisect_left(linhas, inicio):bisect_left(linhas, fim)]
+
+  def lancamentos(self, conta = None, dia_inicial = 0, dia_final = None):
+    u""" Lançamentos de uma conta (ou de todas), entre dois dias.
+
+        Returns:
+          [(transacao:int, dia:int, conta:str, bem:int, valor:int, motivo:int), ...]
+    """
+    colunas = [self._colunas[campo] for campo in self.CAMPOS]
+    (transacao, dia, contas, bem, valor, motivo) = colunas
+    return [(transacao[i], dia[i], self._contas[contas[i]], bem[i], valor[i], motivo[i])
+            for i in self.linhas(conta, dia_inicial, dia_final)]
+
+  def saldo(self, conta, bem, dia_final = None):
+    u""" Soma dos lançamentos de um bem em uma conta, até um dia (inclusive).
+    """
+    valores = self._colunas[u'valor']
+    bens = self._colunas[u'bem']
+    return sum(valores[i] for i in self.linhas(conta, 0, dia_final) if bens[i] == bem)
+
+  def extratos(self, bem, dia_inicial = 0, dia_final = None):
+    u""" Movimento de um bem em todas as contas, entre dois dias.
+
+        Returns:
+          {conta:str: valor:int} - Soma dos lançamentos de cada conta no período
+    """
+    extratos = {}
+    colunas = self._colunas
+    for i in self.linhas(None, dia_inicial, dia_final):
+      if colunas[u'bem'][i] == bem:
+        conta = self._contas[colunas[u'conta'][i]]
+        extratos[conta] = extratos.get(conta, 0) + colunas[u'valor'][i]
+    return extratos
+
+  # Cópias do estado
+  #
+  # O livro só cresce: todos os vetores recebem elementos apenas no fim. Uma cópia é só
+  # o ramo vivo e uma marca com o tamanho de cada vetor, e não depende do número de
+  # lançamentos. Voltar atrás corta os vetores, guardando a cauda cortada no ramo, para
+  # as cópias posteriores; avançar de novo acrescenta a cauda guardada.
+
+  _MARCA_VAZIA = (0, 0, 0, 0, ())
+
+  def _marca(self):
+    u""" (linhas, dias, transações, contas, (lançamentos de cada conta, ...))
+    """
+    return (len(self), len(self._inicio_dia), self._transacoes, len(self._contas),
+            tuple(len(lancamentos) for lancamentos in self._lancamentos_conta))
+
+  @staticmethod
+  def _anterior(marca, base):
+    u""" Se a marca é um ponto da história até base (inclusive).
+    """
+    return marca[0] <= base[0] and marca[1] <= base[1] and marca[2] <= base[2]
+
+  def copie_estado(self):
+    u""" Retorna uma cópia dos lançamentos, que pode ser restaurada várias vezes,
+        em qualquer ordem.
+
+        Notes:
+          A cópia guarda só o tamanho dos vetores, e custa o mesmo em qualquer
+          ponto da partida.
+    """
+    return (self._ramo, self._marca())
+
+  def restaure_estado(self, copia):
+    u""" Volta aos lançamentos copiados por copie_estado().
+
+        Notes:
+          Custa o proporcional aos lançamentos cortados ou acrescentados, e ao
+          número de contas.
+    """
+    (ramo, marca) = copia
+    # Sobe pelos ramos congelados enquanto a marca estiver no trecho comum com o pai,
+    # encurtando o caminho para as próximas restaurações.
+    while ramo.cauda is not None and self._anterior(marca, ramo.base):
+      pai = ramo.pai
+      while pai.cauda is not None and self._anterior(ramo.base, pai.base):
+        pai = pai.pai
+      ramo.pai = pai
+      ramo = pai
+
+    if ramo is self._ramo:
+      if marca != self._marca():
+        self._congele(marca)
+    else:
+      # Volta à base do ramo, e acrescenta a sua cauda até a marca.
+      if ramo.pai is None:
+        self._congele(self._MARCA_VAZIA)
+      else:
+        self.restaure_estado((ramo.pai, ramo.base))
+      self._acrescente(ramo.cauda, ramo.base, marca)
+      # Daqui em diante, o ramo continua a partir do ramo vivo.
+      ramo.cauda = self._fatie(ramo.cauda, ramo.base, marca)
+      (ramo.pai, ramo.base) = (self._ramo, marca)
+    self._transacoes = marca[2]
+
+  def _congele(self, marca):
+    u""" Corta os vetores na marca, guardando a cauda no ramo vivo, que é congelado.
+        Começa um novo ramo vivo.
+    """
+    (linhas, dias, transacoes, contas, por_conta) = marca
+    ramo = self._ramo
+    if marca == self._MARCA_VAZIA:
+      # Tudo vai para a cauda, sem cópia.
+      ramo.cauda = (self._colunas, self._contas, self._lancamentos_conta, self._inicio_dia)
+      self._colunas = dict((campo, array(tipo))
+                           for (campo, tipo) in zip(self.CAMPOS, self.TIPOS))
+      self._contas = []
+      self._indice_conta = {}
+      self._lancamentos_conta = []
+      self._inicio_dia = array(u'l')
+    else:
+      ramo.cauda = self._fatie((self._colunas, self._contas, self._lancamentos_conta,
+                                self._inicio_dia), self._MARCA_VAZIA, marca)
+      for coluna in self._colunas.values():
+        del coluna[linhas:]
+      for nome in self._contas[contas:]:
+        del self._indice_conta[nome]
+      del self._contas[contas:]
+      del self._lancamentos_conta[contas:]
+      for (lancamentos, quantos) in zip(self._lancamentos_conta, por_conta):
+        del lancamentos[quantos:]
+      del self._inicio_dia[dias:]
+    ramo.base = marca
+    ramo.pai = self._ramo = _RamoLivro()
+
+  @staticmethod
+  def _fatie(partes, base, marca):
+    u""" Partes dos vetores a partir da marca, dadas as partes a partir da base.
+    """
+    (colunas, contas, lancamentos_conta, inicio_dia) = partes
+    inicio_conta = lambda marca, i: marca[4][i] if i < marca[3] else 0
+    return (dict((campo, coluna[marca[0] - base[0]:]) for (campo, coluna) in colunas.items()),
+            contas[marca[3] - base[3]:],
+            [lancamentos[inicio_conta(marca, i) - inicio_conta(base, i):]
+             for (i, lancamentos) in enumerate(lancamentos_conta)],
+            inicio_dia[marca[1] - base[1]:])
+
+  def _acrescente(self, partes, base, marca):
+    u""" Acrescenta aos vetores, que estão na base, as partes até a marca.
+    """
+    (colunas, contas, lancamentos_conta, inicio_dia) = partes
+    for (campo, coluna) in self._colunas.items():
+      coluna.extend(colunas[campo][:marca[0] - base[0]])
+    for nome in contas[:marca[3] - base[3]]:
+      self._indice_conta[nome] = len(self._contas)
+      self._contas.append(nome)
+      self._lancamentos_conta.append(array(u'l'))
+    for i in range(marca[3]):
+      inicio = base[4][i] if i < base[3] else 0
+      self._lancamentos_conta[i].extend(lancamentos_conta[i][:marca[4][i] - inicio])
+    self._inicio_dia.extend(inicio_dia[:marca[1] - base[1]])
+
+  def as_dict(self):
+    estado = dict((campo, coluna.tolist()) for (campo, coluna) in self._colunas.items())
+    estado[u'contas'] = list(self._contas)
+    estado[u'inicio_dia'] = self._inicio_dia.tolist()
+    estado[u'transacoes'] = self._transacoes
+    return estado
+
+  def from_dict(self, estado):
+    u""" Substitui os lançamentos pelos de um dicionário retornado por as_dict().
+    """
+    # As cópias anteriores continuam valendo.
+    self._congele(self._MARCA_VAZIA)
+    for (campo, tipo) in zip(self.CAMPOS, self.TIPOS):
+      self._colunas[campo] = array(tipo, estado[campo])
+    for nome in estado[u'contas']:
+      self._conta(nome)
+    for (linha, indice) in enumerate(self._colunas[u'conta']):
+      self._lancamentos_conta[indice].append(linha)
+    self._inicio_dia = array(u'l', estado[u'inicio_dia'])
+    self._transacoes = estado[u'transacoes']
+
+
+# Diário do jogo
+#
+# Para não perder uma partida se o programa for interrompido, o Jogo pode registrar em um
+# diário cada chamada que altera o seu estado (ver Jogo.inicie_diario()). Cada chamada
+# acrescenta uma linha json ao diário; de tempos em tempos, o estado completo é gravado em
+# um instantâneo, e o diário recomeça. Para recuperar a partida, basta carregar o último
+# instantâneo e repetir as chamadas do diário (ver Jogo.recupere_diario()).
+
+INTERVALO_DIARIO = 500
+
+class Diario:
+  u""" Diário de chamadas de um Jogo, com instantâneos periódicos do estado.
+
+      O diário é um arquivo de texto, com uma linha json [número, método, [argumentos]]
+      por chamada. O instantâneo fica ao lado, em nome_arq + '.instantaneo', e guarda
+      o número da última chamada já incluída nele.
+  """
+  def __init__(self, nome_arq, intervalo = INTERVALO_DIARIO):
+    u"""
+        Parameters:
+          nome_arq:str - Arquivo do diário
+          intervalo:int - Número de chamadas entre instantâneos
+    """
+    self._nome_arq = nome_arq
+    self._intervalo = intervalo
+    self._numero = 0
+    self._desde_instantaneo = 0
+    self._arq = None
+
+  def nome_instantaneo(self):
+    return self._nome_arq + u'.instantaneo'
+
+  def registre(self, metodo, argumentos):
+    u""" Acrescenta uma chamada ao diário.
+    """
+    self._numero += 1
+    self._desde_instantaneo += 1
+    self._arq.write(json.dumps([self._numero, metodo, argumentos]) + u'\n')
+    self._arq.flush()
+
+  def precisa_instantaneo(self):
+    return self._desde_instantaneo >= self._intervalo
+
+  def grave_instantaneo(self, instantaneo):
+    u""" Grava o estado completo do jogo e recomeça o diário.
+
+        Parameters:
+          instantaneo: {str: ...} - Estado do jogo, como em Jogo.instantaneo()
+    """
+    nome_temp = u'%s.%d' % (self.nome_instantaneo(), os.getpid())
+    FormatoBinario().grave({u'numero': self._numero, u'jogo': instantaneo}, nome_temp)
+    os.replace(nome_temp, self.nome_instantaneo())
+    # Se o programa parar aqui, as chamadas já incluídas no instantâneo
+    # são ignoradas por leia(), pelo número.
+    if self._arq is not None:
+      self._arq.close()
+    self._arq = open(self._nome_arq, u'w')
+    self._desde_instantaneo = 0
+
+  def leia(self):
+    u""" Lê o último instantâneo e as chamadas registradas depois dele.
+
+        Returns:
+          (instantaneo: {str: ...}, [(metodo:str, [argumento, ...]), ...])
     """
-    return self._posicoes.get(nome)
+    gravado = FormatoBinario().leia(self.nome_instantaneo())
+    self._numero = gravado[u'numero']
+    chamadas = []
+    if path.exists(self._nome_arq):
+      arq = open(self._nome_arq, u'r')
+      try:
+        for linha in arq:
+          try:
+            (numero, metodo, argumentos) = json.loads(linha)
+          except ValueError:
+            # Última linha incompleta: o programa parou durante a gravação.
+            break
+          if numero > self._numero:
+            chamadas.append((metodo, argumentos))
+            self._numero = numero
+      finally:
+        arq.close()
+    return (gravado[u'jogo'], chamadas)
+
+  def feche(self):
+    if self._arq is not None:
+      self._arq.close()
+      self._arq = None
+
+
+def registre_no_diario(metodo):
+  u""" Decora os métodos do Jogo que alteram o seu estado, para que sejam registrados
+      no diário, se houver um.
+
+      Chamadas feitas de dentro de outro método registrado não são registradas, pois
+      serão repetidas por ele.
+  """
+  @functools.wraps(metodo)
+  def registrado(self, *argumentos):
+    if self._diario is None or self._no_diario:
+      return metodo(self, *argumentos)
+    self._diario.registre(metodo.__name__, list(argumentos))
+    self._no_diario = True
+    try:
+      resultado = metodo(self, *argumentos)
+    finally:
+      self._no_diario = False
+    if inspect.isgenerator(resultado):
+      # As jornadas de execute_jornadas_em_fluxo() só acontecem depois.
+      return _fluxo_sem_registro(self, resultado)
+    if self._diario.precisa_instantaneo() and len(self._jornadas_pendentes) == 0:
+      self._diario.grave_instantaneo(self.instantaneo())
+    return resultado
+  return registrado
+
+def _fluxo_sem_registro(jogo, fluxo):
+  u""" Consome um gerador de um método registrado sem registrar as chamadas que ele faz.
+  """
+  while True:
+    jogo._no_diario = True
+    try:
+      item = next(fluxo)
+    except StopIteration:
+      return
+    finally:
+      jogo._no_diario = False
+    yield item
 
 
 class Jogo:
@@ -1029,35 +3448,97 @@ class Jogo:
         barcos - Dicionário de barcos
         jornadas_pendentes: [(nome_barco, jornada), ...] -
                             Lista de jornadas ainda não executadas pelos barcos
+        rotas: {nome_barco: [nome_posicao, ...]} - Trechos restantes das rotas de
+                            vários dias, seguidas sem consultar a interface.
+        porto_pescador: {nome_pescador: Posicao} - Porto onde está cada pescador em terra
+        barco_pescador: {nome_pescador: Barco} - Barco onde está cada pescador embarcado
+        dono_barco: {nome_barco: Pescador} - Quem possui cada barco (inclusive o Mestre)
         preco_jornada:int - Preço do dia de trabalho no porto.
+        silencioso:bool - Se verdadeiro, as operações não montam mensagens.
+          Usado em simulações sem interface, onde o texto não é apresentado.
+        semente:int - Semente do gerador de números aleatórios deste jogo.
+          Com a mesma semente e as mesmas decisões, o jogo se repete exatamente.
+        em_lote:bool - Se verdadeiro, e NumPy estiver disponível, os dados das
+          jornadas são sorteados em lote, agrupando os barcos por posição.
+          Usado em simulações com milhares de barcos.
+        vetorial:bool - Se verdadeiro, pescadores e barcos guardam seus atributos em
+          vetores NumPy (EstadoVetorial), e as operações diárias sobre todos os
+          pescadores são feitas de uma vez. Requer NumPy.
+        idioma:str - Idioma dos textos do jogo ('en', por exemplo). Ver Tradutor.
+        livro: Livro - Lançamentos de todo o dinheiro e bens transferidos no jogo.
   """
-  _mensagens = [_(u'Vocês são pescadores de uma colônia de pesca em uma vila tranquila.'),
-    _(u'O pescado é farto, mas nos pontos onde há mais peixes também há perigos no mar.'),
-    _(u'Nos pontos onde a pesca é mais frequente, é preciso evitar a sobre-pesca, garantindo que os peixes se reproduzam.'),
+  _mensagens = [N_(u'Vocês são pescadores de uma colônia de pesca em uma vila tranquila.'),
+    N_(u'O pescado é farto, mas nos pontos onde há mais peixes também há perigos no mar.'),
+    N_(u'Nos pontos onde a pesca é mais frequente, é preciso evitar a sobre-pesca, garantindo que os peixes se reproduzam.'),
     u'',
-    _(u'O dia a dia consiste em preparar os barcos para a pesca e sair para o mar.'),
-    _(u'Para os pontos mais distantes, ou se a pesca for pouca, o barco pode ficar vários dias no mar.'),
-    _(u'Na volta, o peixe é vendido no mercado, e o dinheiro arrecadado pode ser usado para comprar rações, equipamentos ou fazer cursos de aprimoramento.'),
+    N_(u'O dia a dia consiste em preparar os barcos para a pesca e sair para o mar.'),
+    N_(u'Para os pontos mais distantes, ou se a pesca for pouca, o barco pode ficar vários dias no mar.'),
+    N_(u'Na volta, o peixe é vendido no mercado, e o dinheiro arrecadado pode ser usado para comprar rações, equipamentos ou fazer cursos de aprimoramento.'),
     u'']
   
-  def __init__(self):
+  def __init__(self, silencioso = False, semente = None, em_lote = False, vetorial = False,
+               idioma = None):
+    self._tr = tradutor(idioma)
+    self._nome_mestre = self._tr(u'Mestre')
     self._mapa = Mapa()
     self._nome_arq_mapa = u''
+    self._hash_mapa = None
     self._preco_jornada = 30
+    self._silencioso = silencioso
 
-    self._mestre = Pescador(_(u'Mestre'))
+    if semente is None:
+      semente = Random().getrandbits(64)
+    self._semente = semente
+    self._rng = Random(semente)
+    self._em_lote = em_lote
+    self._gerador_lote = None
+
+    self._livro = Livro()
+    self._mestre = Pescador(self._nome_mestre)
     self._mestre.credite(10000)            # Mestre inicia com R$10.000,00
+    self._livro.transfira(ABERTURA, CONTA_COLONIA, self._nome_mestre, DINHEIRO, 10000)
     
+    self._estado = EstadoVetorial() if vetorial else None
     self._pescadores = {}
     self._barcos = {}
     self._jornadas_pendentes = []
+    self._rotas = {}
+    self._porto_pescador = {}
+    self._barco_pescador = {}
+    self._dono_barco = {}
+    self._diario = None
+    self._no_diario = False
+
+  def salve_estado(self, nome_arq, formato = None):
+    u""" Salva estado do jogo em arquivo.
+
+        Parameters:
+          formato - FormatoJson, FormatoBinario, ou None para escolher pela extensão
+            do arquivo (ver formato_estado()).
+    """
+    if formato is None:
+      formato = formato_estado(nome_arq)
+    formato.grave(self.estado_como_dict(), nome_arq)
+
+  def carregue_estado(self, nome_arq, formato = None):
+    u""" Carrega o estado do jogo de um arquivo gravado por salve_estado().
+
+        Raises:
+          ValueError - Se o mapa foi alterado depois que o jogo foi salvo.
+    """
+    if formato is None:
+      formato = formato_estado(nome_arq)
+    self.restaure_de_dict(formato.leia(nome_arq))
 
-  def salve_estado(self, nome_arq):
-    u""" Salva estado do jogo em arquivo, em formato json.
+  def estado_como_dict(self):
+    u""" Retorna o estado do jogo como um dicionário de tipos simples, como gravado em json.
+
+        O mapa é referenciado pelo nome do arquivo e pelo resumo do seu conteúdo.
     """
     estado_jogo = {}
     
     estado_jogo[u'nome_arq_mapa'] = self._nome_arq_mapa
+    estado_jogo[u'hash_mapa'] = self._hash_mapa
     
     estado_jogo[u'mestre'] = self._mestre.as_dict()
     estado_jogo[u'preco_jornada'] = self._preco_jornada
@@ -1083,21 +3564,19 @@ class Jogo:
         nomes_pescadores.append(pescador.nome())
       portos[pos_porto.nome()] = nomes_pescadores
     estado_jogo[u'portos'] = portos
-    
-    arq_estado = open(nome_arq, u'w')
-    arq_estado.write(json.dumps(estado_jogo))
-    arq_estado.close()
-    
-  def carregue_estado(self, nome_arq):
-    u""" Carrega o estado do jogo de um arquivo gravado no formato json.
+    estado_jogo[u'rotas'] = dict((nome_barco, list(rota))
+                                 for (nome_barco, rota) in self._rotas.items())
+    estado_jogo[u'livro'] = self._livro.as_dict()
+    estado_jogo[u'estoques'] = self._mapa.estoques().biomassas().tolist()
+    return estado_jogo
+    
+  def restaure_de_dict(self, estado_jogo):
+    u""" Reinicia o jogo a partir de um dicionário retornado por estado_como_dict().
     """
-    arq_estado = open(nome_arq, u'r')
-    estado_jogo = json.load(arq_estado)
-    arq_estado.close()
-    
-    self._nome_arq_mapa = estado_jogo[u'nome_arq_mapa']
-
-    self.preencha_mapa(self._nome_arq_mapa)
+    self.preencha_mapa(estado_jogo[u'nome_arq_mapa'])
+    hash_salvo = estado_jogo.get(u'hash_mapa')
+    if hash_salvo is not None and hash_salvo != self._hash_mapa:
+      raise ValueError(u'%s: mapa diferente do usado no jogo salvo' % self._nome_arq_mapa)
     
     self._mestre.from_dict(estado_jogo[u'mestre'])
     self._preco_jornada = estado_jogo[u'preco_jornada']
@@ -1107,7 +3586,7 @@ class Jogo:
     
     for dic_pescador in estado_jogo[u'pescadores']:
       nome_pescador = dic_pescador[u'nome']
-      pescador = Pescador(nome_pescador)
+      pescador = self._novo_pescador(nome_pescador)
       pescador.from_dict(dic_pescador)
       self._pescadores[nome_pescador] = pescador
       # a alocação dos barcos é feita após instanciá-los
@@ -1116,7 +3595,7 @@ class Jogo:
     for dic_barco in estado_jogo[u'barcos']:
       nome_barco = dic_barco[u'nome']
       # From dict vai tratar dos demais parâmetros...
-      barco = Barco(dic_barco[u'tipo'], nome_barco, 0, 0, 0)
+      barco = self._novo_barco(dic_barco[u'tipo'], nome_barco, 0, 0, 0)
       barco.from_dict(dic_barco)
       barco.defina_posicao(self._mapa.ache_posicao(dic_barco[u'posicao']))
       self._barcos[nome_barco] = barco
@@ -1132,10 +3611,179 @@ class Jogo:
       pescador = self._pescadores[nome_pescador]
       for nome_barco in nomes_barcos:
         pescador.adicione_barco(self._barcos[nome_barco])
+
+    self._rotas = dict((nome_barco, list(rota))
+                       for (nome_barco, rota) in estado_jogo.get(u'rotas', {}).items())
+    if u'livro' in estado_jogo:
+      self._livro.from_dict(estado_jogo[u'livro'])
+    if u'estoques' in estado_jogo:
+      self._mapa.estoques().restaure_estado(estado_jogo[u'estoques'])
+    self._reconstrua_indices()
             
+  def instantaneo(self):
+    u""" Retorna tudo que é preciso para continuar o jogo deste ponto: o estado salvo
+        por estado_como_dict(), as jornadas pendentes e o estado dos sorteios.
+    """
+    instantaneo = {}
+    instantaneo[u'estado'] = self.estado_como_dict()
+    instantaneo[u'jornadas_pendentes'] = list(self._jornadas_pendentes)
+    instantaneo[u'semente'] = self._semente
+    instantaneo[u'rng'] = self._rng.getstate()
+    if self._gerador_lote is not None:
+      instantaneo[u'gerador_lote'] = self._gerador_lote.bit_generator.state
+    return instantaneo
+
+  def restaure_instantaneo(self, instantaneo):
+    u""" Continua o jogo a partir de um instantâneo. O jogo deve ser novo.
+    """
+    self.restaure_de_dict(instantaneo[u'estado'])
+    self._jornadas_pendentes = list(instantaneo[u'jornadas_pendentes'])
+    self._semente = instantaneo[u'semente']
+    # Lido de json, o estado do sorteio vem em listas.
+    (versao, estado_rng, gauss) = instantaneo[u'rng']
+    self._rng.setstate((versao, tuple(estado_rng), gauss))
+    if u'gerador_lote' in instantaneo and numpy is not None:
+      self._gerador_lote = numpy.random.default_rng()
+      self._gerador_lote.bit_generator.state = instantaneo[u'gerador_lote']
+
+  def copie_estado(self):
+    u""" Retorna uma cópia, em memória, de tudo que muda durante o jogo.
+
+        Permite avaliar alternativas ("e se este barco fosse para Alto Mar?"):
+        copie o estado, faça as chamadas, e volte com restaure_estado().
+        O mapa não é copiado: apenas os pescadores em terra, os preços dos portos e
+        os estoques de pescado.
+
+        Returns:
+          Cópia opaca, que pode ser restaurada várias vezes
+    """
+    copia = {}
+    copia[u'mestre'] = self._mestre.copie_estado()
+    copia[u'pescadores'] = [(pescador, pescador.copie_estado())
+                            for pescador in self._pescadores.values()]
+    copia[u'barcos'] = [(barco, barco.copie_estado()) for barco in self._barcos.values()]
+    copia[u'portos'] = [(pos_porto.porto(), pos_porto.porto().copie_estado())
+                        for pos_porto in self._mapa.portos()]
+    if self._estado is not None:
+      copia[u'estado'] = self._estado.copie_estado()
+    copia[u'preco_jornada'] = self._preco_jornada
+    copia[u'livro'] = self._livro.copie_estado()
+    copia[u'estoques'] = self._mapa.estoques().copie_estado()
+    copia[u'jornadas_pendentes'] = list(self._jornadas_pendentes)
+    copia[u'rotas'] = [(nome_barco, list(rota)) for (nome_barco, rota) in self._rotas.items()]
+    copia[u'indices'] = (dict(self._porto_pescador), dict(self._barco_pescador),
+                         dict(self._dono_barco))
+    copia[u'rng'] = self._rng.getstate()
+    if self._gerador_lote is not None:
+      copia[u'gerador_lote'] = self._gerador_lote.bit_generator.state
+    return copia
+
+  def restaure_estado(self, copia):
+    u""" Volta o jogo ao estado copiado por copie_estado().
+
+        Notes:
+          Se o jogo tem um diário, um novo instantâneo é gravado, pois as chamadas
+          desfeitas não podem mais ser repetidas a partir do diário.
+    """
+    self._restaure_estado(copia)
+    if self._diario is not None:
+      self._diario.grave_instantaneo(self.instantaneo())
+
+  def _restaure_estado(self, copia):
+    self._mestre.restaure_estado(copia[u'mestre'])
+    self._pescadores = {}
+    for (pescador, estado) in copia[u'pescadores']:
+      pescador.restaure_estado(estado)
+      self._pescadores[pescador.nome()] = pescador
+    self._barcos = {}
+    for (barco, estado) in copia[u'barcos']:
+      barco.restaure_estado(estado)
+      self._barcos[barco.nome()] = barco
+    for (porto, estado) in copia[u'portos']:
+      porto.restaure_estado(estado)
+    if self._estado is not None:
+      self._estado.restaure_estado(copia[u'estado'])
+    self._preco_jornada = copia[u'preco_jornada']
+    self._livro.restaure_estado(copia[u'livro'])
+    self._mapa.estoques().restaure_estado(copia[u'estoques'])
+    self._jornadas_pendentes = list(copia[u'jornadas_pendentes'])
+    self._rotas = dict((nome_barco, list(rota)) for (nome_barco, rota) in copia[u'rotas'])
+    (porto_pescador, barco_pescador, dono_barco) = copia[u'indices']
+    self._porto_pescador = dict(porto_pescador)
+    self._barco_pescador = dict(barco_pescador)
+    self._dono_barco = dict(dono_barco)
+    self._rng.setstate(copia[u'rng'])
+    if u'gerador_lote' in copia:
+      if self._gerador_lote is None:
+        # A cópia foi tirada depois do primeiro sorteio em lote.
+        self._gerador_lote = numpy.random.default_rng()
+      self._gerador_lote.bit_generator.state = copia[u'gerador_lote']
+    else:
+      self._gerador_lote = None
+
+  def inicie_diario(self, nome_arq, intervalo = INTERVALO_DIARIO):
+    u""" Passa a registrar em um diário as chamadas que alteram o estado do jogo.
+
+        Cada chamada custa apenas uma linha no diário. A cada 'intervalo' chamadas,
+        ao fim de um dia, o estado completo é gravado em um instantâneo. Ver Diario.
+    """
+    self.registre_chamadas(Diario(nome_arq, intervalo))
+    self._diario.grave_instantaneo(self.instantaneo())
+
+  def registre_chamadas(self, registro):
+    u""" Passa a registrar as chamadas que alteram o estado do jogo em 'registro',
+        um objeto com os métodos registre() e precisa_instantaneo() de Diario.
+        Ver também pescadores_reproducao.Partida.
+    """
+    self.feche_diario()
+    self._diario = registro
+
+  def recupere_diario(self, nome_arq, intervalo = INTERVALO_DIARIO):
+    u""" Recupera um jogo interrompido, a partir do diário, e continua a registrá-lo.
+
+        O jogo deve ser novo, criado com as mesmas opções do jogo interrompido.
+    """
+    diario = Diario(nome_arq, intervalo)
+    (instantaneo, chamadas) = diario.leia()
+    self.restaure_instantaneo(instantaneo)
+    for (metodo, argumentos) in chamadas:
+      resultado = getattr(self, metodo)(*argumentos)
+      if inspect.isgenerator(resultado):
+        for eventos in resultado:
+          pass
+    self._diario = diario
+    diario.grave_instantaneo(self.instantaneo())
+
+  def feche_diario(self):
+    u""" Para de registrar o jogo no diário.
+    """
+    if self._diario is not None:
+      self._diario.feche()
+      self._diario = None
+
+  def resumo_estado(self):
+    u""" Resume o estado do jogo, inclusive jornadas pendentes e sorteios, em um hash.
+
+        Dois jogos com o mesmo resumo continuam da mesma forma, se receberem as mesmas
+        chamadas.
+
+        Returns:
+          str - Resumo SHA-256, em hexadecimal
+    """
+    texto = json.dumps(self.instantaneo(), sort_keys = True)
+    return hashlib.sha256(texto.encode(u'utf-8')).hexdigest()
+
+  def semente(self):
+    u""" Retorna a semente do gerador de números aleatórios deste jogo.
+    """
+    return self._semente
+
   def preencha_mapa(self, nome_arq):
     self._nome_arq_mapa = nome_arq
+    self._hash_mapa = hash_mapa(nome_arq)
     self._mapa.preencha_mapa(nome_arq)
+    for pos_porto in self._mapa.portos_com_mercado():
+      pos_porto.porto().mercado().use_livro(self._livro, conta_mercado(pos_porto.nome()))
     
   def arquivo_imagem(self):
     u""" Retorna nome do arquivo com imagem do mapa.
@@ -1153,8 +3801,19 @@ class Jogo:
         Returns:
           [msg: str, ...] - Mensagens de apresentação do jogo
     """
-    return self._mensagens
+    return [self._tr(msg) if msg else msg for msg in self._mensagens]
+
+  def tradutor(self):
+    u""" Retorna o Tradutor do idioma deste jogo, para apresentar os eventos.
+    """
+    return self._tr
+
+  def livro(self):
+    u""" Retorna o Livro com os lançamentos do jogo, para consultas e extratos.
+    """
+    return self._livro
     
+  @registre_no_diario
   def adicione_pescadores(self, nomes):
     u""" Adiciona jogadores ao jogo.
 
@@ -1164,72 +3823,160 @@ class Jogo:
         Attributes:
           nomes: [str, ...] - Nomes dos jogadores/pescadores
     """
+    novos = []
     for nome in nomes:
       if (self._pescadores.get(nome) == None):
-        pescador = Pescador(nome)
+        pescador = self._novo_pescador(nome)
         pescador.credite(2000)      # Cada jogador começa o jogo com R$2.000,00
         pescador.adicione_racoes(1)   # Para a primeira manhã
 
         self._pescadores[nome] = pescador
-        self._mapa.porto_principal().porto().retorne_pescador(pescador)
+        self._ponha_em_terra(pescador, self._mapa.porto_principal())
+        novos.append(nome)
+    self._livro.distribua(ABERTURA, CONTA_COLONIA, novos, DINHEIRO, 2000)
+
+  def _novo_pescador(self, nome):
+    u""" Cria um pescador, no modelo de estado deste jogo.
+    """
+    if self._estado is not None:
+      return self._estado.novo_pescador(nome)
+    return Pescador(nome)
+
+  def _novo_barco(self, tipo, nome, lot, cap, resist):
+    u""" Cria um barco, no modelo de estado deste jogo. Mesmos argumentos de Barco().
+    """
+    if self._estado is not None:
+      return self._estado.novo_barco(tipo, nome, lot, cap, resist)
+    return Barco(tipo, nome, lot, cap, resist)
+
+  def _ponha_em_terra(self, pescador, pos_porto):
+    u""" Traz um pescador para um porto, mantendo os índices de localização.
+
+        Notes:
+          Não retira o pescador do barco ou porto onde estava. Isso fica a cargo de quem chama.
+        Returns:
+          True - Se o pescador não estava neste porto.
+    """
+    nome = pescador.nome()
+    self._porto_pescador[nome] = pos_porto
+    self._barco_pescador.pop(nome, None)
+    return pos_porto.porto().retorne_pescador(pescador)
+
+  def _reconstrua_indices(self):
+    u""" Refaz os índices de localização dos pescadores e de posse dos barcos.
+    """
+    self._porto_pescador = {}
+    self._barco_pescador = {}
+    self._dono_barco = {}
+    for pos_porto in self._mapa.portos():
+      for pescador in pos_porto.porto().pescadores_em_terra():
+        self._porto_pescador[pescador.nome()] = pos_porto
+    for barco in self._barcos.values():
+      for pescador in barco.pescadores():
+        self._barco_pescador[pescador.nome()] = barco
+    for pescador in [self._mestre] + list(self._pescadores.values()):
+      for barco in pescador.barcos():
+        self._dono_barco[barco.nome()] = pescador
+
+  def local_pescador(self, nome):
+    u""" Indica onde está um pescador.
+
+        Returns:
+          (nome_porto:str, nome_barco:str) - Um dos dois é None: o pescador está
+            em terra, no porto indicado, ou embarcado no barco indicado.
+    """
+    barco = self._barco_pescador.get(nome)
+    if barco is not None:
+      return (None, barco.nome())
+    pos_porto = self._porto_pescador.get(nome)
+    return (pos_porto.nome() if pos_porto is not None else None, None)
+
+  def dono_barco(self, nome_barco):
+    u""" Retorna o nome de quem possui um barco, ou None se o barco não existe.
+    """
+    dono = self._dono_barco.get(nome_barco)
+    return dono.nome() if dono is not None else None
 
+  @registre_no_diario
   def prepare_alvorada(self):
     u""" Executa operações necessárias para preparar um novo dia do jogo.
     
         As operações incluem: Definir novos preços para cada mercado,
-        publicar tabelas de preços e descontar rações diárias dos pescadores.
+        publicar tabelas de preços, recompor os estoques de pescado
+        e descontar rações diárias dos pescadores.
         
         Returns:
-          [msg:str, ...] - Lista de mensagens geradas pelas operações.
+          [Evento, ...] - Lista de eventos gerados pelas operações.
     """
-    mensagens = [u'', _(u'Começa um novo dia na vila.')]
+    if self._silencioso:
+      mensagens = []
+    else:
+      mensagens = [Separador(), NovoDia()]
+    self._livro.inicie_dia()
     # Definir preços do dia em todos os mercados
-    for pos_porto in self._mapa.portos():
+    for pos_porto in self._mapa.portos_com_mercado():
       mercado = pos_porto.porto().mercado()
-      if mercado != None:
-        mercado.defina_precos_do_dia()
-        precos = mercado.consulte_precos()
-        msg = _(u'Preços no mercado de %s:\n') % pos_porto.nome()
-        for (produto, preco) in precos:
-          msg += _(u'%s: R$%d,00\n') % (produto, preco)
-      mensagens.append(msg)
+      mercado.defina_precos_do_dia(self._rng.randint)
+      if not self._silencioso:
+        mensagens.append(PrecosDoDia(pos_porto.nome(), mercado.consulte_precos()))
+
+    # Os peixes se reproduzem durante a noite, em todos os pesqueiros de uma vez.
+    self._mapa.estoques().regenere()
     
     porto_principal = self._mapa.porto_principal()
 
+    mercado = porto_principal.porto().mercado()
+
     # Descontar uma ração para cada pescador.
-    for nome, pescador in self._pescadores.items():
-      if (not pescador.desconte_racao()):
-        # Pescador sem ração deve retornar ao porto principal.
-        if (porto_principal.porto().retorne_pescador(pescador)):
-          # O pescador não estava no porto principal.
-          mensagens.append(_(u'%s ficou sem ração, e foi resgatado até o porto.') % nome)
-          # Remover dos barcos e outros portos.
-          for nome_barco, barco in self._barcos.items():
-            if (barco.desembarque(pescador)):
-              if (len(barco.pescadores()) == 0):
-                # Se o barco ficou vazio, tem que voltar ao porto tambem.
-                barco.defina_posicao(porto_principal)
-                mensagens.append(
-                  _(u'Barco %s ficou sem tripulação, e foi rebocado até o porto.' ) %
-                  barco.nome())
-              achou = True
-              break
-          if (not achou):
-            # Deve estar em algum porto
-            for pos_porto in self._mapa.portos():
-              if (pos_porto != porto_principal):
-                pos_porto.porto().remova_pescador(pescador)
-        else:
-          mensagens.append(
-            _(u'%s ficou sem ração, e teve que comprar uma ao preço do dia.') % nome)
-          
+    if self._estado is not None:
+      sem_racao = self._estado.desconte_racoes()
+      for indice in sem_racao:
+        self._resgate_sem_racao(self._estado.pescador(indice), porto_principal, mensagens)
+
+      # Venda compulsória de uma ração a todos os resgatados, consumida em seguida.
+      vendido = self._estado.venda_racoes(sem_racao, 1, mercado.preco_racao())
+      self._estado.racoes()[sem_racao[vendido]] -= 1
+      for indice in sem_racao[vendido]:
+        mercado.lance_venda(self._estado.pescador(indice), RACOES, 1, mercado.preco_racao(),
+                            RESGATE)
+    else:
+      for nome, pescador in self._pescadores.items():
+        if (not pescador.desconte_racao()):
+          self._resgate_sem_racao(pescador, porto_principal, mensagens)
           
-        # Agora que o pescador está no porto principal,
-        # venda para ele compulsoriamente uma ração, e desconte novamente.
-        porto_principal.porto().mercado().venda_racoes(pescador, 1)
-        pescador.desconte_racao()
+          # Agora que o pescador está no porto principal,
+          # venda para ele compulsoriamente uma ração, e desconte novamente.
+          mercado.venda_racoes(pescador, 1, RESGATE)
+          pescador.desconte_racao()
         
     return mensagens
+
+  def _resgate_sem_racao(self, pescador, porto_principal, mensagens):
+    u""" Traz ao porto principal um pescador que ficou sem ração.
+
+        Parameters:
+          mensagens: [Evento, ...] - Recebe os eventos do resgate.
+    """
+    nome = pescador.nome()
+    barco = self._barco_pescador.get(nome)
+    pos_porto = self._porto_pescador.get(nome)
+    if (self._ponha_em_terra(pescador, porto_principal)):
+      # O pescador não estava no porto principal.
+      if not self._silencioso:
+        mensagens.append(ResgateRacao(nome))
+      # Remover do barco ou do outro porto onde estava.
+      if barco is not None:
+        barco.desembarque(pescador)
+        if (len(barco.pescadores()) == 0):
+          # Se o barco ficou vazio, tem que voltar ao porto tambem.
+          barco.defina_posicao(porto_principal)
+          self._rotas.pop(barco.nome(), None)
+          if not self._silencioso:
+            mensagens.append(BarcoRebocado(barco.nome()))
+      elif pos_porto is not None:
+        pos_porto.porto().remova_pescador(pescador)
+    elif not self._silencioso:
+      mensagens.append(RacaoCompulsoria(nome))
   
   def pescadores_nos_mercados(self):
     u""" Devolve nomes dos pescadores que estão em algum porto com mercado.
@@ -1243,130 +3990,256 @@ class Jogo:
     nomes = []
     
     # Encontrar pescadores que estão em portos com mercado.
-    for pos_porto in self._mapa.portos():
-      porto = pos_porto.porto()
-      if porto.mercado() != None:
-        pescadores = porto.pescadores_em_terra()
-        
-        for pescador in pescadores:
-          nomes.append(pescador.nome())
+    for pos_porto in self._mapa.portos_com_mercado():
+      for pescador in pos_porto.porto().pescadores_em_terra():
+        nomes.append(pescador.nome())
 
     return nomes
   
+  @registre_no_diario
   def atenda_pescador(self, nome, pedidos):
     u""" Atende aos pedidos de compras de um pescador.
     
         Attributes:
           nome: str - Nome do pescador
-          pedidos: [(tipo_de_pedido: str, detalhe, ...), ...]
+          pedidos: [(tipo_de_pedido, detalhe, ...), ...]
           
         Notes:
           Para as rotinas que se seguem, envolvendo transações com bens,
           As listas de bens/pedidos contêm tuplas, em que
-          o primeiro elemento é o tipo de bem (barco, rações, etc) e
+          o primeiro elemento é o código do tipo de bem (BARCO, RACOES, etc) e
           os demais são detalhes, como quantidade, etc.
-          Os tipos de bens incluem: barco, curso, rações, redes e dinheiro.
+          Os tipos de bens são: BARCO, CURSO, RACOES, REDES e DINHEIRO.
+          Ver 'Códigos do protocolo do Jogo'.
+        Returns:
+          [atendido:bool, ...] - Para cada pedido, se foi atendido. Os pedidos não são
+            atendidos se falta dinheiro, se o curso já está no nível máximo, ou se o
+            pescador não está em um mercado.
+    """
+    return self._atenda(nome, pedidos)
+
+  @registre_no_diario
+  def atenda_pescadores(self, pedidos_pescadores):
+    u""" Atende de uma vez aos pedidos de compras de vários pescadores.
+
+        Primeiro, todos os pedidos são conferidos, sem alterar o jogo, contra o saldo
+        de cada pescador e os níveis dos cursos. Depois, só os pedidos aceitos são
+        atendidos. O resultado é o mesmo de atender os pedidos na ordem dada, com
+        atenda_pescador(), mas só são tentadas as vendas que serão feitas.
+
+        Attributes:
+          pedidos_pescadores: {nome:str: [pedido, ...]} - Pedidos de cada pescador,
+            como em atenda_pescador()
+        Returns:
+          {nome:str: [atendido:bool, ...]} - Resultado de cada pedido
+    """
+    # Primeiro passo: conferir todos os pedidos.
+    conferidos = []
+    for (nome, pedidos) in pedidos_pescadores.items():
+      (pescador, pos_porto, mercado) = self._pescador_no_mercado(nome)
+      aceitos = self._confira_pedidos(pescador, mercado, pedidos)
+      conferidos.append((nome, pescador, pos_porto, mercado, pedidos, aceitos))
+
+    # Agora é pra valer...
+    resultados = {}
+    for (nome, pescador, pos_porto, mercado, pedidos, aceitos) in conferidos:
+      resultados[nome] = [aceito and self._ATENDIMENTOS[pedido[0]](self, pescador, pos_porto,
+                                                                     mercado, pedido)
+                          for (pedido, aceito) in zip(pedidos, aceitos)]
+    return resultados
+
+  def _atenda(self, nome, pedidos):
+    return self.atenda_pescadores({nome: pedidos})[nome]
+
+  def _confira_pedidos(self, pescador, mercado, pedidos):
+    u""" Confere quais pedidos de um pescador serão atendidos, sem alterar o jogo.
+
+        Returns:
+          [aceito:bool, ...] - Para cada pedido, se há saldo e curso disponível
+    """
+    if mercado is None:
+      return [False] * len(pedidos)
+    saldo = pescador.consulte_saldo()
+    niveis = {CURSO_NAVEGACAO: pescador.destreza_em_navegacao(),
+              CURSO_PESCA: pescador.destreza_na_pesca()}
+    aceitos = []
+    for pedido in pedidos:
+      custe = self._CUSTOS.get(pedido[0])
+      if custe is None:
+        debug_print(u'Jogo::atenda_pescador() - Pedido inválido: %s' % (pedido[0],))
+        custo = None
+      else:
+        custo = custe(self, mercado, niveis, pedido)
+      if custo is not None and custo <= saldo:
+        saldo -= custo
+        if pedido[0] == CURSO:
+          niveis[pedido[1]] += 1
+        aceitos.append(True)
+      else:
+        aceitos.append(False)
+    return aceitos
+
+  def _custo_barco(self, mercado, niveis, pedido):
+    return mercado.preco_barco(pedido[1])
+
+  def _custo_curso(self, mercado, niveis, pedido):
+    if pedido[1] not in niveis:
+      return None
+    return mercado.preco_curso(niveis[pedido[1]] + 1)
+
+  def _custo_racoes(self, mercado, niveis, pedido):
+    return int(pedido[1]) * mercado.preco_racao()
+
+  def _custo_redes(self, mercado, niveis, pedido):
+    return int(pedido[1]) * mercado.preco_rede()
+
+  _CUSTOS = {BARCO: _custo_barco,
+             CURSO: _custo_curso,
+             RACOES: _custo_racoes,
+             REDES: _custo_redes}
+
+  def _pescador_no_mercado(self, nome):
+    u""" Retorna (pescador, pos_porto, mercado) de um pescador em terra. O mercado
+        é None se o pescador não existe ou não está em um porto com mercado.
     """
     mercado = None
+    pos_porto = None
     
-    if nome == _(u'Mestre'):
+    if nome == self._nome_mestre:
       pescador = self._mestre
       pos_porto = self._mapa.porto_principal()
       mercado = pos_porto.porto().mercado()
     else:
       pescador = self._pescadores.get(nome)
-      if pescador != None:
-        for pos_porto in self._mapa.portos():
-          porto = pos_porto.porto()
-          if (porto.tem_pescador(pescador) and (porto.mercado() != None)):
-            mercado = porto.mercado()
-            break
-    
-    if mercado is not None:
-      # Encontrou mercado onde se encontra o pescador.
-      for pedido in pedidos:
-        if (pedido[0] == _(u'barco')):
-          # TODO: Tabela de barcos no mercado
-          nome_barco = pedido[2]
-          (barco_novo, preco) = mercado.fabrique_barco(pedido[1], nome_barco)
-          if mercado.venda_barco(pescador, barco_novo, preco):
-            self._barcos[nome_barco] = barco_novo
-            barco_novo.defina_posicao(pos_porto)
-            
-        elif (pedido[0] == _(u'curso')):
-          if (pedido[1] == _(u'navegação')):
-            mercado.venda_curso_navegacao(pescador)
-          elif (pedido[1] == _(u'pesca')):
-            mercado.venda_curso_pesca(pescador)
-        elif (pedido[0] == _(u'rações')):
-            mercado.venda_racoes(pescador, int(pedido[1]))
-        elif (pedido[0] == _(u'redes')):
-            mercado.venda_redes(pescador, int(pedido[1]))
-        else:
-          debug_print(_(u'Jogo::atenda_pescador() - Pedido inválido: ') + pedido[0])
+      pos_porto = self._porto_pescador.get(nome)
+      if pescador != None and pos_porto != None:
+        mercado = pos_porto.porto().mercado()
+    return (pescador, pos_porto, mercado)
+
+  def _atenda_barco(self, pescador, pos_porto, mercado, pedido):
+    # TODO: Tabela de barcos no mercado
+    nome_barco = pedido[2]
+    (barco_novo, preco) = mercado.fabrique_barco(pedido[1], nome_barco, self._novo_barco)
+    if mercado.venda_barco(pescador, barco_novo, preco):
+      self._barcos[nome_barco] = barco_novo
+      self._dono_barco[nome_barco] = pescador
+      barco_novo.defina_posicao(pos_porto)
+      return True
+    return False
+
+  def _atenda_curso(self, pescador, pos_porto, mercado, pedido):
+    if pedido[1] == CURSO_NAVEGACAO:
+      return mercado.venda_curso_navegacao(pescador)
+    elif pedido[1] == CURSO_PESCA:
+      return mercado.venda_curso_pesca(pescador)
+    return False
+
+  def _atenda_racoes(self, pescador, pos_porto, mercado, pedido):
+    return mercado.venda_racoes(pescador, int(pedido[1]))
+
+  def _atenda_redes(self, pescador, pos_porto, mercado, pedido):
+    return mercado.venda_redes(pescador, int(pedido[1]))
+
+  _ATENDIMENTOS = {BARCO: _atenda_barco,
+                   CURSO: _atenda_curso,
+                   RACOES: _atenda_racoes,
+                   REDES: _atenda_redes}
         
+  @registre_no_diario
   def transfira_bens(self, nome_vendedor, nome_comprador, bens, contrato):
     u""" Transfere bens entre pescadores (também usado com o Mestre).
     
         Attributes:
           nome_*: str - Nome do vendedor e do comprador
-          bens: [(tipo_de_bem: str, detalhe, ...), ...] - Bens a transferir, inclusive dinheiro.
+          bens: [(tipo_de_bem, detalhe, ...), ...] - Bens a transferir, inclusive dinheiro.
           contrato: str - Razão da transferência (doação, compra e venda, etc)
         Returns:
-          [msg: str, ...] - Mensagens
+          [Evento, ...] - Eventos da transação
     """
     mensagens = []
 
-    if nome_comprador == _(u'Mestre'):
+    if nome_comprador == self._nome_mestre:
       comprador = self._mestre
     else:
       comprador = self._pescadores.get(nome_comprador)
 
-    if nome_vendedor == _(u'Mestre'):
+    if nome_vendedor == self._nome_mestre:
       vendedor = self._mestre
     else:
       vendedor = self._pescadores.get(nome_vendedor)
 
     if comprador != None and vendedor != None:
-      mensagens.append(_(u'Transação entre %s (comprador) e %s (vendedor) relativa a \n %s') %
-                       (nome_comprador, nome_vendedor, contrato))
+      mensagens.append(Transacao(nome_comprador, nome_vendedor, contrato))
 
       # Primeiro passo: Validar a transação (saldo e número de redes.
       transferencia_valida = True
       for bem in bens:
-        if (bem[0] == _(u'redes')):
-          if vendedor.redes() < int(bem[1]):
-            mensagens.append(_(u'O vendedor não tem o número de redes prometido.'))
-            transferencia_valida = False
-            break
-        elif (bem[0] == _(u'dinheiro')):
-          if comprador.consulte_saldo() < int(bem[1]):
-            mensagens.append(_(u'O comprador não tem saldo para pagar a transação.'))
+        valide = self._VALIDACOES.get(bem[0])
+        if valide is not None:
+          erro = valide(self, vendedor, comprador, bem)
+          if erro is not None:
+            mensagens.append(erro)
             transferencia_valida = False
             break
 
       if transferencia_valida:
          # Agora é pra valer...
+        lancamentos = []
         for bem in bens:
-          if (bem[0] == _(u'barco')):
-            barco = self._barcos[bem[2]]
-            vendedor.remova_barco(barco)
-            comprador.adicione_barco(barco)
-            mensagens.append(_(u'Barco %s de nome %s') % (barco.tipo(), barco.nome()))
-          elif (bem[0] == _(u'redes')):
-            num_redes = int(bem[1])
-            if vendedor.remova_redes(num_redes):
-              comprador.adicione_redes(num_redes)
-              mensagens.append(_(u'%d redes') % num_redes)
-              
-          elif (bem[0] == _(u'dinheiro')):
-            valor = bem[1]
-            if comprador.debite(valor):
-              vendedor.credite(valor)
-              mensagens.append(_(u'Valor: R$%d,00') % valor)
+          transfira = self._TRANSFERENCIAS.get(bem[0])
+          if transfira is not None:
+            evento = transfira(self, vendedor, comprador, bem, lancamentos)
+            if evento is not None:
+              mensagens.append(evento)
           else:
-            debug_print(_(u'Jogo::transfira_bens() - Bem inválido: ') + bem[0])
+            debug_print(u'Jogo::transfira_bens() - Bem inválido: %s' % (bem[0],))
+        # Todos os bens do contrato em uma só transação.
+        if len(lancamentos) > 0:
+          self._livro.lance(CONTRATO, lancamentos)
     return mensagens
+
+  def _valide_redes(self, vendedor, comprador, bem):
+    if vendedor.redes() < int(bem[1]):
+      return RedesInsuficientes()
+    return None
+
+  def _valide_dinheiro(self, vendedor, comprador, bem):
+    if comprador.consulte_saldo() < int(bem[1]):
+      return SaldoInsuficiente()
+    return None
+
+  def _transfira_barco(self, vendedor, comprador, bem, lancamentos):
+    barco = self._barcos[bem[2]]
+    vendedor.remova_barco(barco)
+    comprador.adicione_barco(barco)
+    self._dono_barco[barco.nome()] = comprador
+    lancamentos.extend([(vendedor.nome(), BARCO, -1), (comprador.nome(), BARCO, 1)])
+    return BarcoTransferido(barco.tipo(), barco.nome())
+
+  def _transfira_redes(self, vendedor, comprador, bem, lancamentos):
+    num_redes = int(bem[1])
+    if vendedor.remova_redes(num_redes):
+      comprador.adicione_redes(num_redes)
+      lancamentos.extend([(vendedor.nome(), REDES, -num_redes),
+                          (comprador.nome(), REDES, num_redes)])
+      return RedesTransferidas(num_redes)
+    return None
+
+  def _transfira_dinheiro(self, vendedor, comprador, bem, lancamentos):
+    valor = bem[1]
+    if comprador.debite(valor):
+      vendedor.credite(valor)
+      lancamentos.extend([(comprador.nome(), DINHEIRO, -valor),
+                          (vendedor.nome(), DINHEIRO, valor)])
+      return DinheiroTransferido(valor)
+    return None
+
+  _VALIDACOES = {REDES: _valide_redes,
+                 DINHEIRO: _valide_dinheiro}
+
+  _TRANSFERENCIAS = {BARCO: _transfira_barco,
+                     REDES: _transfira_redes,
+                     DINHEIRO: _transfira_dinheiro}
         
   def inventario_pescador(self, nome):
     u""" Retorna bens de um pescador em formato semelhante
@@ -1377,22 +4250,22 @@ class Jogo:
     """
     bens = []
 
-    if nome == _(u'Mestre'):
+    if nome == self._nome_mestre:
       pescador = self._mestre
     else:
       pescador = self._pescadores[nome]
 
-      bens.append((_(u'rações'), pescador.consulte_racoes()))
+      bens.append((RACOES, pescador.consulte_racoes()))
     
-      bens.append((_(u'curso'), _(u'navegação'), pescador.destreza_em_navegacao()))
-      bens.append((_(u'curso'), _(u'pesca'), pescador.destreza_na_pesca()))
+      bens.append((CURSO, CURSO_NAVEGACAO, pescador.destreza_em_navegacao()))
+      bens.append((CURSO, CURSO_PESCA, pescador.destreza_na_pesca()))
 
     for barco in pescador.barcos():
-      bens.append((_(u'barco'), barco.tipo(), barco.nome()))
+      bens.append((BARCO, barco.tipo(), barco.nome()))
       
-    bens.append((_(u'redes'), pescador.redes()))
+    bens.append((REDES, pescador.redes()))
 
-    bens.append((_(u'dinheiro'), pescador.consulte_saldo()))
+    bens.append((DINHEIRO, pescador.consulte_saldo()))
     return bens
   
   def estado_barco(self, nome_barco):
@@ -1410,20 +4283,20 @@ class Jogo:
     
     caracteristicas = []
     
-    caracteristicas.append((_(u'posição'), barco.posicao().nome()))
+    caracteristicas.append((self._tr(u'posição'), barco.posicao().nome()))
     
     (x, y) = self._mapa.posicao_na_imagem(barco.posicao())
-    caracteristicas.append((_(u'coordenadas'), u'(%d,%d)' % (x, y)))
+    caracteristicas.append((self._tr(u'coordenadas'), u'(%d,%d)' % (x, y)))
 
-    caracteristicas.append((_(u'capacidade restante'), str(barco.carga_livre())))
+    caracteristicas.append((self._tr(u'capacidade restante'), str(barco.carga_livre())))
     
     quantas_redes = 0
     
     for pescador in barco.pescadores():
-      caracteristicas.append((_(u'pescador'), pescador.nome()))
+      caracteristicas.append((self._tr(u'pescador'), pescador.nome()))
       quantas_redes += pescador.redes()
       
-    caracteristicas.append((_(u'redes'), str(quantas_redes)))
+    caracteristicas.append((self._tr(u'redes'), str(quantas_redes)))
 
     return caracteristicas
   
@@ -1456,6 +4329,7 @@ class Jogo:
         nomes_pescadores.append(pescador.nome())
     return nomes_pescadores
   
+  @registre_no_diario
   def embarque(self, nome_barco, nomes_pescadores):
     u""" Embarca pescadores em um barco
     
@@ -1464,7 +4338,7 @@ class Jogo:
           nomes_pescadores: [nome:str, ...] - Pescadores a embarcar
           
         Returns:
-          [msg:str, ...] - Mensagens relativas às operações realizadas.
+          [Evento, ...] - Eventos relativos às operações realizadas.
     """
     mensagens = []
     barco = self._barcos[nome_barco]
@@ -1472,14 +4346,19 @@ class Jogo:
     if porto != None:
       for nome_pescador in nomes_pescadores:
         if barco.vagas() < 1:
-          mensagens.append(_(u'Vagas esgotadas no barco %s.') % nome_barco)
+          if not self._silencioso:
+            mensagens.append(VagasEsgotadas(nome_barco))
           break
         pescador = self._pescadores[nome_pescador]
         if porto.remova_pescador(pescador):
-          mensagens.append(_(u'Embarcando %s no barco %s.') % (nome_pescador, nome_barco))
+          if not self._silencioso:
+            mensagens.append(Embarque(nome_pescador, nome_barco))
           barco.embarque(pescador)
+          self._porto_pescador.pop(nome_pescador, None)
+          self._barco_pescador[nome_pescador] = barco
     return mensagens
 
+  @registre_no_diario
   def destrua_rede(self, nome_barco):
     u""" Remover a rede de algum pescador do barco indicado.
     
@@ -1490,60 +4369,140 @@ class Jogo:
     barco = self._barcos[nome_barco]
     for pescador in barco.pescadores():
       if (pescador_escolhido == None or
-          pescador_escolhido.destreza_pesca() > pescador.destreza_pesca()):
+          pescador_escolhido.destreza_na_pesca() > pescador.destreza_na_pesca()):
           pescador_escolhido = pescador
 
     pescador_escolhido.remova_redes(1)
         
+  @registre_no_diario
   def credite_jornadas(self):
     u""" Creditar valor de uma jornada para cada pescador em terra.
     
         Returns:
-          [msg:str, ...] - Mensagens descrevendo as operações realizadas.
+          [Evento, ...] - Eventos descrevendo as operações realizadas.
     """
     mensagens = []
+    em_terra = []
+    nomes = []
     for pos_porto in self._mapa.portos():
       for pescador in pos_porto.porto().pescadores_em_terra():
-        pescador.credite(self._preco_jornada)
-        mensagens.append(_(u'%s recebeu R$%d,00 para trabalhar em %s.') %
-                          (pescador.nome(),self._preco_jornada, pos_porto.nome() ))
+        if self._estado is not None:
+          em_terra.append(pescador.indice())
+        else:
+          pescador.credite(self._preco_jornada)
+        nomes.append(pescador.nome())
+        if not self._silencioso:
+          mensagens.append(JornadaCreditada(pescador.nome(), self._preco_jornada,
+                                            pos_porto.nome()))
+    if self._estado is not None:
+      self._estado.credite(em_terra, self._preco_jornada)
+    self._livro.distribua(JORNADA, CONTA_COLONIA, nomes, DINHEIRO, self._preco_jornada)
     return mensagens
   
+  @registre_no_diario
   def prepare_jornadas(self):
     u""" Preparar escolhas de jornada para cada barco tripulado.
+
+        Os barcos que seguem uma rota (ver adicione_rota()) recebem aqui a jornada
+        do próximo trecho, e não aparecem na lista de escolhas.
     
         Returns:
-          [(nome_barco:str, [jornada:str, ...]), ...] - Pares com nome do barco
-            e lista de jornadas possíveis.
+          [(nome_barco:str, [jornada, ...]), ...] - Pares com nome do barco
+            e lista de jornadas possíveis, (PESCAR,) ou (NAVEGAR, nome_destino).
     """
     barcos_jornadas = []
+    grafo = self._mapa.grafo()
+    nomes = grafo.nomes()
     for nome_barco, barco in self._barcos.items():
       if len(barco.pescadores()) > 0:
         # Apenas barcos tripulados podem navegar ou pescar.
         if barco.em_atraso():
-          self._jornadas_pendentes.append((nome_barco, _(u'descontar atraso')))
+          self._jornadas_pendentes.append((nome_barco, (DESCONTAR_ATRASO,)))
+        elif nome_barco in self._rotas:
+          rota = self._rotas[nome_barco]
+          self._jornadas_pendentes.append((nome_barco, (NAVEGAR, rota.pop(0))))
+          if len(rota) == 0:
+            del self._rotas[nome_barco]
         else:
           jornadas = []
-          posicao = barco.posicao()
-          if barco.posicao().pesqueiro() != None:
-            jornadas.append(_(u'pescar'))
-          for destino in posicao.adjacencias():
-            jornadas.append(_(u'navegar para %s') % destino.nome())
+          indice = barco.posicao().indice()
+          if grafo.tem_pesqueiro(indice):
+            jornadas.append((PESCAR,))
+          for destino in grafo.vizinhos(indice):
+            jornadas.append((NAVEGAR, nomes[destino]))
           if len(jornadas) > 0:
             barcos_jornadas.append((nome_barco, jornadas))
     return barcos_jornadas
 
+  @registre_no_diario
+  def adicione_rota(self, nome_barco, destinos):
+    u""" Define uma rota de vários dias para um barco.
+
+        A cada dia, prepare_jornadas() faz o barco navegar para o próximo trecho,
+        sem pedir uma escolha à interface. A rota é abandonada se o barco naufraga,
+        fica sem tripulação, ou desembarca os pescadores em um porto.
+
+        Attributes:
+          nome_barco: str - O barco
+          destinos: [nome_posicao:str, ...] - Posições a visitar, em ordem. Cada uma
+            deve ser adjacente à anterior, e a primeira, à posição atual do barco.
+        Returns:
+          True - Se a rota foi aceita
+          False - Se algum trecho não é uma rota de navegação do mapa
+    """
+    grafo = self._mapa.grafo()
+    indice = self._barcos[nome_barco].posicao().indice()
+    for nome in destinos:
+      proximo = grafo.indice(nome)
+      if proximo is None or proximo not in grafo.vizinhos(indice):
+        return False
+      indice = proximo
+    if len(destinos) > 0:
+      self._rotas[nome_barco] = list(destinos)
+    else:
+      self._rotas.pop(nome_barco, None)
+    return True
+
+  def rota_barco(self, nome_barco):
+    u""" Retorna os trechos que faltam na rota de um barco.
+
+        Returns:
+          [nome_posicao:str, ...] - Vazia, se o barco não segue uma rota.
+    """
+    return list(self._rotas.get(nome_barco, []))
+
+  def planeje_rota(self, nome_barco, destino, penalidade = PENALIDADE_NAUFRAGIO):
+    u""" Sugere a rota mais segura e rápida de um barco até um destino.
+
+        Considera a resistência e danos do barco, e a destreza em navegação da
+        tripulação atual. Ver PlanejadorRotas.
+
+        Returns:
+          [nome_posicao:str, ...] - Rota para adicione_rota(), ou None se não há caminho.
+    """
+    barco = self._barcos[nome_barco]
+    (resistencia, danos) = barco.caracteristicas()
+    destreza = 0
+    for pescador in barco.pescadores():
+      destreza += pescador.destreza_em_navegacao()
+    planejador = planejador_de_rotas(self._mapa, destreza, resistencia, danos, penalidade)
+    return planejador.rota(barco.posicao().nome(), destino)
+
+  @registre_no_diario
   def adicione_jornada(self, nome_barco, jornada):
     u""" Define jornada para um barco
     
         As jornadas podem ser pescar, descontar atraso ou navegar para um destino.
+        A lista pode vir de json, com as tuplas convertidas em listas.
     
         Attributes:
           nome_barco: str - O barco
-          jornada: str - Indica o que o barco irá fazer
+          jornada: (PESCAR,), (NAVEGAR, nome_destino) ou (DESCONTAR_ATRASO,) - Indica o
+            que o barco irá fazer. Ver texto_jornada().
     """
     self._jornadas_pendentes.append((nome_barco, jornada))
 
+  @registre_no_diario
   def execute_jornadas(self):
     u""" Executa as jornadas pendentes para todos os barcos.
     
@@ -1551,172 +4510,424 @@ class Jogo:
         adicione_jornada().
         
         Returns:
-          [msg:str, ...] - Lista de mensagens relativas às operações realizadas.
+          [Evento, ...] - Lista de eventos relativos às operações realizadas.
+    """
+    mensagens = []
+    for (nome_barco, eventos) in self.execute_jornadas_em_fluxo():
+      mensagens.extend(eventos)
+    return mensagens
+
+  @registre_no_diario
+  def execute_jornadas_em_fluxo(self):
+    u""" Executa as jornadas pendentes, entregando o resultado de cada barco assim
+        que ele é resolvido.
+
+        Permite que a interface comece a mostrar os eventos antes do fim do dia, e
+        que dias com milhares de barcos não acumulem todos os eventos em memória.
+        As jornadas só avançam enquanto o gerador é consumido.
+
+        Yields:
+          (nome_barco:str, [Evento, ...]) - Eventos da jornada de um barco.
+            Os eventos que não são de um barco, como o separador inicial e o
+            resumo das rações ao fim do dia, vêm com nome_barco None.
     """
-    mensagens = [u'']
+    falar = not self._silencioso
+
+    if falar:
+      yield (None, [Separador()])
+
+    if self._em_lote and numpy is not None:
+      sorteios = self._sorteie_em_lote()
+    else:
+      sorteios = {}
 
     while (len(self._jornadas_pendentes) > 0):
+      indice = len(self._jornadas_pendentes) - 1
       (nome_barco, jornada) = self._jornadas_pendentes.pop()
-      barco = self._barcos[nome_barco]
-      posicao_atual = barco.posicao()
-      
-      barco_chegou = False
-      barco_pescou = False
-      
-      prefixo = _(u'navegar para ')
+      eventos = []
+      self._execute_jornada(nome_barco, jornada, eventos, sorteios.get(indice))
+      yield (nome_barco, eventos)
+            
+    if falar:
+      if self._estado is not None:
+        racoes = zip(self._pescadores.keys(), self._estado.racoes().tolist())
+      else:
+        racoes = [(nome, pescador.consulte_racoes())
+                  for (nome, pescador) in self._pescadores.items()]
+      yield (None, [RacoesRestantes(list(racoes))])
+
+  def _sorteie_em_lote(self):
+    u""" Sorteia de uma vez os dados de todas as jornadas pendentes.
 
-      if jornada.startswith(prefixo):
-        destino = jornada[len(prefixo):].strip()
+        As jornadas são agrupadas por posição: os barcos que deixam a mesma posição
+        enfrentam o mesmo perigo, e os que pescam no mesmo lugar lançam redes no
+        mesmo pesqueiro. Cada grupo é avaliado em um só passo, com Perigo.teste_lote()
+        e Pesca.lance_lote().
 
-        mensagens.append(_(u'Barco %s navegando de %s a %s.') %
-                         (nome_barco, posicao_atual.nome(), destino))
+        Returns:
+          {indice: int ou [int, ...], ...} - Para cada índice em jornadas_pendentes,
+            o resultado do teste do perigo (navegação) ou dos lançamentos de rede (pesca).
+    """
+    if self._gerador_lote is None:
+      self._gerador_lote = numpy.random.default_rng(self._rng.getrandbits(64))
 
-        perigo = posicao_atual.perigo()
+    # posicao: ([indice, ...], [destreza, ...], [resistencia, ...], [danos, ...])
+    navegacoes = {}
+    # posicao: ([indice, ...], [redes lançadas, ...], [destreza por rede, ...])
+    pescarias = {}
 
-        if (perigo != None):
+    for (indice, (nome_barco, jornada)) in enumerate(self._jornadas_pendentes):
+      barco = self._barcos[nome_barco]
+      posicao = barco.posicao()
+      if jornada[0] == NAVEGAR:
+        if posicao.perigo() != None:
           (resistencia, danos) = barco.caracteristicas()
           destreza = 0
           for pescador in barco.pescadores():
             destreza += pescador.destreza_em_navegacao()
-
-          dano = perigo.teste(destreza, resistencia, danos)
-          
-          if dano < -1:
-            mensagens.append(perigo.descricao())
-
-            # Dano grave
-            if perigo.nome() == u'ventania':
-              mensagens.append(
-                _(u'Barco %s se atrasou 2 dias para chegar a %s.') % (nome_barco, destino))
-              barco.atrase(2)
-            else:
-              # Danos severos fizeram o barco naufragar.
-              mensagens.append(_(u'Barco %s naufragou perto de %s.') %
-                              (nome_barco, posicao_atual.nome()))
-              porto = self._mapa.porto_principal().porto()
-              for pescador in barco.pescadores():
-                barco.desembarque(pescador)
-                porto.retorne_pescador(pescador)
-                mensagens.append(_(u'%s foi resgatado e está de volta a %s.') %
-                                 (pescador.nome(), self._mapa.porto_principal().nome()))
-
-              # Barco foi destruído. Remover do jogo e do pescador.
-              self._barcos.pop(nome_barco)
-              for nome_pescador,pescador in self._pescadores.items():
-                if barco in pescador.barcos():
-                  pescador.remova_barco(barco)
-                  break
-          elif dano < 0:
-            mensagens.append(perigo.descricao())
-
-            # Dano leve
-            if perigo.nome() == u'ventania':
-              mensagens.append(
-                _(u'Barco %s se atrasou 1 dia para chegar a %s.') % (nome_barco, destino))
-              barco.atrase(1)
-            else:
-              mensagens.append(
-                _(u'Barco %s perdeu parte da carga.') % nome_barco)
-              barco.reduza_carga()
-              barco_chegou = True
-              
-          else:
-            barco_chegou = True
-        else:
-            barco_chegou = True
-
-        barco.defina_posicao(self._mapa.ache_posicao(destino))
-
-      elif (jornada == _(u'pescar')):
-        pesca = posicao_atual.pesqueiro()
-        mensagens.append(_(u'Barco %s pescando em %s.') %
-                         (nome_barco, posicao_atual.nome()))
-        
-        barco_pescou = True
-
+          grupo = navegacoes.setdefault(posicao, ([], [], [], []))
+          grupo[0].append(indice)
+          grupo[1].append(destreza)
+          grupo[2].append(resistencia)
+          grupo[3].append(danos)
+      elif jornada[0] == PESCAR:
         destreza = 0
         quantas_redes = 0
-        
         for pescador in barco.pescadores():
           destreza += pescador.destreza_na_pesca()
           quantas_redes += pescador.redes()
-
         if quantas_redes > 2:
           quantas_redes = 2
+        grupo = pescarias.setdefault(posicao, ([], [], []))
+        grupo[0].append(indice)
+        grupo[1].append(quantas_redes)
+        grupo[2].extend([destreza] * quantas_redes)
+
+    sorteios = {}
+    for (posicao, (indices, destrezas, resistencias, danos)) in navegacoes.items():
+      resultados = posicao.perigo().teste_lote(numpy.array(destrezas),
+                                               numpy.array(resistencias),
+                                               numpy.array(danos),
+                                               self._gerador_lote)
+      for (indice, resultado) in zip(indices, resultados.tolist()):
+        sorteios[indice] = resultado
+
+    for (posicao, (indices, redes, destrezas)) in pescarias.items():
+      resultados = posicao.pesqueiro().lance_lote(numpy.array(destrezas, dtype = int),
+                                                  self._gerador_lote).tolist()
+      inicio = 0
+      for (indice, quantas_redes) in zip(indices, redes):
+        sorteios[indice] = resultados[inicio:inicio + quantas_redes]
+        inicio += quantas_redes
+    return sorteios
+
+  def _execute_jornada(self, nome_barco, jornada, mensagens, sorteio = None):
+    u""" Executa a jornada de um barco.
 
-        for i in range(quantas_redes):
-          resultado = pesca.pesque(destreza)
-        
-          if resultado < -1:
-            mensagens.append(_(u'Barco %s perdeu uma rede em %s.') %
-                             (nome_barco, posicao_atual.nome()))
-            self.destrua_rede(nome_barco)
-          elif resultado <= 0:
-            mensagens.append(_(u'Rede do barco %s voltou vazia em %s.') %
-                             (nome_barco, posicao_atual.nome()))
-          else:
-            mensagens.append(_(u'Barco %s pescou %d quilos de peixe em %s.') %
-                             (nome_barco, resultado, posicao_atual.nome()))
-            barco.carregue(resultado)
- 
+        Parameters:
+          mensagens: [Evento, ...] - Recebe os eventos relativos à jornada.
+          sorteio: int ou [int, ...] - Resultado já sorteado do teste do perigo,
+            ou dos lançamentos de rede. Se omitido, os dados são lançados aqui.
+    """
+    falar = not self._silencioso
 
-      elif (jornada == _(u'descontar atraso')):
-        barco.desconte_atraso()
-        if barco.em_atraso():
-          mensagens.append(_(u'Barco %s atrasado para chegar a %s.') %
-                  (nome_barco, posicao_atual.nome()))
+    barco = self._barcos[nome_barco]
+
+    execute = self._JORNADAS.get(jornada[0])
+    if execute is not None:
+      (barco_chegou, barco_pescou) = execute(self, nome_barco, barco, jornada, mensagens,
+                                             sorteio)
+    else:
+      debug_print(u'Jornada desconhecida para barco %s: %s' % (nome_barco, jornada))
+      (barco_chegou, barco_pescou) = (False, False)
+
+    posicao = barco.posicao()
+    if falar and (barco_chegou or barco_pescou):
+      (x,y) = self._mapa.posicao_na_imagem(posicao)
+      mensagens.append(BarcoMovido(nome_barco, x, y))
+      
+    if barco_chegou:
+      self._chegue(nome_barco, barco, posicao, mensagens)
+
+  def _navegue(self, nome_barco, barco, jornada, mensagens, sorteio):
+    u""" Jornada (NAVEGAR, destino): enfrenta o perigo da posição atual e segue viagem.
+
+        Returns:
+          (barco_chegou:bool, barco_pescou:bool)
+    """
+    falar = not self._silencioso
+    posicao_atual = barco.posicao()
+    barco_chegou = False
+    destino = jornada[1]
+
+    if falar:
+      mensagens.append(BarcoNavegando(nome_barco, posicao_atual.nome(), destino))
+
+    perigo = posicao_atual.perigo()
+
+    if (perigo != None):
+      if sorteio is None:
+        (resistencia, danos) = barco.caracteristicas()
+        destreza = 0
+        for pescador in barco.pescadores():
+          destreza += pescador.destreza_em_navegacao()
+
+        dano = perigo.teste(destreza, resistencia, danos, self._rng.randint)
+      else:
+        dano = sorteio
+        
+      if dano < -1:
+        if falar:
+          mensagens.append(PerigoOcorrido(perigo.nome(), perigo.descricao()))
+
+        # Dano grave
+        if perigo.nome() == u'ventania':
+          if falar:
+            mensagens.append(BarcoAtrasado(nome_barco, destino, 2))
+          barco.atrase(2)
         else:
+          # Danos severos fizeram o barco naufragar.
+          if falar:
+            mensagens.append(Naufragio(nome_barco, posicao_atual.nome()))
+          porto_principal = self._mapa.porto_principal()
+          # É preciso fazer uma cópia, porque vamos alterar a original.
+          for pescador in list(barco.pescadores()):
+            barco.desembarque(pescador)
+            self._ponha_em_terra(pescador, porto_principal)
+            if falar:
+              mensagens.append(PescadorResgatado(pescador.nome(),
+                                                 self._mapa.porto_principal().nome()))
+
+          # Barco foi destruído. Remover do jogo e do pescador.
+          self._barcos.pop(nome_barco)
+          self._rotas.pop(nome_barco, None)
+          dono = self._dono_barco.pop(nome_barco, None)
+          if dono is not None:
+            dono.remova_barco(barco)
+      elif dano < 0:
+        if falar:
+          mensagens.append(PerigoOcorrido(perigo.nome(), perigo.descricao()))
+
+        # Dano leve
+        if perigo.nome() == u'ventania':
+          if falar:
+            mensagens.append(BarcoAtrasado(nome_barco, destino, 1))
+          barco.atrase(1)
+        else:
+          if falar:
+            mensagens.append(CargaPerdida(nome_barco))
+          barco.reduza_carga()
           barco_chegou = True
+            
       else:
-        debug_print(_(u'Jornada desconhecida para barco %s: %s') % (nome_barco, jornada))
+        barco_chegou = True
+    else:
+      barco_chegou = True
 
-      posicao = barco.posicao()
-      if (barco_chegou or barco_pescou):
-        (x,y) = self._mapa.posicao_na_imagem(posicao)
-        mensagens.append(_(u'#coord:barco=%s;x=%d;y=%d') % (nome_barco, x, y))
-        
-      if barco_chegou:
-        mensagens.append(_(u'Barco %s chegou em %s.') % (nome_barco, posicao.nome()))
+    barco.defina_posicao(self._mapa.ache_posicao(destino))
+    return (barco_chegou, False)
 
-        if posicao.porto() != None:
-          porto = posicao.porto()
-          mercado = porto.mercado()
-          quota = 0
-          # É preciso fazer uma cópia, porque vamos alterar a original.
-          pescadores = list(barco.pescadores())
+  def _pesque(self, nome_barco, barco, jornada, mensagens, sorteio):
+    u""" Jornada (PESCAR,): lança as redes da tripulação no pesqueiro da posição atual.
 
-          if mercado != None:
-            # Vender o pescado e distribuir entre os pescadores no barco
-            valor = mercado.compre_pescado(barco)
-            quota = int(valor / len(pescadores))
-            
-            mensagens.append(_(u'Barco %s vendeu pescado no valor de $R%d,00.') %
-                    (nome_barco, valor))
+        Returns:
+          (barco_chegou:bool, barco_pescou:bool)
+    """
+    falar = not self._silencioso
+    posicao_atual = barco.posicao()
 
-          # Desembarcar pescadores
-          for pescador in pescadores:
-            pescador.credite(quota)
-            porto.retorne_pescador(pescador)
-            barco.desembarque(pescador)
-            
-    msg_racoes = _(u'\nRações restantes: ')
+    pesca = posicao_atual.pesqueiro()
+    if falar:
+      mensagens.append(BarcoPescando(nome_barco, posicao_atual.nome()))
 
-    for (nome, pescador) in self._pescadores.items():
-      msg_racoes += _(u'%s tem %d, ') % (nome, pescador.consulte_racoes())
+    if sorteio is None:
+      destreza = 0
+      quantas_redes = 0
+        
+      for pescador in barco.pescadores():
+        destreza += pescador.destreza_na_pesca()
+        quantas_redes += pescador.redes()
+
+      if quantas_redes > 2:
+        quantas_redes = 2
+
+      sorteio = [pesca.lance(destreza, self._rng.randint) for i in range(quantas_redes)]
+
+    for resultado in sorteio:
+      if resultado > 0:
+        # Só sai do pesqueiro, e só é contado, o que coube no barco.
+        # Com o barco cheio, a rede volta vazia.
+        resultado = barco.carregue(pesca.pescado(resultado))
+        pesca.retire(resultado)
+      if resultado < -1:
+        if falar:
+          mensagens.append(RedePerdida(nome_barco, posicao_atual.nome()))
+        self.destrua_rede(nome_barco)
+      elif resultado <= 0:
+        if falar:
+          mensagens.append(RedeVazia(nome_barco, posicao_atual.nome()))
+      else:
+        if falar:
+          mensagens.append(Pescaria(nome_barco, resultado, posicao_atual.nome()))
+    return (False, True)
 
-    mensagens.append(msg_racoes)
-    return mensagens
+  def _desconte_atraso(self, nome_barco, barco, jornada, mensagens, sorteio):
+    u""" Jornada (DESCONTAR_ATRASO,): o barco espera um dia.
+
+        Returns:
+          (barco_chegou:bool, barco_pescou:bool)
+    """
+    barco.desconte_atraso()
+    if barco.em_atraso():
+      if not self._silencioso:
+        mensagens.append(BarcoEmEspera(nome_barco, barco.posicao().nome()))
+      return (False, False)
+    return (True, False)
+
+  _JORNADAS = {NAVEGAR: _navegue,
+               PESCAR: _pesque,
+               DESCONTAR_ATRASO: _desconte_atraso}
+
+  def _chegue(self, nome_barco, barco, posicao, mensagens):
+    u""" O barco chegou a uma posição: se há porto, vende o pescado e desembarca
+        a tripulação.
+    """
+    falar = not self._silencioso
+    if falar:
+      mensagens.append(BarcoChegou(nome_barco, posicao.nome()))
+
+    if posicao.porto() != None:
+      porto = posicao.porto()
+      mercado = porto.mercado()
+      quota = 0
+      # É preciso fazer uma cópia, porque vamos alterar a original.
+      pescadores = list(barco.pescadores())
+
+      if mercado != None:
+        # Vender o pescado e distribuir entre os pescadores no barco
+        valor = mercado.compre_pescado(barco)
+        quota = int(valor / len(pescadores))
+          
+        if falar:
+          mensagens.append(PescadoVendido(nome_barco, valor))
+
+      # Desembarcar pescadores
+      self._rotas.pop(nome_barco, None)
+      for pescador in pescadores:
+        pescador.credite(quota)
+        self._ponha_em_terra(pescador, posicao)
+        barco.desembarque(pescador)
+      if quota > 0:
+        self._livro.distribua(PESCADO, conta_mercado(posicao.nome()),
+                              [pescador.nome() for pescador in pescadores], DINHEIRO, quota)
   
   def extratos_pescadores(self):
     u""" Retorna dicionário com os saldos em dinheiro de cada pescador no jogo.
     """
     extratos = {}
     
-    extratos[_(u'Mestre')] = self._mestre.consulte_saldo()
+    extratos[self._nome_mestre] = self._mestre.consulte_saldo()
 
     for (nome, pescador) in self._pescadores.items():
       extratos[nome] = pescador.consulte_saldo()
     return extratos
+
+  def estoques_pesqueiros(self):
+    u""" Retorna dicionário com a biomassa e a capacidade de cada pesqueiro, em Kg.
+
+        Returns:
+          {nome_posicao:str: (biomassa:int, capacidade:int)}
+    """
+    estoques = {}
+    grafo = self._mapa.grafo()
+    for (indice, nome) in enumerate(grafo.nomes()):
+      if grafo.tem_pesqueiro(indice):
+        (biomassa, capacidade) = self._mapa.ache_posicao(nome).pesqueiro().estoque()
+        estoques[nome] = (int(biomassa), int(capacidade))
+    return estoques
+
+  # Estatísticas que simule_dias() pode coletar ao fim de cada dia.
+  ESTATISTICAS = {u'saldos': u'extratos_pescadores',
+                  u'dinheiro': u'_total_dinheiro',
+                  u'racoes': u'_total_racoes',
+                  u'redes': u'_total_redes',
+                  u'barcos': u'_total_barcos',
+                  u'biomassa': u'_total_biomassa'}
+
+  def _total_dinheiro(self):
+    return sum(pescador.consulte_saldo() for pescador in self._pescadores.values())
+
+  def _total_racoes(self):
+    return sum(pescador.consulte_racoes() for pescador in self._pescadores.values())
+
+  def _total_redes(self):
+    return sum(pescador.redes() for pescador in self._pescadores.values())
+
+  def _total_barcos(self):
+    return len(self._barcos)
+
+  def _total_biomassa(self):
+    return int(sum(self._mapa.estoques().biomassas()))
+
+  def simule_dias(self, dias, politica, estatisticas = ()):
+    u""" Avança vários dias seguidos, com as decisões dos jogadores tomadas por uma política.
+
+        Segue o mesmo ciclo de pescadores_simulacao.jogue_dia(), mas sem montar eventos,
+        mesmo que o jogo não seja silencioso.
+
+        Parameters:
+          dias: int - Quantos dias jogar
+          politica - Objeto com os métodos de pescadores_simulacao.Politica
+          estatisticas: (nome:str, ...) - Quais estatísticas coletar ao fim de cada dia,
+            entre as de ESTATISTICAS: 'saldos' (extratos_pescadores()), e os totais de
+            'dinheiro', 'racoes' e 'redes' dos pescadores, o número de 'barcos',
+            e a 'biomassa' de peixes em todos os pesqueiros, em Kg.
+        Returns:
+          {nome:str: [valor, ...]} - Um valor de cada estatística pedida, por dia.
+        Raises:
+          ValueError - Se alguma estatística não existe.
+    """
+    coletores = []
+    for nome in estatisticas:
+      if nome not in self.ESTATISTICAS:
+        raise ValueError(u'Estatística desconhecida: %s' % nome)
+      coletores.append((nome, getattr(self, self.ESTATISTICAS[nome])))
+    resultados = dict((nome, []) for nome in estatisticas)
+
+    silencioso = self._silencioso
+    self._silencioso = True
+    try:
+      for dia in range(dias):
+        self.prepare_alvorada()
+
+        pedidos_pescadores = {}
+        for nome in self.pescadores_nos_mercados():
+          pedidos = politica.pedidos(self, nome, self.inventario_pescador(nome))
+          if len(pedidos) > 0:
+            pedidos_pescadores[nome] = pedidos
+        if len(pedidos_pescadores) > 0:
+          self.atenda_pescadores(pedidos_pescadores)
+
+        for (nome_barco, vagas) in self.barcos_com_vaga():
+          nomes_pescadores = self.pescadores_para_barco(nome_barco)
+          if len(nomes_pescadores) > 0:
+            escolhidos = politica.tripulantes(self, nome_barco, vagas, nomes_pescadores)
+            if len(escolhidos) > 0:
+              self.embarque(nome_barco, escolhidos)
+
+        self.credite_jornadas()
+
+        for (nome_barco, jornadas) in self.prepare_jornadas():
+          self.adicione_jornada(nome_barco, politica.jornada(self, nome_barco, jornadas))
+
+        for eventos in self.execute_jornadas_em_fluxo():
+          pass
+
+        for (nome, coletor) in coletores:
+          resultados[nome].append(coletor())
+    finally:
+      self._silencioso = silencioso
+    return resultados
   
 
 
@@ -1737,13 +4948,22 @@ if __name__ == '__main__':
   
   debug = 0
 
+  # Idioma do jogo: python pescadores.py [--idioma en] [jogo salvo]
+  argv = sys.argv[1:]
+  idioma = None
+  if len(argv) >= 2 and argv[0] == u'--idioma':
+    idioma = argv[1]
+    argv = argv[2:]
+  jogo_ativo = Jogo(idioma = idioma)
+  # Os textos da interface seguem o idioma do jogo.
+  _ = jogo_ativo.tradutor()
+
   # Versão e autor 
   nome_jogo = _(u'Pescadores')
   autor_jogo = _(u'João Vianna <jvianna@gmail.com> e\n Ivan Wermelinger <ivannit@gmail.com>')
   versao_jogo = u'0.95'
 
   raiz = tkinter.Tk()
-  jogo_ativo = Jogo()
   
   def mostre_ajuda(event = None):
     webbrowser.open_new(_(u'./pescadores_manual.html'))
@@ -1883,8 +5103,10 @@ if __name__ == '__main__':
       self._janela.bind(u'<Destroy>', self._termine)
       self._janela.wait_window()  
 
-  opcoes_barco = {_(u'nenhum'), _(u'simples'), _(u'reforçado') }
-  opcoes_curso = {_(u'nenhum'), _(u'pesca'), _(u'navegação')}
+  opcoes_barco = {_(u'nenhum'), nome_tipo_barco(BARCO_SIMPLES, jogo_ativo.tradutor()),
+                  nome_tipo_barco(BARCO_REFORCADO, jogo_ativo.tradutor())}
+  opcoes_curso = {_(u'nenhum'), nome_curso(CURSO_PESCA, jogo_ativo.tradutor()),
+                  nome_curso(CURSO_NAVEGACAO, jogo_ativo.tradutor())}
 
 
   class DlgMercado:
@@ -2048,16 +5270,17 @@ if __name__ == '__main__':
       pedidos = []
       
       if (tipo_barco != _(u'nenhum')):
-        pedidos.append((_(u'barco'), tipo_barco, nome_barco))
+        pedidos.append((BARCO, tipo_barco_de_nome(tipo_barco, jogo_ativo.tradutor()),
+                        nome_barco))
       
       if racoes > 0:
-        pedidos.append((_(u'rações'), racoes))
+        pedidos.append((RACOES, racoes))
         
       if redes > 0:
-        pedidos.append((_(u'redes'), redes))
+        pedidos.append((REDES, redes))
         
       if (curso != _(u'nenhum')):
-        pedidos.append((_(u'curso'), curso))
+        pedidos.append((CURSO, curso_de_nome(curso, jogo_ativo.tradutor())))
 
       jogo_ativo.atenda_pescador(self._nome_pescador, pedidos)
       self._termine()
@@ -2179,6 +5402,7 @@ if __name__ == '__main__':
     """
     def __init__(self, nome_barco, jornadas):
       self._nome_barco = nome_barco
+      self._jornadas = jornadas
 
       self._janela = tkinter.Toplevel()
       self._janela.title(_(u'Pescadores - Jornada'))
@@ -2204,7 +5428,7 @@ if __name__ == '__main__':
                                             width = 50)
 
       for jornada in jornadas:
-        self._jornadas_list.insert(tkinter.END, jornada)
+        self._jornadas_list.insert(tkinter.END, texto_jornada(jornada, jogo_ativo.tradutor()))
         
       self._jornadas_list.grid(column = 0, row = linhas, padx = 10, pady = 10,
                           sticky = tkinter.E)
@@ -2238,7 +5462,7 @@ if __name__ == '__main__':
       selecionado = self._jornadas_list.curselection()
       
       if (len(selecionado) > 0):
-        jornada_escolhida = self._jornadas_list.get(selecionado)
+        jornada_escolhida = self._jornadas[selecionado[0]]
         jogo_ativo.adicione_jornada(self._nome_barco, jornada_escolhida)
 
         self._termine()
@@ -2411,9 +5635,9 @@ if __name__ == '__main__':
       self._barcos_list.delete(0, tkinter.END)
       self._barcos_list.insert(tkinter.END, _(u'nenhum'))
       for bem in bens_vendedor:
-        if bem[0] == _(u'redes'):
+        if bem[0] == REDES:
           self._redes_vendedor = bem[1]
-        elif bem[0] == _(u'barco'):
+        elif bem[0] == BARCO:
           self._barcos_list.insert(tkinter.END, bem[2])
 
     def transfira_bens(self, event = None):
@@ -2440,7 +5664,7 @@ if __name__ == '__main__':
 
           if num_redes > 0:
             if num_redes <= self._redes_vendedor:
-              bens.append((_(u'redes'), num_redes))
+              bens.append((REDES, num_redes))
             else:
               messagebox.showwarning(_(u'Pescadores - Compra e Venda'),
                 _(u'O vendedor não tem o número de redes prometido.'))
@@ -2450,10 +5674,10 @@ if __name__ == '__main__':
           selecionados = self._barcos_list.curselection()
           if len(selecionados) > 0:
             for indice in selecionados:
-              bens.append((_(u'barco'), u'', self._barcos_list.get(indice)))
+              bens.append((BARCO, u'', self._barcos_list.get(indice)))
 
           if valor > 0:
-            bens.append((_(u'dinheiro'), valor))
+            bens.append((DINHEIRO, valor))
 
           mensagens = jogo_ativo.transfira_bens(nome_vendedor, nome_comprador, bens, contrato)
           for msg in mensagens:
@@ -2498,6 +5722,8 @@ if __name__ == '__main__':
       self._jornal.config(yscrollcommand=self._rolagem.set)
       
     def adicione_mensagem(self, msg):
+      if isinstance(msg, Evento):
+        msg = msg.texto(jogo_ativo.tradutor())
       self._jornal.insert(tkinter.END, msg)
       self._jornal.insert(tkinter.END, u'\n')
       self._jornal.see(tkinter.END)
@@ -2544,23 +5770,25 @@ if __name__ == '__main__':
                           _(u'\n%s tem os seguintes bens:') % nome)
 
         for bem in jogo_ativo.inventario_pescador(nome):
-          if bem[0] == _(u'rações'):
+          if bem[0] == RACOES:
             controle_jogo.jornal().adicione_mensagem( 
-                      u'%d %s' % (bem[1], bem[0]))
+                      u'%d %s' % (bem[1], nome_bem(bem[0], jogo_ativo.tradutor())))
             racoes = bem[1]
-          elif bem[0] == _(u'redes'):
+          elif bem[0] == REDES:
             controle_jogo.jornal().adicione_mensagem( 
-                      u'%d %s' % (bem[1], bem[0]))
-          elif (bem[0] == _(u'dinheiro')):
+                      u'%d %s' % (bem[1], nome_bem(bem[0], jogo_ativo.tradutor())))
+          elif (bem[0] == DINHEIRO):
             controle_jogo.jornal().adicione_mensagem( 
                       _(u'R$%d,00') % bem[1])
             saldo = bem[1]
-          elif (bem[0] == _(u'barco')):
+          elif (bem[0] == BARCO):
             controle_jogo.jornal().adicione_mensagem( 
-                      _(u'Um %s %s de nome %s') % (bem[0], bem[1], bem[2]))
-          elif (bem[0] == _(u'curso')):
+                      _(u'Um %s %s de nome %s') % (
+                        nome_bem(bem[0], jogo_ativo.tradutor()),
+                        nome_tipo_barco(bem[1], jogo_ativo.tradutor()), bem[2]))
+          elif (bem[0] == CURSO):
             controle_jogo.jornal().adicione_mensagem( 
-                      _(u'Proficiência %d em %s') % (bem[2], bem[1]))
+                      _(u'Proficiência %d em %s') % (bem[2], nome_curso(bem[1], jogo_ativo.tradutor())))
 
         dlg = DlgMercado(nome, saldo, racoes)
         dlg.show()
@@ -2605,32 +5833,21 @@ if __name__ == '__main__':
 
       # Sem pausa na transição de estado
       # elif estado == _(u'e':
-      mensagens = jogo_ativo.execute_jornadas()
-      
       # Apaga posição de todos os barcos
       controle_jogo.tela().delete(_(u'barco'))
 
       marcas_barcos = {}
-      for msg in mensagens:
-        if msg.startswith(u'#coord:'):
-          # Diretiva com coordenadas de barco.
-          nome_barco = u''
-          x = u'0'
-          y = u'0'
-          for param in msg[7:].split(u';'):
-            prefixo = _(u'barco=')
-            if param.startswith(prefixo):
-              nome_barco = param[len(prefixo):]
-            elif param.startswith(_(u'x=')):
-              x = int(param[2:])
-            elif param.startswith(_(u'y=')):
-              y = int(param[2:])
-          coord = (x, y)
-          lista_barcos = marcas_barcos.get(coord, [])
-          lista_barcos.append(nome_barco)
-          marcas_barcos[coord] = lista_barcos
-        else:
-          controle_jogo.jornal().adicione_mensagem(msg)
+      for (nome_barco, eventos) in jogo_ativo.execute_jornadas_em_fluxo():
+        for evento in eventos:
+          if isinstance(evento, BarcoMovido):
+            coord = (evento.x, evento.y)
+            lista_barcos = marcas_barcos.get(coord, [])
+            lista_barcos.append(evento.nome_barco)
+            marcas_barcos[coord] = lista_barcos
+          else:
+            controle_jogo.jornal().adicione_mensagem(evento.texto(jogo_ativo.tradutor()))
+        # Mostra cada barco assim que sua jornada termina.
+        raiz.update_idletasks()
 
       for (coord, lista_barcos) in marcas_barcos.items():
         (x,y) = coord
@@ -2671,7 +5888,8 @@ if __name__ == '__main__':
   def salve_estado(event = None):
     nome_arq = filedialog.asksaveasfilename(title = _(u'Arquivo do Jogo a Salvar (.json)'),
                                              defaultextension = u'.json',
-                                             filetypes=[(_(u'Arquivos .json'),u'*.json')])
+                                             filetypes=[(_(u'Arquivos .json'),u'*.json'),
+                                                        (_(u'Arquivos .pesc'),u'*.pesc')])
     
     jogo_ativo.salve_estado(nome_arq)
     
@@ -2680,7 +5898,7 @@ if __name__ == '__main__':
 
 
   def usage():
-    print (_(u'Uso: python pescadores.py\n'))
+    print (_(u'Uso: python pescadores.py [--idioma en] [jogo salvo]\n'))
     
 
   def my_main(argv, argc):
@@ -2745,6 +5963,6 @@ if __name__ == '__main__':
     raiz.mainloop()
     
 
-  my_main(sys.argv[1:], len(sys.argv) - 1)
+  my_main(argv, len(argv))
 
 
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+u""" Pescadores Reprodução - Repete exatamente uma partida já jogada.
+
+    Copyleft 2018 João Vianna (jvianna@gmail.com) e Ivan Wermelinger
+    Este produto é distribuído sob os termos de licenciamento da
+      'Apache License, Version 2.0'
+
+    Uma partida fica determinada pelo mapa, pela semente dos sorteios e pela
+    lista, em ordem, das chamadas ao Jogo que alteram o seu estado. A Partida
+    guarda esses dados, junto com um resumo do estado ao fim de cada dia.
+
+    reproduza() repete as chamadas sem interface gráfica, conferindo os resumos,
+    e pode parar ao fim de qualquer dia. Serve para investigar reclamações
+    ("meu barco naufragou três vezes seguidas") com o jogo exatamente no
+    ponto em que aconteceram.
+
+    Uso: python pescadores_reproducao.py <partida.json> [dia]
+"""
+from __future__ import division
+
+import sys, json, inspect
+
+import pescadores
+from pescadores import _
+
+
+class Partida:
+  u""" Registro de uma partida: mapa, semente e chamadas ao Jogo.
+
+      Tem a mesma interface de pescadores.Diario, para ser usada com
+      Jogo.registre_chamadas() (ver grave()).
+  """
+  def __init__(self, nome_arq_mapa, semente, em_lote = False, vetorial = False):
+    u"""
+        Parameters:
+          nome_arq_mapa:str - Arquivo com o mapa
+          semente:int - Semente do jogo
+          em_lote, vetorial:bool - Opções do jogo (ver Jogo)
+    """
+    self._nome_arq_mapa = nome_arq_mapa
+    self._hash_mapa = pescadores.hash_mapa(nome_arq_mapa)
+    self._semente = semente
+    self._em_lote = em_lote
+    self._vetorial = vetorial
+    self._chamadas = []
+    self._resumos = []
+    self._jogo = None
+
+  def crie_jogo(self):
+    u""" Cria um jogo novo, no início desta partida.
+    """
+    jogo = pescadores.Jogo(silencioso = True, semente = self._semente,
+                           em_lote = self._em_lote, vetorial = self._vetorial)
+    jogo.preencha_mapa(self._nome_arq_mapa)
+    if pescadores.hash_mapa(self._nome_arq_mapa) != self._hash_mapa:
+      raise ValueError(u'%s: mapa diferente do usado na partida' % self._nome_arq_mapa)
+    return jogo
+
+  def grave(self, jogo):
+    u""" Passa a registrar as chamadas de um jogo, criado por crie_jogo().
+    """
+    self._jogo = jogo
+    jogo.registre_chamadas(self)
+
+  def registre(self, metodo, argumentos):
+    u""" Registra uma chamada ao jogo.
+
+        Os argumentos são copiados, como ficarão no arquivo json: se quem chamou
+        alterar depois uma lista de pedidos, a partida não muda.
+
+        Raises:
+          TypeError - Se algum argumento não pode ser gravado em json.
+    """
+    if metodo == u'prepare_alvorada':
+      # Estado ao fim do dia anterior (antes do primeiro dia, o estado inicial).
+      self._resumos.append(self._jogo.resumo_estado())
+    self._chamadas.append((metodo, json.loads(json.dumps(argumentos))))
+
+  def precisa_instantaneo(self):
+    return False
+
+  def grave_instantaneo(self, instantaneo):
+    u""" Uma partida não tem instantâneos: ela só pode ser repetida desde o início.
+
+        Raises:
+          ValueError - Chamado por Jogo.restaure_estado(), que desfaria chamadas já registradas.
+    """
+    raise ValueError(_(u'Partida gravada não pode voltar a um estado anterior.'))
+
+  def feche(self):
+    u""" Termina a gravação, guardando o resumo do estado final.
+    """
+    if self._jogo is not None:
+      self._resumos.append(self._jogo.resumo_estado())
+      self._jogo = None
+
+  def chamadas(self):
+    return self._chamadas
+
+  def dias(self):
+    u""" Número de dias jogados (chamadas a prepare_alvorada()).
+    """
+    return sum(1 for (metodo, argumentos) in self._chamadas if metodo == u'prepare_alvorada')
+
+  def as_dict(self):
+    return {u'nome_arq_mapa': self._nome_arq_mapa,
+            u'hash_mapa': self._hash_mapa,
+            u'semente': self._semente,
+            u'em_lote': self._em_lote,
+            u'vetorial': self._vetorial,
+            u'chamadas': self._chamadas,
+            u'resumos': self._resumos}
+
+  @classmethod
+  def from_dict(cls, atributos):
+    partida = cls.__new__(cls)
+    partida._nome_arq_mapa = atributos[u'nome_arq_mapa']
+    partida._hash_mapa = atributos[u'hash_mapa']
+    partida._semente = atributos[u'semente']
+    partida._em_lote = atributos[u'em_lote']
+    partida._vetorial = atributos[u'vetorial']
+    partida._chamadas = [tuple(chamada) for chamada in atributos[u'chamadas']]
+    partida._resumos = atributos[u'resumos']
+    partida._jogo = None
+    return partida
+
+  def salve(self, nome_arq):
+    arq = open(nome_arq, u'w')
+    try:
+      json.dump(self.as_dict(), arq)
+    finally:
+      arq.close()
+
+  @classmethod
+  def carregue(cls, nome_arq):
+    arq = open(nome_arq, u'r')
+    try:
+      return cls.from_dict(json.load(arq))
+    finally:
+      arq.close()
+
+
+def reproduza(partida, ate_dia = None, confira = True):
+  u""" Repete as chamadas de uma partida, sem interface.
+
+      Parameters:
+        partida: Partida - A partida a repetir
+        ate_dia: int - Para ao fim deste dia (antes da alvorada seguinte).
+          Se None, repete a partida toda.
+        confira: bool - Se verdadeiro, confere o resumo do estado ao fim de cada dia
+      Returns:
+        Jogo - O jogo no ponto em que a reprodução parou
+      Raises:
+        ValueError - Se o estado diverge do registrado na partida
+  """
+  jogo = partida.crie_jogo()
+  resumos = partida.as_dict()[u'resumos']
+  dia = 0
+
+  for (metodo, argumentos) in partida.chamadas():
+    if metodo == u'prepare_alvorada':
+      if confira:
+        _confira(jogo, resumos, dia)
+      if ate_dia is not None and dia >= ate_dia:
+        return jogo
+      dia += 1
+    resultado = getattr(jogo, metodo)(*argumentos)
+    if inspect.isgenerator(resultado):
+      for eventos in resultado:
+        pass
+
+  if confira:
+    _confira(jogo, resumos, dia)
+  return jogo
+
+def _confira(jogo, resumos, dia):
+  if dia < len(resumos) and jogo.resumo_estado() != resumos[dia]:
+    raise ValueError(_(u'Reprodução divergiu da partida ao fim do dia %d.') % dia)
+
+
+def usage():
+  print(_(u'Uso: python pescadores_reproducao.py <partida.json> [dia]\n'))
+
+
+if __name__ == '__main__':
+  argv = sys.argv[1:]
+  if len(argv) < 1:
+    usage()
+    sys.exit(1)
+  try:
+    ate_dia = int(argv[1]) if len(argv) > 1 else None
+  except ValueError:
+    usage()
+    sys.exit(1)
+
+  jogo = reproduza(Partida.carregue(argv[0]), ate_dia)
+  for (nome, extrato) in sorted(jogo.extratos_pescadores().items()):
+    print(u'%s: %s' % (nome, extrato))
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+u""" Pescadores Simulação - Execução de partidas sem interface gráfica.
+
+    Copyleft 2018 João Vianna (jvianna@gmail.com) e Ivan Wermelinger
+    Este produto é distribuído sob os termos de licenciamento da
+      'Apache License, Version 2.0'
+
+    Executa o ciclo diário do Jogo (alvorada, compras, tripulação, jornadas)
+    sem tkinter, com as decisões dos jogadores tomadas por políticas.
+    Usado para equilibrar os cenários de sala de aula, jogando muitas partidas.
+
+    Cada partida tem sua própria semente, da qual derivam os sorteios do jogo
+    e das políticas. As partidas podem ser distribuídas entre vários processos,
+    e qualquer uma delas pode ser repetida exatamente a partir da sua semente.
+
+    Uso: python pescadores_simulacao.py [partidas] [dias] [mapa] [processos]
+         python pescadores_simulacao.py memoria [quantos]
+"""
+from __future__ import division
+
+import sys, time
+import multiprocessing
+import tracemalloc
+
+from random import Random
+
+import pescadores
+from pescadores import _
+
+
+class Politica:
+  u""" Decisões de um jogador, usadas no lugar dos diálogos da interface.
+
+      Esta classe base não compra nada, embarca quem puder e escolhe
+      sempre a primeira jornada oferecida. As subclasses redefinem os métodos.
+  """
+  def pedidos(self, jogo, nome, bens):
+    u""" Decide as compras de um pescador que está em um mercado.
+
+        Parameters:
+          jogo: Jogo - O jogo em andamento
+          nome: str - Nome do pescador
+          bens: [(tipo_de_bem, detalhe, ...), ...] - Inventário do pescador
+        Returns:
+          [(tipo_de_pedido, detalhe, ...), ...] - Pedidos, como em Jogo.atenda_pescador()
+    """
+    return []
+
+  def tripulantes(self, jogo, nome_barco, vagas, nomes_pescadores):
+    u""" Escolhe os pescadores que vão embarcar em um barco.
+
+        Returns:
+          [nome:str, ...] - Pescadores a embarcar
+    """
+    return nomes_pescadores[:vagas]
+
+  def jornada(self, jogo, nome_barco, jornadas):
+    u""" Escolhe a jornada de um barco, entre as oferecidas por Jogo.prepare_jornadas().
+
+        Returns:
+          (PESCAR,) ou (NAVEGAR, nome_destino) - A jornada escolhida
+    """
+    return jornadas[0]
+
+
+class PoliticaAleatoria(Politica):
+  u""" Um jogador simples, que compra o necessário e navega ao acaso.
+
+      Cada pescador compra um barco simples assim que pode, mantém algumas
+      rações e redes, pesca sempre que o barco está em um pesqueiro com
+      espaço livre, e navega para um destino sorteado nos demais casos.
+
+      Attributes:
+        rng: Random - Gerador de números aleatórios das decisões
+        reserva: int - Dinheiro mantido após a compra de um barco
+  """
+  def __init__(self, rng = None, reserva = 200):
+    self._rng = rng if rng is not None else Random()
+    self._reserva = reserva
+    self._pescou = set()
+    self._barcos_comprados = 0
+
+  def pedidos(self, jogo, nome, bens):
+    saldo = 0
+    racoes = 0
+    redes = 0
+    tem_barco = False
+    for bem in bens:
+      if bem[0] == pescadores.DINHEIRO:
+        saldo = bem[1]
+      elif bem[0] == pescadores.RACOES:
+        racoes = bem[1]
+      elif bem[0] == pescadores.REDES:
+        redes = bem[1]
+      elif bem[0] == pescadores.BARCO:
+        tem_barco = True
+
+    pedidos = []
+    if (not tem_barco) and saldo >= 1000 + self._reserva:
+      self._barcos_comprados += 1
+      pedidos.append((pescadores.BARCO, pescadores.BARCO_SIMPLES,
+                      u'%s %d' % (nome, self._barcos_comprados)))
+      saldo -= 1000
+    if racoes < 4:
+      # O preço da ração não passa de R$20,00
+      quant = min(4 - racoes, saldo // 20)
+      if quant > 0:
+        pedidos.append((pescadores.RACOES, quant))
+        saldo -= 20 * quant
+    if redes < 2 and saldo >= 300 + self._reserva:
+      pedidos.append((pescadores.REDES, 1))
+    return pedidos
+
+  def jornada(self, jogo, nome_barco, jornadas):
+    pescar = (pescadores.PESCAR,)
+    if pescar in jornadas and nome_barco not in self._pescou:
+      self._pescou.add(nome_barco)
+      return pescar
+    self._pescou.discard(nome_barco)
+    destinos = [jornada for jornada in jornadas if jornada[0] == pescadores.NAVEGAR]
+    if len(destinos) == 0:
+      return pescar
+    return destinos[self._rng.randint(0, len(destinos) - 1)]
+
+
+def jogue_dia(jogo, politica):
+  u""" Joga um dia completo, seguindo o mesmo ciclo da interface gráfica.
+
+      Parameters:
+        jogo: Jogo - O jogo em andamento, com mapa e pescadores
+        politica: Politica - Quem toma as decisões dos jogadores
+      Returns:
+        [Evento, ...] - Eventos do dia (vazia se o jogo é silencioso)
+  """
+  mensagens = jogo.prepare_alvorada()
+
+  pedidos_pescadores = {}
+  for nome in jogo.pescadores_nos_mercados():
+    pedidos = politica.pedidos(jogo, nome, jogo.inventario_pescador(nome))
+    if len(pedidos) > 0:
+      pedidos_pescadores[nome] = pedidos
+  if len(pedidos_pescadores) > 0:
+    jogo.atenda_pescadores(pedidos_pescadores)
+
+  for (nome_barco, vagas) in jogo.barcos_com_vaga():
+    nomes_pescadores = jogo.pescadores_para_barco(nome_barco)
+    if len(nomes_pescadores) > 0:
+      escolhidos = politica.tripulantes(jogo, nome_barco, vagas, nomes_pescadores)
+      if len(escolhidos) > 0:
+        mensagens.extend(jogo.embarque(nome_barco, escolhidos))
+
+  mensagens.extend(jogo.credite_jornadas())
+
+  for (nome_barco, jornadas) in jogo.prepare_jornadas():
+    jogo.adicione_jornada(nome_barco, politica.jornada(jogo, nome_barco, jornadas))
+
+  mensagens.extend(jogo.execute_jornadas())
+  return mensagens
+
+
+def jogue_partida(nome_arq_mapa, nomes, dias, politica, silencioso = True, semente = None,
+                  em_lote = False, vetorial = False):
+  u""" Joga uma partida completa, sem interface.
+
+      Parameters:
+        nome_arq_mapa: str - Arquivo com o mapa
+        nomes: [str, ...] - Nomes dos pescadores
+        dias: int - Quantos dias jogar
+        politica: Politica - Quem toma as decisões dos jogadores
+        silencioso: bool - Se verdadeiro, as mensagens não são montadas
+        semente: int - Semente do gerador do jogo. Se omitida, é sorteada.
+        em_lote: bool - Se verdadeiro, as jornadas são sorteadas em lote (NumPy)
+        vetorial: bool - Se verdadeiro, o estado do jogo fica em vetores (NumPy)
+      Returns:
+        Jogo - O jogo, no estado final
+  """
+  jogo = pescadores.Jogo(silencioso, semente, em_lote, vetorial)
+  jogo.preencha_mapa(nome_arq_mapa)
+  jogo.adicione_pescadores(nomes)
+
+  if silencioso:
+    jogo.simule_dias(dias, politica)
+  else:
+    for dia in range(dias):
+      jogue_dia(jogo, politica)
+  return jogo
+
+
+NOMES_PADRAO = (u'Ana', u'Bia', u'Caio', u'Davi')
+
+
+def divida_semente(semente_mestra, quantas):
+  u""" Deriva sementes independentes para várias partidas a partir de uma só.
+
+      Returns:
+        [int, ...] - Uma semente para cada partida, sempre as mesmas para a mesma mestra.
+  """
+  rng = Random(semente_mestra)
+  return [rng.getrandbits(64) for i in range(quantas)]
+
+
+def jogue_partida_semeada(semente, dias, nome_arq_mapa = u'mapa_parati.csv',
+                          nomes = NOMES_PADRAO, silencioso = True):
+  u""" Joga uma partida com PoliticaAleatoria, toda determinada pela semente.
+
+      O jogo usa a própria semente, e a política usa uma semente derivada dela.
+      Chamar de novo com a mesma semente repete a partida exatamente.
+
+      Returns:
+        Jogo - O jogo, no estado final
+  """
+  politica = PoliticaAleatoria(Random(divida_semente(semente, 1)[0]))
+  return jogue_partida(nome_arq_mapa, list(nomes), dias, politica, silencioso, semente)
+
+
+def _jogue_semente(argumentos):
+  u""" Executa uma partida em um processo do pool.
+
+      Returns:
+        (int, {nome: saldo, ...}) - Semente e extratos finais da partida
+  """
+  (semente, dias, nome_arq_mapa, nomes) = argumentos
+  jogo = jogue_partida_semeada(semente, dias, nome_arq_mapa, nomes)
+  return (semente, jogo.extratos_pescadores())
+
+
+def jogue_partidas(partidas, dias, nome_arq_mapa = u'mapa_parati.csv',
+                   nomes = NOMES_PADRAO, silencioso = True, semente_mestra = None):
+  u""" Joga várias partidas neste processo, medindo o desempenho.
+
+      Returns:
+        ([(semente, {nome: saldo, ...}), ...], float) - Semente e extratos finais
+          de cada partida, e partidas jogadas por segundo.
+  """
+  resultados = []
+  inicio = time.time()
+  for semente in divida_semente(semente_mestra, partidas):
+    jogo = jogue_partida_semeada(semente, dias, nome_arq_mapa, nomes, silencioso)
+    resultados.append((semente, jogo.extratos_pescadores()))
+  return (resultados, _por_segundo(partidas, time.time() - inicio))
+
+
+def simule_em_paralelo(partidas, dias, nome_arq_mapa = u'mapa_parati.csv',
+                       nomes = NOMES_PADRAO, semente_mestra = None, processos = None):
+  u""" Joga várias partidas distribuídas entre processos (Monte Carlo).
+
+      Parameters:
+        processos: int - Quantos processos usar. Se omitido, um por núcleo.
+      Returns:
+        ([(semente, {nome: saldo, ...}), ...], float) - Semente e extratos finais
+          de cada partida, na ordem das sementes, e partidas jogadas por segundo.
+  """
+  tarefas = [(semente, dias, nome_arq_mapa, tuple(nomes))
+             for semente in divida_semente(semente_mestra, partidas)]
+  inicio = time.time()
+  pool = multiprocessing.Pool(processos)
+  try:
+    lote = max(1, partidas // (4 * (processos or multiprocessing.cpu_count())))
+    resultados = pool.map(_jogue_semente, tarefas, lote)
+  finally:
+    pool.close()
+    pool.join()
+  return (resultados, _por_segundo(partidas, time.time() - inicio))
+
+
+def _por_segundo(partidas, duracao):
+  if duracao > 0:
+    return partidas / duracao
+  return float(u'inf')
+
+
+class _PescadorOriginal:
+  u""" Pescador como era antes de __slots__: mesmos atributos, em um __dict__ por
+      instância, com os barcos em uma lista. Usado para comparar o consumo de memória.
+  """
+  def __init__(self, nome):
+    self._nome = nome
+    self._destreza_na_pesca = 0
+    self._destreza_em_navegacao = 0
+    self._dinheiro = 0
+    self._redes = 0
+    self._racoes = 0
+    self._barcos = []
+
+
+class _BarcoOriginal:
+  u""" Barco como era antes de __slots__, com a tripulação em uma lista.
+  """
+  def __init__(self, tipo, nome, lot, cap, resist):
+    self._tipo = tipo
+    self._nome = nome
+    self._lotacao = lot
+    self._capacidade = cap
+    self._resistencia = resist
+    self._pescado = 0
+    self._atraso = 0
+    self._danos = 0
+    self._posicao = None
+    self._pescadores = []
+
+
+def _bytes_por_instancia(criar, quantos):
+  u""" Mede a memória alocada por instância criada, em bytes.
+  """
+  # A lista que mantém as instâncias vivas é alocada antes da medição, e não conta.
+  instancias = [None] * quantos
+  tracemalloc.start()
+  try:
+    antes = tracemalloc.get_traced_memory()[0]
+    for i in range(quantos):
+      instancias[i] = criar(i)
+    depois = tracemalloc.get_traced_memory()[0]
+  finally:
+    tracemalloc.stop()
+  del instancias
+  return (depois - antes) / quantos
+
+
+def meca_memoria(quantos = 10000):
+  u""" Mede a memória ocupada por pescador e por barco, como eram antes (__dict__ e
+      listas) e como são hoje (__slots__ e ColecaoOrdenada).
+
+      Cada pescador inclui a coleção dos seus barcos, e cada barco, a da tripulação.
+      Os nomes são criados antes da medição, e não contam.
+
+      Returns:
+        {str: (float, float), ...} - Para 'pescador' e 'barco', bytes por instância
+          antes (_PescadorOriginal, _BarcoOriginal) e hoje.
+  """
+  nomes = [u'Pescador %d' % i for i in range(quantos)]
+  tipo = pescadores.BARCO_SIMPLES
+  resultado = {}
+  for (entidade, original, classe, criar) in (
+      (u'pescador', _PescadorOriginal, pescadores.Pescador,
+       lambda classe: lambda i: classe(nomes[i])),
+      (u'barco', _BarcoOriginal, pescadores.Barco,
+       lambda classe: lambda i: classe(tipo, nomes[i], 1, 150, 1))):
+    resultado[entidade] = (_bytes_por_instancia(criar(original), quantos),
+                           _bytes_por_instancia(criar(classe), quantos))
+  return resultado
+
+
+def usage():
+  print(_(u'Uso: python pescadores_simulacao.py [partidas] [dias] [mapa] [processos]\n'))
+  print(_(u'     python pescadores_simulacao.py memoria [quantos]\n'))
+
+
+if __name__ == '__main__':
+  argv = sys.argv[1:]
+  if len(argv) > 0 and argv[0] == u'memoria':
+    quantos = int(argv[1]) if len(argv) > 1 else 10000
+    for (entidade, (antes, depois)) in sorted(meca_memoria(quantos).items()):
+      print(_(u'%s: %.0f bytes no formato original, %.0f bytes hoje.') %
+            (entidade, antes, depois))
+    sys.exit(0)
+
+  try:
+    partidas = int(argv[0]) if len(argv) > 0 else 100
+    dias = int(argv[1]) if len(argv) > 1 else 30
+    processos = int(argv[3]) if len(argv) > 3 else 1
+  except ValueError:
+    usage()
+    sys.exit(1)
+  nome_arq_mapa = argv[2] if len(argv) > 2 else u'mapa_parati.csv'
+
+  if processos > 1:
+    (resultados, por_segundo) = simule_em_paralelo(partidas, dias, nome_arq_mapa,
+                                                   processos = processos)
+  else:
+    (resultados, por_segundo) = jogue_partidas(partidas, dias, nome_arq_mapa)
+  print(_(u'%d partidas de %d dias: %.1f partidas por segundo.') %
+        (partidas, dias, por_segundo))
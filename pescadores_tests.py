@@ -13,8 +13,14 @@ u""" Pescadores Tests - Regression tests for the pescadores library.
     History:
     Version 0.10 - Versão Inicial
 """
-import unittest
+from __future__ import division
+
+import gc, os, pickle, shutil, struct, tempfile, unittest, weakref
+from random import Random
+
 import pescadores
+import pescadores_simulacao
+import pescadores_reproducao
 
 class TestPerigo(unittest.TestCase):
   def setUp(self):
@@ -108,6 +114,44 @@ class TestPerigo(unittest.TestCase):
     self.assertTrue(soma_testes_0_1 < soma_testes_0_3,
                     u'Testes com maior resistência causaram mais danos.')
 
+  def test_3_distribuicao(self):
+    u""" A distribuição exata deve concordar com os sorteios de teste().
+    """
+    distribuicao = self.tempestade.distribuicao(0, 1, 0)
+    self.assertAlmostEqual(sum(distribuicao.values()), 1.0)
+    self.assertIs(distribuicao, self.tempestade.distribuicao(0, 1, 0))
+    
+    sorteio = Random(1).randint
+    contagem = {}
+    for i in range(36000):
+      resultado = self.tempestade.teste(0, 1, 0, sorteio)
+      contagem[resultado] = contagem.get(resultado, 0) + 1
+
+    self.assertEqual(set(contagem.keys()), set(distribuicao.keys()))
+    for (resultado, p) in distribuicao.items():
+      self.assertAlmostEqual(contagem[resultado] / 36000, p, delta = 0.01)
+
+    # Tempestade: 4 chances em 6 de ocorrer, e então 3 faces do dado causam naufrágio.
+    self.assertAlmostEqual(self.tempestade.probabilidade_dano_grave(0, 1, 0), 1 / 3)
+    self.assertTrue(self.tempestade.probabilidade_dano_grave(2, 3, 0) <
+                    self.tempestade.probabilidade_dano_grave(0, 1, 0))
+
+  @unittest.skipIf(pescadores.numpy is None, u'NumPy não instalado')
+  def test_4_teste_lote(self):
+    u""" O teste em lote deve ter a mesma distribuição de teste().
+    """
+    numpy = pescadores.numpy
+    quantos = 36000
+    resultados = self.tempestade.teste_lote(numpy.zeros(quantos, dtype = int),
+                                            numpy.ones(quantos, dtype = int),
+                                            numpy.zeros(quantos, dtype = int),
+                                            numpy.random.default_rng(1))
+    distribuicao = self.tempestade.distribuicao(0, 1, 0)
+    self.assertEqual(set(resultados.tolist()), set(distribuicao.keys()))
+    for (resultado, p) in distribuicao.items():
+      self.assertAlmostEqual(numpy.count_nonzero(resultados == resultado) / quantos, p,
+                             delta = 0.01)
+
 
 class TestPesca(unittest.TestCase):
   u""" Testes para a classe Pesca
@@ -179,6 +223,101 @@ class TestPesca(unittest.TestCase):
     self.assertTrue(soma_facil < soma_farto,
                     u'Pesqueiro farto rendeu menos que o fácil.')
 
+  def test_distribuicao(self):
+    u""" A distribuição exata deve concordar com os sorteios de pesque().
+    """
+    distribuicao = self.pesqueiro_dificil.distribuicao(1)
+    self.assertAlmostEqual(sum(distribuicao.values()), 1.0)
+
+    sorteio = Random(2).randint
+    contagem = {}
+    for i in range(6000):
+      resultado = self.pesqueiro_dificil.pesque(1, sorteio)
+      contagem[resultado] = contagem.get(resultado, 0) + 1
+
+    for (resultado, p) in distribuicao.items():
+      self.assertAlmostEqual(contagem[resultado] / 6000, p, delta = 0.02)
+
+    self.assertAlmostEqual(self.pesqueiro_facil.pescado_esperado(0), 10.0)
+    self.assertTrue(self.pesqueiro_farto.pescado_esperado(0) >
+                    self.pesqueiro_facil.pescado_esperado(0))
+
+  @unittest.skipIf(pescadores.numpy is None, u'NumPy não instalado')
+  def test_lance_lote(self):
+    u""" Os lançamentos em lote devem ter a mesma distribuição de pesque().
+    """
+    numpy = pescadores.numpy
+    niveis = self.pesqueiro_dificil.lance_lote(numpy.ones(6000, dtype = int),
+                                               numpy.random.default_rng(2))
+    resultados = numpy.array([self.pesqueiro_dificil.pescado(nivel) if nivel > 0 else nivel
+                              for nivel in niveis.tolist()])
+    for (resultado, p) in self.pesqueiro_dificil.distribuicao(1).items():
+      self.assertAlmostEqual(numpy.count_nonzero(resultados == resultado) / 6000, p,
+                             delta = 0.02)
+
+
+  def test_estoque(self):
+    u""" A pesca esgota a biomassa do pesqueiro, que se recompõe a cada dia.
+    """
+    estoques = pescadores.Estoques()
+    pesca = pescadores.Pesca(3, 50)
+    pesca.inclua_em(estoques)
+    capacidade = estoques.capacidade(0)
+    esperado = pesca.pescado_esperado(3)
+
+    sorteio = Random(4).randint
+    pescado = sum(max(pesca.pesque(3, sorteio), 0) for i in range(300))
+    reserva = pescadores.RESERVA_PESCADO * capacidade
+    self.assertEqual(pescado, capacidade - estoques.biomassa(0))
+    self.assertTrue(reserva <= estoques.biomassa(0) < reserva + 50)
+    self.assertEqual(pesca.pesque(3, lambda a, b: 6), 0)
+    self.assertTrue(pesca.pescado_esperado(3) < esperado / 10)
+
+    anterior = estoques.biomassa(0)
+    for dia in range(60):
+      estoques.regenere()
+      self.assertTrue(anterior < estoques.biomassa(0) <= capacidade)
+      anterior = estoques.biomassa(0)
+    self.assertTrue(anterior > 0.9 * capacidade)
+
+    # Com ou sem NumPy, a recomposição dá exatamente o mesmo resultado.
+    copia = estoques.copie_estado()
+    estoques.retire(0, 1000)
+    depois = []
+    numpy = pescadores.numpy
+    try:
+      for modulo in (numpy, None):
+        pescadores.numpy = modulo
+        estoques.restaure_estado([1000.0])
+        estoques.regenere()
+        depois.append(estoques.biomassa(0))
+    finally:
+      pescadores.numpy = numpy
+    self.assertEqual(depois[0], depois[1])
+    estoques.restaure_estado(copia)
+    self.assertEqual(estoques.biomassa(0), anterior)
+
+  def test_estoque_sem_capacidade(self):
+    u""" Um pesqueiro com rendimento zero fica vazio, sem atrapalhar a recomposição
+        dos outros.
+    """
+    numpy = pescadores.numpy
+    try:
+      for modulo in (numpy, None):
+        pescadores.numpy = modulo
+        estoques = pescadores.Estoques()
+        vazio = pescadores.Pesca(3, 0)
+        vazio.inclua_em(estoques)
+        pesca = pescadores.Pesca(3, 50)
+        pesca.inclua_em(estoques)
+        estoques.retire(1, 1000)
+        estoques.regenere()
+        self.assertEqual(estoques.biomassa(0), 0)
+        self.assertEqual(vazio.fracao_estoque(), 0)
+        self.assertEqual(vazio.pesque(3, lambda a, b: 6), 0)
+        self.assertTrue(1000 < estoques.biomassa(1) < 2000)
+    finally:
+      pescadores.numpy = numpy
 
 class TestPosicao(unittest.TestCase):
   def setUp(self):
@@ -379,6 +518,22 @@ class TestPescador(unittest.TestCase):
     self.assertTrue(self.joao.debite(300))
     self.assertEqual(self.joao.consulte_saldo(), 700)
 
+  def test_5_as_dict(self):
+    self.joao.credite(500)
+    self.joao.adicione_redes(3)
+    self.joao.adicione_barco(self.saga)
+    atributos = self.joao.as_dict()
+    self.assertEqual(atributos[u'barcos'], [u'Saga'])
+
+    self.pedro.from_dict(atributos)
+    self.assertEqual(self.pedro.nome(), u'João')
+    self.assertEqual(self.pedro.consulte_saldo(), 500)
+    self.assertEqual(self.pedro.redes(), 3)
+    self.assertEqual(len(self.pedro.barcos()), 0)
+
+    atributos[u'tesouro'] = 1
+    self.assertRaises(ValueError, self.pedro.from_dict, atributos)
+
 
 class TestPorto(unittest.TestCase):
   u""" Testes para a classe Porto
@@ -415,6 +570,12 @@ class TestPorto(unittest.TestCase):
 
     self.assertFalse(porto.tem_pescador(self.joao))
     self.assertTrue(porto.tem_pescador(self.pedro))
+
+    # A ordem de chegada é mantida, como em uma lista.
+    self.assertTrue(porto.retorne_pescador(self.joao))
+    self.assertFalse(porto.retorne_pescador(self.joao))
+    self.assertEqual(list(porto.pescadores_em_terra()), [self.pedro, self.joao])
+    self.assertFalse(porto.remova_pescador(pescadores.Pescador(u'Ana')))
     
   def test_3_mercado(self):
     porto = self.parati.porto()
@@ -444,10 +605,12 @@ class TestMercado(unittest.TestCase):
     
     self.assertTrue(self.joao.consulte_saldo() < 1200)
     
-    (barco_simples, preco_simples) = self.mercado.fabrique_barco(u'simples', u'Saga')
-    (barco_reforcado, preco_reforcado) = self.mercado.fabrique_barco(u'reforçado', u'Fortaleza')
+    (barco_simples, preco_simples) = self.mercado.fabrique_barco(pescadores.BARCO_SIMPLES, u'Saga')
+    (barco_reforcado, preco_reforcado) = self.mercado.fabrique_barco(pescadores.BARCO_REFORCADO,
+                                                                   u'Fortaleza')
     
     self.assertIsInstance(barco_simples, pescadores.Barco)
+    self.assertEqual(barco_reforcado.tipo(), pescadores.BARCO_REFORCADO)
     
     self.assertTrue(preco_simples > 800)
     self.assertTrue(preco_simples < preco_reforcado)
@@ -468,7 +631,7 @@ class TestMercado(unittest.TestCase):
     self.assertTrue(self.joao.consulte_saldo() < 500)
     
   def test_2_compra(self):
-    (barco, preco) = self.mercado.fabrique_barco(u'simples', u'Saga')
+    (barco, preco) = self.mercado.fabrique_barco(pescadores.BARCO_SIMPLES, u'Saga')
     
     barco.carregue(90)
     
@@ -527,6 +690,776 @@ class TestMapa(unittest.TestCase):
     self.assertTrue(long_algodao < long_juatinga)
     self.assertTrue(lat_algodao > lat_juatinga)
 
+  def test_2_compilado(self):
+    u""" O mapa compilado deve ser igual ao lido do .CSV, e ser refeito quando o .CSV muda.
+    """
+    diretorio = tempfile.mkdtemp()
+    try:
+      nome_arq = os.path.join(diretorio, u'mapa.csv')
+      shutil.copy(u'mapa_teste.csv', nome_arq)
+      (tabelas, mensagens) = pescadores.leia_tabelas_mapa(nome_arq)
+      self.assertEqual(mensagens, [])
+
+      self.assertEqual(pescadores.Mapa().preencha_mapa(nome_arq), [])
+      self.assertTrue(os.path.exists(pescadores.nome_compilado(nome_arq)))
+      self.assertEqual(pescadores.carregue_compilado(nome_arq), tabelas)
+
+      # Versões compiladas antigas, em pickle, não são abertas, e são refeitas.
+      arq = open(pescadores.nome_compilado(nome_arq), u'wb')
+      arq.write(pickle.dumps((1, (0, 0), tabelas)))
+      arq.close()
+      self.assertIsNone(pescadores.carregue_compilado(nome_arq))
+      self.assertEqual(pescadores.Mapa().preencha_mapa(nome_arq), [])
+      self.assertEqual(pescadores.carregue_compilado(nome_arq), tabelas)
+
+      mapa = pescadores.Mapa()
+      self.assertEqual(mapa.preencha_mapa(nome_arq), [])
+      self.assertEqual(mapa.porto_principal().nome(), u'Parati')
+      self.assertEqual(mapa.dimensoes_imagem(), (1280, 720))
+      lages = mapa.ache_posicao(u'Lages do Pendão')
+      self.assertEqual(lages.perigo().nome(), u'ventania')
+      self.assertIsNotNone(lages.pesqueiro())
+
+      # Um mapa alterado invalida a versão compilada.
+      arq = open(nome_arq, u'ab')
+      arq.write(u'\n'.encode(u'utf-8'))
+      arq.close()
+      os.utime(nome_arq, (0, 0))
+      self.assertIsNone(pescadores.carregue_compilado(nome_arq))
+    finally:
+      shutil.rmtree(diretorio)
+
+  def test_3_grafo(self):
+    u""" O grafo compacto deve descrever as mesmas posições e adjacências.
+    """
+    grafo = self.mapa.grafo()
+    self.assertIs(grafo, self.mapa.grafo())
+    self.assertEqual(grafo.quantas(), 4)
+
+    (inicio, destinos) = grafo.adjacencias()
+    self.assertEqual(len(inicio), grafo.quantas() + 1)
+    self.assertEqual(inicio[-1], len(destinos))
+
+    for (indice, nome) in enumerate(grafo.nomes()):
+      posicao = self.mapa.ache_posicao(nome)
+      self.assertEqual(posicao.indice(), indice)
+      self.assertIs(self.mapa.posicao_de_indice(indice), posicao)
+      self.assertEqual([grafo.nomes()[i] for i in grafo.vizinhos(indice)],
+                       [destino.nome() for destino in posicao.adjacencias()])
+      self.assertEqual(grafo.tem_pesqueiro(indice), posicao.pesqueiro() is not None)
+      self.assertEqual(grafo.tem_perigo(indice), posicao.perigo() is not None)
+
+    juatinga = grafo.indice(u'Ponta da Juatinga')
+    (probabilidade, dificuldade) = grafo.perigos()
+    self.assertEqual((probabilidade[juatinga], dificuldade[juatinga]), (4, 7))
+    (dificuldade, rendimento) = grafo.pesqueiros()
+    self.assertEqual(rendimento[grafo.indice(u'Lages do Pendão')], 100)
+
+  def test_3_grafo_alterado(self):
+    u""" Alterações feitas pelas posições são gravadas no grafo.
+    """
+    grafo = self.mapa.grafo()
+    grafo.planejadores()[u'teste'] = None
+    (origem, destino) = (grafo.posicao(0), grafo.posicao(3))
+    origem.adicione_adjacencia(destino)
+    self.assertIs(origem.adjacencias()[-1], destino)
+    self.assertEqual(grafo.vizinhos(0)[-1], 3)
+    (inicio, destinos) = grafo.adjacencias()
+    self.assertEqual(inicio[-1], len(destinos))
+    self.assertEqual(grafo.planejadores(), {})
+
+    destino.defina_perigo(pescadores.Perigo(u'Teste', u'Teste', 2, 3))
+    (probabilidade, dificuldade) = grafo.perigos()
+    self.assertEqual((probabilidade[3], dificuldade[3]), (2, 3))
+    self.assertEqual(destino.coordenadas(), grafo.coordenadas_posicao(3))
+    self.assertIs(self.mapa.grafo(), grafo)
+
+  def test_4_portos(self):
+    u""" As listas de portos e mercados acompanham a criação de portos e mercados.
+    """
+    parati = self.mapa.porto_principal()
+    self.assertEqual(self.mapa.portos(), [parati])
+    self.assertEqual(self.mapa.portos_com_mercado(), [parati])
+
+    ilha = self.mapa.ache_posicao(u'Ilha do Algodão')
+    self.mapa.crie_porto(ilha)
+    self.assertEqual(self.mapa.portos(), [parati, ilha])
+    self.assertEqual(self.mapa.portos_com_mercado(), [parati])
+
+    lages = self.mapa.ache_posicao(u'Lages do Pendão')
+    self.mapa.crie_mercado(lages)
+    self.mapa.crie_mercado(lages)
+    self.assertEqual(self.mapa.portos(), [parati, ilha, lages])
+    self.assertEqual(self.mapa.portos_com_mercado(), [parati, lages])
+    self.assertIsNotNone(lages.porto().mercado())
+
+    # Preencher de novo substitui as posições, em vez de acumular portos.
+    self.mapa.preencha_mapa(u'mapa_teste.csv')
+    parati = self.mapa.porto_principal()
+    self.assertEqual(self.mapa.portos(), [parati])
+    self.assertEqual(self.mapa.portos_com_mercado(), [parati])
+    self.assertIs(self.mapa.ache_posicao(u'Parati'), parati)
+
+  def test_5_rotas(self):
+    u""" O planejador evita a tempestade da Ponta da Juatinga quando o risco pesa mais.
+    """
+    planejador = pescadores.planejador_de_rotas(self.mapa)
+    self.assertIs(planejador, pescadores.planejador_de_rotas(self.mapa))
+    self.assertEqual(planejador.rota(u'Parati', u'Lages do Pendão'),
+                     [u'Ilha do Algodão', u'Lages do Pendão'])
+    self.assertEqual(planejador.avalie_rota(u'Parati', [u'Ilha do Algodão']), (1.0, 0.0))
+
+    # Sair das Lages tem ventania: atraso esperado, mas sem naufrágio.
+    (dias, naufragio) = planejador.avalie_rota(u'Lages do Pendão', [u'Ilha do Algodão'])
+    self.assertTrue(dias > 1)
+    self.assertEqual(naufragio, 0)
+
+    # Sair da Juatinga tem tempestade: 1/3 de chance de naufrágio.
+    (dias, naufragio) = planejador.avalie_rota(u'Ponta da Juatinga',
+                                               [u'Ilha do Algodão', u'Parati'])
+    self.assertEqual(dias, 2)
+    self.assertAlmostEqual(naufragio, 1 / 3)
+    self.assertTrue(planejador.custo(u'Ponta da Juatinga', u'Parati') >
+                    planejador.custo(u'Parati', u'Ponta da Juatinga'))
+
+  def test_6_planejadores_liberados(self):
+    u""" Os planejadores guardados não impedem que o grafo de um jogo encerrado seja liberado.
+    """
+    jogo = pescadores.Jogo(silencioso = True)
+    jogo.preencha_mapa(u'mapa_teste.csv')
+    pescadores.planejador_de_rotas(jogo._mapa)
+    grafo = weakref.ref(jogo._mapa.grafo())
+    del jogo
+    gc.collect()
+    self.assertIsNone(grafo())
+
+
+
+def grave_catalogo(nome_arq, traducoes):
+  u""" Grava um catálogo .mo de gettext, com as traduções dadas.
+  """
+  originais = sorted(traducoes.keys())
+  chaves = b''.join(original.encode(u'utf-8') + b'\0' for original in originais)
+  valores = b''.join(traducoes[original].encode(u'utf-8') + b'\0' for original in originais)
+  inicio_chaves = 7 * 4 + 16 * len(originais)
+  inicio_valores = inicio_chaves + len(chaves)
+  tabela_chaves = []
+  tabela_valores = []
+  (pos_chave, pos_valor) = (inicio_chaves, inicio_valores)
+  for original in originais:
+    (chave, valor) = (original.encode(u'utf-8'), traducoes[original].encode(u'utf-8'))
+    tabela_chaves.extend((len(chave), pos_chave))
+    tabela_valores.extend((len(valor), pos_valor))
+    pos_chave += len(chave) + 1
+    pos_valor += len(valor) + 1
+  arq = open(nome_arq, u'wb')
+  arq.write(struct.pack(u'Iiiiiii', 0x950412de, 0, len(originais), 7 * 4,
+                        7 * 4 + 8 * len(originais), 0, 0))
+  arq.write(struct.pack(u'%di' % len(tabela_chaves), *tabela_chaves))
+  arq.write(struct.pack(u'%di' % len(tabela_valores), *tabela_valores))
+  arq.write(chaves + valores)
+  arq.close()
+
+
+class TestSimulacao(unittest.TestCase):
+  u""" Testes para a execução de partidas sem interface gráfica.
+  """
+  def test_1_partida(self):
+    jogo = pescadores_simulacao.jogue_partida(u'mapa_teste.csv', [u'João', u'Pedro'], 20,
+                                              pescadores_simulacao.PoliticaAleatoria())
+    extratos = jogo.extratos_pescadores()
+    self.assertIn(u'João', extratos)
+    self.assertIn(u'Pedro', extratos)
+    
+  def test_2_silencioso(self):
+    u""" No modo silencioso, nenhuma mensagem é montada.
+    """
+    politica = pescadores_simulacao.Politica()
+    jogo = pescadores.Jogo(True)
+    jogo.preencha_mapa(u'mapa_teste.csv')
+    jogo.adicione_pescadores([u'João'])
+    self.assertEqual(pescadores_simulacao.jogue_dia(jogo, politica), [])
+
+    jogo = pescadores.Jogo()
+    jogo.preencha_mapa(u'mapa_teste.csv')
+    jogo.adicione_pescadores([u'João'])
+    self.assertTrue(len(pescadores_simulacao.jogue_dia(jogo, politica)) > 0)
+
+  def test_3_sementes(self):
+    u""" A mesma semente repete a partida, inclusive em outros processos.
+    """
+    (resultados, por_segundo) = pescadores_simulacao.jogue_partidas(
+      4, 15, u'mapa_teste.csv', semente_mestra = 7)
+    (semente, extratos) = resultados[2]
+    jogo = pescadores_simulacao.jogue_partida_semeada(semente, 15, u'mapa_teste.csv')
+    self.assertEqual(jogo.extratos_pescadores(), extratos)
+
+    (paralelos, por_segundo) = pescadores_simulacao.simule_em_paralelo(
+      4, 15, u'mapa_teste.csv', semente_mestra = 7, processos = 2)
+    self.assertEqual(paralelos, resultados)
+
+  def test_4_em_lote(self):
+    u""" Jornadas em lote também se repetem com a mesma semente.
+    """
+    partidas = []
+    for i in range(2):
+      jogo = pescadores_simulacao.jogue_partida(u'mapa_teste.csv', [u'João', u'Pedro'], 20,
+                                                pescadores_simulacao.PoliticaAleatoria(Random(3)),
+                                                semente = 11, em_lote = True)
+      partidas.append(jogo.extratos_pescadores())
+    self.assertEqual(partidas[0], partidas[1])
+
+  def test_5_rota_de_varios_dias(self):
+    u""" Um barco com rota navega sozinho, um trecho por dia.
+    """
+    jogo = pescadores.Jogo(semente = 1)
+    jogo.preencha_mapa(u'mapa_teste.csv')
+    jogo.adicione_pescadores([u'João'])
+    jogo.atenda_pescador(u'João', [(pescadores.BARCO, pescadores.BARCO_SIMPLES, u'Saga'), (pescadores.RACOES, 5)])
+    jogo.embarque(u'Saga', [u'João'])
+
+    self.assertFalse(jogo.adicione_rota(u'Saga', [u'Lages do Pendão']))
+    rota = jogo.planeje_rota(u'Saga', u'Lages do Pendão')
+    self.assertEqual(rota, [u'Ilha do Algodão', u'Lages do Pendão'])
+    self.assertTrue(jogo.adicione_rota(u'Saga', rota))
+
+    # O estado salvo não compartilha as rotas com o jogo, em nenhum sentido.
+    estado = jogo.estado_como_dict()
+    estado[u'rotas'][u'Saga'].pop()
+    self.assertEqual(jogo.rota_barco(u'Saga'), rota)
+    outro = pescadores.Jogo(silencioso = True)
+    estado = jogo.estado_como_dict()
+    outro.restaure_de_dict(estado)
+    estado[u'rotas'][u'Saga'].pop()
+    self.assertEqual(outro.rota_barco(u'Saga'), rota)
+
+    for destino in rota:
+      self.assertEqual(jogo.prepare_jornadas(), [])
+      jogo.execute_jornadas()
+      self.assertEqual(jogo.estado_barco(u'Saga')[0][1], destino)
+    self.assertEqual(jogo.rota_barco(u'Saga'), [])
+    self.assertEqual(len(jogo.prepare_jornadas()), 1)
+
+  def test_6_local_dos_pescadores(self):
+    u""" Os índices de localização concordam com portos e barcos ao longo da partida.
+    """
+    jogo = pescadores_simulacao.jogue_partida(u'mapa_teste.csv', [u'João', u'Pedro', u'Ana'], 25,
+                                              pescadores_simulacao.PoliticaAleatoria(Random(4)),
+                                              semente = 4)
+    for nome in [u'João', u'Pedro', u'Ana']:
+      (nome_porto, nome_barco) = jogo.local_pescador(nome)
+      if nome_barco is None:
+        self.assertIn(nome, jogo.pescadores_nos_mercados())
+      else:
+        self.assertIn((u'pescador', nome), jogo.estado_barco(nome_barco))
+    for (nome_barco, vagas) in jogo.barcos_com_vaga():
+      self.assertIsNotNone(jogo.dono_barco(nome_barco))
+
+    # Um pescador sem rações é resgatado do barco, que é rebocado ao porto.
+    jogo = pescadores.Jogo(semente = 2)
+    jogo.preencha_mapa(u'mapa_teste.csv')
+    jogo.adicione_pescadores([u'João'])
+    jogo.atenda_pescador(u'João', [(pescadores.BARCO, pescadores.BARCO_SIMPLES, u'Saga')])
+    self.assertEqual(jogo.dono_barco(u'Saga'), u'João')
+    jogo.embarque(u'Saga', [u'João'])
+    self.assertEqual(jogo.local_pescador(u'João'), (None, u'Saga'))
+    jogo.adicione_jornada(u'Saga', (pescadores.NAVEGAR, u'Ilha do Algodão'))
+    jogo.execute_jornadas()
+    jogo.prepare_alvorada()
+    eventos = jogo.prepare_alvorada()
+    self.assertIn(pescadores.ResgateRacao(u'João'), eventos)
+    self.assertIn(pescadores.BarcoRebocado(u'Saga'), eventos)
+    self.assertEqual(jogo.local_pescador(u'João'), (u'Parati', None))
+
+  def test_7_eventos(self):
+    u""" As operações do jogo produzem eventos, que só viram texto quando apresentados.
+    """
+    jogo = pescadores.Jogo(semente = 5)
+    jogo.preencha_mapa(u'mapa_teste.csv')
+    jogo.adicione_pescadores([u'João'])
+    eventos = pescadores_simulacao.jogue_dia(jogo, pescadores_simulacao.PoliticaAleatoria(Random(5)))
+    for evento in eventos:
+      self.assertIsInstance(evento, pescadores.Evento)
+      self.assertIsInstance(evento.texto(), str)
+    self.assertIsInstance(eventos[1], pescadores.NovoDia)
+
+    movido = pescadores.BarcoMovido(u'Saga', 10, 20)
+    self.assertEqual(movido.texto(), u'#coord:barco=Saga;x=10;y=20')
+    self.assertEqual((movido.nome_barco, movido.x, movido.y), (u'Saga', 10, 20))
+    self.assertEqual(str(pescadores.BarcoAtrasado(u'Saga', u'Parati', 2)),
+                     u'Barco Saga se atrasou 2 dias para chegar a Parati.')
+
+  def test_8_jornadas_em_fluxo(self):
+    u""" O fluxo de jornadas entrega um barco de cada vez, com os mesmos eventos.
+    """
+    eventos = []
+    for i in range(2):
+      jogo = pescadores.Jogo(semente = 9)
+      jogo.preencha_mapa(u'mapa_teste.csv')
+      jogo.adicione_pescadores([u'João', u'Pedro'])
+      jogo.atenda_pescador(u'João', [(pescadores.BARCO, pescadores.BARCO_SIMPLES, u'Saga'), (pescadores.REDES, 1)])
+      jogo.atenda_pescador(u'Pedro', [(pescadores.BARCO, pescadores.BARCO_SIMPLES, u'Sina')])
+      jogo.embarque(u'Saga', [u'João'])
+      jogo.embarque(u'Sina', [u'Pedro'])
+      for (nome_barco, jornadas) in jogo.prepare_jornadas():
+        jogo.adicione_jornada(nome_barco, jornadas[-1])
+      if i == 0:
+        eventos.append(jogo.execute_jornadas())
+      else:
+        fluxo = jogo.execute_jornadas_em_fluxo()
+        self.assertEqual(next(fluxo), (None, [pescadores.Separador()]))
+        (nome_barco, eventos_barco) = next(fluxo)
+        self.assertIn(nome_barco, (u'Saga', u'Sina'))
+        # O outro barco ainda não navegou.
+        outro = u'Sina' if nome_barco == u'Saga' else u'Saga'
+        self.assertEqual(jogo.estado_barco(outro)[0][1], u'Parati')
+        resto = [eventos_barco]
+        for (nome_barco, eventos_barco) in fluxo:
+          resto.append(eventos_barco)
+        eventos.append([pescadores.Separador()] + sum(resto, []))
+    self.assertEqual(eventos[0], eventos[1])
+
+  @unittest.skipIf(pescadores.numpy is None, u'NumPy não instalado')
+  def test_10_estado_vetorial(self):
+    u""" Com o estado em vetores, a mesma semente produz a mesma partida.
+    """
+    resultados = []
+    diretorio = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, diretorio)
+    for vetorial in (False, True):
+      nome_arq = os.path.join(diretorio, u'jogo.json')
+      jogo = pescadores_simulacao.jogue_partida(u'mapa_teste.csv', [u'João', u'Pedro', u'Ana'], 30,
+                                                pescadores_simulacao.PoliticaAleatoria(Random(8)),
+                                                silencioso = False, semente = 8,
+                                                vetorial = vetorial)
+      jogo.salve_estado(nome_arq)
+      arq = open(nome_arq)
+      resultados.append((jogo.extratos_pescadores(), arq.read(),
+                         [str(evento) for evento in jogo.prepare_alvorada()]))
+      arq.close()
+    self.assertEqual(resultados[0], resultados[1])
+
+  def test_11_formatos(self):
+    u""" O estado salvo em json ou em binário é carregado igual, e o binário é menor.
+    """
+    jogo = pescadores_simulacao.jogue_partida(u'mapa_teste.csv', [u'João', u'Pedro', u'Ana'], 20,
+                                              pescadores_simulacao.PoliticaAleatoria(Random(3)),
+                                              semente = 3)
+    estado = jogo.estado_como_dict()
+    diretorio = tempfile.mkdtemp()
+    try:
+      tamanhos = {}
+      for (nome, formato) in ((u'jogo.json', None), (u'jogo.pesc', None),
+                              (u'jogo.bin', pescadores.FormatoBinario(0))):
+        nome_arq = os.path.join(diretorio, nome)
+        jogo.salve_estado(nome_arq, formato)
+        tamanhos[nome] = os.path.getsize(nome_arq)
+        outro = pescadores.Jogo(silencioso = True)
+        outro.carregue_estado(nome_arq, formato)
+        self.assertEqual(outro.estado_como_dict(), estado, nome)
+      self.assertTrue(tamanhos[u'jogo.pesc'] < tamanhos[u'jogo.json'])
+
+      estado[u'hash_mapa'] = u'0' * 64
+      self.assertRaises(ValueError, pescadores.Jogo(silencioso = True).restaure_de_dict, estado)
+
+      # Arquivos antigos, em pickle, não são abertos.
+      nome_arq = os.path.join(diretorio, u'antigo.pesc')
+      arq = open(nome_arq, u'wb')
+      arq.write(b'PESC1-' + pickle.dumps(estado))
+      arq.close()
+      self.assertRaises(ValueError, pescadores.Jogo(silencioso = True).carregue_estado, nome_arq)
+    finally:
+      shutil.rmtree(diretorio)
+
+  def test_12_diario(self):
+    u""" Um jogo interrompido é recuperado do diário, com os mesmos sorteios.
+    """
+    diretorio = tempfile.mkdtemp()
+    try:
+      nome_diario = os.path.join(diretorio, u'jogo.diario')
+      politica = pescadores_simulacao.PoliticaAleatoria(Random(4))
+      jogo = pescadores.Jogo(silencioso = True, semente = 4)
+      jogo.preencha_mapa(u'mapa_teste.csv')
+      jogo.inicie_diario(nome_diario, intervalo = 15)
+      jogo.adicione_pescadores([u'João', u'Pedro', u'Ana'])
+      for dia in range(10):
+        pescadores_simulacao.jogue_dia(jogo, politica)
+      jogo.atenda_pescador(u'João', [(pescadores.REDES, 1)])
+      # O programa é interrompido aqui, sem fechar o diário.
+
+      recuperado = pescadores.Jogo(silencioso = True)
+      recuperado.recupere_diario(nome_diario)
+      self.assertEqual(recuperado.instantaneo(), jogo.instantaneo())
+
+      jogo.feche_diario()
+      recuperado.feche_diario()
+    finally:
+      shutil.rmtree(diretorio)
+
+  def test_13_copie_estado(self):
+    u""" Depois de restaure_estado(), o jogo continua exatamente como a partir da cópia.
+    """
+    opcoes = [False]
+    if pescadores.numpy is not None:
+      opcoes.append(True)
+    for vetorial in opcoes:
+      jogo = pescadores_simulacao.jogue_partida(u'mapa_teste.csv', [u'João', u'Pedro', u'Ana'], 8,
+                                                pescadores_simulacao.PoliticaAleatoria(Random(5)),
+                                                semente = 5, vetorial = vetorial)
+      resumo = jogo.resumo_estado()
+      copia = jogo.copie_estado()
+      finais = []
+      for tentativa in range(2):
+        politica = pescadores_simulacao.PoliticaAleatoria(Random(9))
+        jogo.adicione_pescadores([u'Zé'])
+        for dia in range(10):
+          pescadores_simulacao.jogue_dia(jogo, politica)
+        finais.append(jogo.resumo_estado())
+        jogo.restaure_estado(copia)
+        self.assertEqual(jogo.resumo_estado(), resumo)
+      self.assertEqual(finais[0], finais[1])
+      self.assertNotEqual(finais[0], resumo)
+
+  @unittest.skipIf(pescadores.numpy is None, u'NumPy não instalado')
+  def test_13_copie_estado_em_lote(self):
+    u""" Uma cópia com o gerador dos sorteios em lote é restaurada mesmo depois de se
+        voltar a um ponto anterior à criação do gerador.
+    """
+    jogo = pescadores.Jogo(silencioso = True, semente = 6, em_lote = True)
+    jogo.preencha_mapa(u'mapa_teste.csv')
+    jogo.adicione_pescadores([u'João', u'Pedro'])
+    politica = pescadores_simulacao.PoliticaAleatoria(Random(6))
+    antes = jogo.copie_estado()
+    jogo.simule_dias(5, politica)
+    depois = jogo.copie_estado()
+    resumo = jogo.resumo_estado()
+    jogo.restaure_estado(antes)
+    jogo.restaure_estado(depois)
+    self.assertEqual(jogo.resumo_estado(), resumo)
+
+  def test_14_simule_dias(self):
+    u""" simule_dias() joga os mesmos dias que jogue_dia(), e coleta só o que foi pedido.
+    """
+    jogos = []
+    for i in range(2):
+      jogo = pescadores.Jogo(silencioso = (i == 0), semente = 12)
+      jogo.preencha_mapa(u'mapa_teste.csv')
+      jogo.adicione_pescadores([u'João', u'Pedro', u'Ana'])
+      jogos.append(jogo)
+    politica = pescadores_simulacao.PoliticaAleatoria(Random(12))
+    estatisticas = jogos[0].simule_dias(15, politica, (u'dinheiro', u'barcos'))
+    politica = pescadores_simulacao.PoliticaAleatoria(Random(12))
+    for dia in range(15):
+      pescadores_simulacao.jogue_dia(jogos[1], politica)
+
+    self.assertEqual(jogos[0].resumo_estado(), jogos[1].resumo_estado())
+    self.assertEqual(sorted(estatisticas.keys()), [u'barcos', u'dinheiro'])
+    self.assertEqual(len(estatisticas[u'dinheiro']), 15)
+    extratos = jogos[1].extratos_pescadores()
+    del extratos[u'Mestre']
+    self.assertEqual(estatisticas[u'dinheiro'][-1], sum(extratos.values()))
+    self.assertRaises(ValueError, jogos[0].simule_dias, 1, politica, (u'peixes',))
+
+  def test_15_codigos(self):
+    u""" Pedidos, bens e jornadas usam códigos; só a interface os traduz.
+    """
+    jogo = pescadores.Jogo(silencioso = True, semente = 1)
+    jogo.preencha_mapa(u'mapa_teste.csv')
+    jogo.adicione_pescadores([u'João'])
+    jogo.prepare_alvorada()
+    jogo.atenda_pescador(u'João', [(pescadores.CURSO, pescadores.CURSO_PESCA)])
+    bens = jogo.inventario_pescador(u'João')
+    self.assertIn((pescadores.CURSO, pescadores.CURSO_PESCA, 1), bens)
+    self.assertEqual(pescadores.nome_bem(pescadores.RACOES), u'rações')
+    self.assertEqual(pescadores.curso_de_nome(u'navegação'), pescadores.CURSO_NAVEGACAO)
+
+    # O tipo do barco também é um código: o preço não depende do idioma.
+    jogo.atenda_pescador(u'João', [(pescadores.BARCO, pescadores.BARCO_SIMPLES, u'Saga')])
+    self.assertIn((pescadores.BARCO, pescadores.BARCO_SIMPLES, u'Saga'),
+                  jogo.inventario_pescador(u'João'))
+    self.assertEqual(pescadores.tipo_barco_de_nome(u'reforçado'), pescadores.BARCO_REFORCADO)
+    self.assertEqual(pescadores.nome_tipo_barco(pescadores.BARCO_SIMPLES), u'simples')
+    self.assertEqual(pescadores.BarcoTransferido(pescadores.BARCO_REFORCADO, u'Saga').texto(),
+                     u'Barco reforçado de nome Saga')
+    self.assertEqual(pescadores.texto_jornada((pescadores.NAVEGAR, u'Parati')),
+                     u'navegar para Parati')
+    self.assertEqual(pescadores.texto_jornada([pescadores.PESCAR]), u'pescar')
+
+  def test_16_tradutor(self):
+    u""" Jogos no mesmo processo podem usar idiomas diferentes.
+    """
+    traducoes = {u'Mestre': u'Master', u'pescar': u'fish',
+                 u'Barco %s chegou em %s.': u'Boat %s arrived at %s.'}
+    diretorio = tempfile.mkdtemp()
+    try:
+      os.makedirs(os.path.join(diretorio, u'xx', u'LC_MESSAGES'))
+      grave_catalogo(os.path.join(diretorio, u'xx', u'LC_MESSAGES', u'pescadores.mo'),
+                     traducoes)
+      tr = pescadores.Tradutor(u'xx', diretorio)
+    finally:
+      shutil.rmtree(diretorio)
+
+    self.assertEqual(tr(u'pescar'), u'fish')
+    self.assertEqual(tr(u'rações'), u'rações')
+    # A segunda consulta vem do dicionário, e não do catálogo.
+    self.assertEqual(tr(u'pescar'), u'fish')
+    self.assertEqual(tr(u'rações'), u'rações')
+    self.assertEqual(pescadores.texto_jornada((pescadores.PESCAR,), tr), u'fish')
+    evento = pescadores.BarcoChegou(u'Saga', u'Parati')
+    self.assertEqual(evento.texto(tr), u'Boat Saga arrived at Parati.')
+    self.assertEqual(evento.texto(), u'Barco Saga chegou em Parati.')
+
+    jogo = pescadores.Jogo(silencioso = True, idioma = u'xx')
+    self.assertEqual(jogo.tradutor().idioma(), u'xx')
+    self.assertIn(u'Mestre', pescadores.Jogo(silencioso = True).extratos_pescadores())
+
+  def test_17_atenda_pescadores(self):
+    u""" Pedidos de vários pescadores, conferidos e atendidos de uma vez, têm o mesmo
+        efeito que um a um.
+    """
+    pedidos = {u'João': [(pescadores.CURSO, pescadores.CURSO_PESCA)] * 5 +
+                        [(pescadores.RACOES, 3)],
+               u'Pedro': [(pescadores.REDES, 2), (pescadores.RACOES, 10 ** 6),
+                          (pescadores.RACOES, 1)],
+               u'Ninguém': [(pescadores.REDES, 1)]}
+    jogos = []
+    for i in range(2):
+      jogo = pescadores.Jogo(silencioso = True, semente = 3)
+      jogo.preencha_mapa(u'mapa_teste.csv')
+      jogo.adicione_pescadores([u'João', u'Pedro'])
+      jogo.prepare_alvorada()
+      jogos.append(jogo)
+
+    resultados = jogos[0].atenda_pescadores(pedidos)
+    for (nome, pedidos_pescador) in pedidos.items():
+      self.assertEqual(jogos[1].atenda_pescador(nome, pedidos_pescador), resultados[nome])
+    self.assertEqual(jogos[0].resumo_estado(), jogos[1].resumo_estado())
+
+    self.assertEqual(resultados[u'João'], [True, True, True, False, False, True])
+    self.assertEqual(resultados[u'Pedro'], [True, False, True])
+    self.assertEqual(resultados[u'Ninguém'], [False])
+
+    # Só os pedidos aceitos foram cobrados.
+    preco_racao = jogos[0]._mapa.porto_principal().porto().mercado().preco_racao()
+    extratos = jogos[0].extratos_pescadores()
+    self.assertEqual(extratos[u'João'], 2000 - 200 - 500 - 800 - 3 * preco_racao)
+    self.assertEqual(extratos[u'Pedro'], 2000 - 2 * 300 - preco_racao)
+
+  def test_18_livro(self):
+    u""" O livro fecha com os saldos, e suas transações são balanceadas e atômicas.
+    """
+    vetorial = [False] if pescadores.numpy is None else [False, True]
+    for opcao in vetorial:
+      jogo = pescadores.Jogo(silencioso = True, semente = 5, vetorial = opcao)
+      jogo.preencha_mapa(u'mapa_teste.csv')
+      jogo.adicione_pescadores([u'João', u'Pedro', u'Ana'])
+      jogo.simule_dias(20, pescadores_simulacao.PoliticaAleatoria(Random(5)))
+      jogo.transfira_bens(u'Ana', u'Mestre', [(pescadores.DINHEIRO, 50)], u'doação')
+      livro = jogo.livro()
+
+      for (nome, saldo) in jogo.extratos_pescadores().items():
+        self.assertEqual(livro.saldo(nome, pescadores.DINHEIRO), saldo)
+      self.assertEqual(sum(livro.extratos(pescadores.DINHEIRO).values()), 0)
+      contrato = livro.lancamentos(None, 20)[-2:]
+      self.assertEqual(contrato[0][0], contrato[1][0])
+      self.assertEqual(sorted((lancamento[2], lancamento[4]) for lancamento in contrato),
+                       [(u'Ana', 50), (u'Mestre', -50)])
+      self.assertEqual(livro.lancamentos(u'Ana', 20)[-1][5], pescadores.CONTRATO)
+      self.assertTrue(all(lancamento[1] == 7 for lancamento in livro.lancamentos(None, 7, 7)))
+
+    tamanho = len(livro)
+    copia = jogo.copie_estado()
+    jogo.prepare_alvorada()
+    jogo.credite_jornadas()
+    jogo.restaure_estado(copia)
+    self.assertEqual(len(livro), tamanho)
+    self.assertEqual(livro.dia(), 20)
+    with self.assertRaises(ValueError):
+      livro.lance(pescadores.CONTRATO, [(u'João', pescadores.DINHEIRO, -10),
+                                        (u'Pedro', pescadores.DINHEIRO, 5)])
+    self.assertEqual(len(livro), tamanho)
+
+    # Cópias tiradas em momentos diferentes podem ser restauradas em qualquer ordem.
+    copia_a = jogo.copie_estado()
+    resumo_a = jogo.resumo_estado()
+    jogo.simule_dias(3, pescadores_simulacao.PoliticaAleatoria(Random(6)))
+    copia_b = jogo.copie_estado()
+    resumo_b = jogo.resumo_estado()
+    jogo.restaure_estado(copia_a)
+    self.assertEqual(jogo.resumo_estado(), resumo_a)
+    jogo.simule_dias(2, pescadores_simulacao.PoliticaAleatoria(Random(7)))
+    jogo.restaure_estado(copia_b)
+    self.assertEqual(jogo.resumo_estado(), resumo_b)
+    jogo.restaure_estado(copia_a)
+    self.assertEqual(jogo.resumo_estado(), resumo_a)
+    jogo.restaure_estado(copia_b)
+    self.assertEqual(jogo.resumo_estado(), resumo_b)
+    self.assertEqual(livro.saldo(u'Ana', pescadores.DINHEIRO), jogo.extratos_pescadores()[u'Ana'])
+
+    # As cópias só guardam o tamanho do livro; valem mesmo depois de cortes e de from_dict().
+    sorteio = Random(8)
+    livro = pescadores.Livro()
+    contas = [u'Ana', u'João', u'Pedro', pescadores.CONTA_COLONIA]
+    saldos = lambda: [livro.saldo(conta, pescadores.DINHEIRO) for conta in contas]
+    copias = []
+    for passo in range(400):
+      operacao = sorteio.random()
+      if operacao < 0.5:
+        (origem, destino) = sorteio.sample(contas, 2)
+        valor = sorteio.randrange(1, 10)
+        livro.lance(pescadores.CONTRATO, [(origem, pescadores.DINHEIRO, -valor),
+                                          (destino, pescadores.DINHEIRO, valor)])
+      elif operacao < 0.6:
+        livro.inicie_dia()
+      elif operacao < 0.75:
+        copias.append((livro.copie_estado(), livro.as_dict(), saldos()))
+      elif operacao < 0.77:
+        livro.from_dict(livro.as_dict())
+      elif len(copias) > 0:
+        (copia, estado, saldos_copia) = sorteio.choice(copias)
+        livro.restaure_estado(copia)
+        self.assertEqual(livro.as_dict(), estado)
+        self.assertEqual(saldos(), saldos_copia)
+
+  @unittest.skipIf(pescadores.numpy is None, u'NumPy não instalado')
+  def test_19_estoque_em_lote(self):
+    u""" Com os mesmos dados, a pesca em lote esgota o pesqueiro como a pesca barco a barco,
+        e só retira dele, e só anuncia, o que coube nos barcos.
+    """
+    class DadosFixos:
+      def integers(self, menor, maior, quantos):
+        return pescadores.numpy.full(quantos, 6)
+
+    estoques = []
+    for em_lote in (False, True):
+      jogo = pescadores.Jogo(semente = 5, em_lote = em_lote)
+      jogo.preencha_mapa(u'mapa_teste.csv')
+      jogo.adicione_pescadores([u'João', u'Pedro'])
+      for (nome, nome_barco) in ((u'João', u'Saga'), (u'Pedro', u'Maré')):
+        jogo.atenda_pescador(nome, [(pescadores.BARCO, pescadores.BARCO_SIMPLES, nome_barco),
+                                    (pescadores.REDES, 2)])
+        jogo.embarque(nome_barco, [nome])
+        jogo.adicione_rota(nome_barco, [u'Ilha do Algodão'])
+      jogo.prepare_jornadas()
+      jogo.execute_jornadas()
+
+      jogo._rng.randint = lambda a, b: 6
+      jogo._gerador_lote = DadosFixos()
+      por_dia = []
+      quilos = 0
+      for dia in range(4):
+        for nome_barco in (u'Saga', u'Maré'):
+          jogo.adicione_jornada(nome_barco, (pescadores.PESCAR,))
+        eventos = jogo.execute_jornadas()
+        por_dia.append(jogo.estoques_pesqueiros()[u'Ilha do Algodão'][0])
+        quilos += sum(evento.quilos for evento in eventos
+                      if isinstance(evento, pescadores.Pescaria))
+      estoques.append(por_dia)
+
+      # Com os barcos cheios, as redes voltam vazias.
+      self.assertEqual([evento.__class__ for evento in eventos
+                        if isinstance(evento, (pescadores.Pescaria, pescadores.RedeVazia))],
+                       [pescadores.RedeVazia] * 4)
+      self.assertEqual(quilos, 2 * 150)
+
+      # No último dia os barcos encheram, e o pesqueiro só perdeu o que foi carregado.
+      (biomassa, capacidade) = jogo.estoques_pesqueiros()[u'Ilha do Algodão']
+      for nome_barco in (u'Saga', u'Maré'):
+        self.assertEqual(dict(jogo.estado_barco(nome_barco))[u'capacidade restante'], u'0')
+      self.assertEqual(capacidade - biomassa, 2 * 150)
+
+    self.assertEqual(estoques[0], estoques[1])
+
+  def test_19_textos_traduzidos(self):
+    u""" Todos os eventos aceitam o tradutor do jogo em texto().
+    """
+    diretorio = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, diretorio)
+    os.makedirs(os.path.join(diretorio, u'xx', u'LC_MESSAGES'))
+    grave_catalogo(os.path.join(diretorio, u'xx', u'LC_MESSAGES', u'pescadores.mo'),
+                   {u'Barco %s pescando em %s.': u'Boat %s fishing at %s.',
+                    u'Ventania!': u'Gale!'})
+    tr = pescadores.Tradutor(u'xx', diretorio)
+
+    valores = {u'precos': [(u'rede', 300)], u'racoes': [(u'João', 2)], u'dias': 1,
+               u'valor': 10, u'quilos': 10, u'x': 1, u'y': 2, u'quantas': 1,
+               u'tipo': pescadores.BARCO_SIMPLES}
+    for classe in pescadores.Evento.__subclasses__():
+      evento = classe(*[valores.get(campo, u'Saga') for campo in classe.campos])
+      self.assertIsInstance(evento.texto(tr), str, classe.__name__)
+    self.assertEqual(pescadores.BarcoPescando(u'Saga', u'Parati').texto(tr),
+                     u'Boat Saga fishing at Parati.')
+    self.assertEqual(pescadores.PerigoOcorrido(u'ventania', u'Ventania!').texto(tr), u'Gale!')
+
+  def test_9_memoria(self):
+    u""" Pescadores e barcos ocupam menos memória que no formato original (__dict__ e
+        listas), e não aceitam atributos novos.
+    """
+    for (entidade, (antes, depois)) in pescadores_simulacao.meca_memoria(1000).items():
+      self.assertTrue(depois < antes, entidade)
+    with self.assertRaises(AttributeError):
+      pescadores.Pescador(u'João').apelido = u'Jota'
+
+
+
+class TestReproducao(unittest.TestCase):
+  u""" Testes para a reprodução de partidas (pescadores_reproducao)
+  """
+
+  def setUp(self):
+    self.partida = pescadores_reproducao.Partida(u'mapa_teste.csv', 6)
+    self.jogo = self.partida.crie_jogo()
+    self.partida.grave(self.jogo)
+    self.jogo.adicione_pescadores([u'João', u'Pedro', u'Ana'])
+    politica = pescadores_simulacao.PoliticaAleatoria(Random(6))
+    self.resumos = []
+    for dia in range(12):
+      self.resumos.append(self.jogo.resumo_estado())
+      pescadores_simulacao.jogue_dia(self.jogo, politica)
+    self.jogo.feche_diario()
+
+  def test_1_reproduza(self):
+    nome_arq = os.path.join(tempfile.mkdtemp(), u'partida.json')
+    try:
+      self.partida.salve(nome_arq)
+      partida = pescadores_reproducao.Partida.carregue(nome_arq)
+    finally:
+      shutil.rmtree(os.path.dirname(nome_arq))
+    self.assertEqual(partida.dias(), 12)
+    jogo = pescadores_reproducao.reproduza(partida)
+    self.assertEqual(jogo.resumo_estado(), self.jogo.resumo_estado())
+    self.assertEqual(jogo.extratos_pescadores(), self.jogo.extratos_pescadores())
+
+  def test_2_ate_dia(self):
+    for dia in (0, 5, 11):
+      jogo = pescadores_reproducao.reproduza(self.partida, dia)
+      self.assertEqual(jogo.resumo_estado(), self.resumos[dia])
+
+  def test_3_divergencia(self):
+    chamadas = self.partida.chamadas()
+    chamadas.insert(1, (u'atenda_pescador', [u'João', [[pescadores.REDES, 1]]]))
+    self.assertRaises(ValueError, pescadores_reproducao.reproduza, self.partida)
+    # Sem conferir, a reprodução vai até o fim.
+    pescadores_reproducao.reproduza(self.partida, confira = False)
+
+  def test_4_argumentos_copiados(self):
+    u""" Alterar os argumentos depois da chamada não altera a partida gravada.
+    """
+    partida = pescadores_reproducao.Partida(u'mapa_teste.csv', 6)
+    jogo = partida.crie_jogo()
+    partida.grave(jogo)
+    jogo.adicione_pescadores([u'João'])
+    jogo.prepare_alvorada()
+    pedidos = [(pescadores.REDES, 1)]
+    jogo.atenda_pescador(u'João', pedidos)
+    pedidos.append((pescadores.RACOES, 5))
+    jogo.feche_diario()
+    self.assertEqual(partida.chamadas()[-1],
+                     (u'atenda_pescador', [u'João', [[pescadores.REDES, 1]]]))
+    # A reprodução confere os resumos do estado: o jogo gravado e o repetido concordam.
+    jogo = pescadores_reproducao.reproduza(partida)
+    self.assertIn((pescadores.REDES, 1), jogo.inventario_pescador(u'João'))
+    self.assertIn((pescadores.RACOES, 0), jogo.inventario_pescador(u'João'))
 
     
 if __name__ == '__main__':